@@ -10,6 +10,8 @@ from flask_cors import CORS
 from flasgger import Swagger
 from prometheus_flask_exporter import PrometheusMetrics
 from app import metrics as metrics_module
+from app.utils import principal_cache, otp_store, revocation, idempotency, order_stream, cart_store, cart_cache, catalog_cache
+from app.auth import table as authz_table
 from flask_limiter.util import get_remote_address
 from flask_migrate import Migrate
 import extensions
@@ -52,6 +54,14 @@ def create_app(config_object=None):
     limiter = extensions.limiter
     limiter.init_app(app)
     app.limiter = limiter
+    principal_cache.init_app(app)
+    otp_store.init_app(app)
+    revocation.init_app(app)
+    idempotency.init_app(app)
+    order_stream.init_app(app)
+    cart_store.init_app(app)
+    cart_cache.init_app(app)
+    catalog_cache.init_app(app)
 
     migrate = Migrate(app, db, compare_type=True, render_as_batch=True)
     swagger = Swagger(
@@ -164,4 +174,5 @@ def create_app(config_object=None):
     def health():
         return {"status": "ok"}, 200
 
+    authz_table.init_app(app)
     return app
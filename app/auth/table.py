@@ -0,0 +1,120 @@
+"""
+Startup-time compilation of role requirements into per-endpoint bitmasks.
+"""
+from types import MappingProxyType
+from typing import Iterable, NamedTuple
+from .permissions import ROLE_SCOPES, role_has_scope
+
+
+class Requirement:
+    """One ``role_required`` layer, resolved to the set of roles it admits.
+
+    ``"role:action"`` entries are expanded against ``ROLE_SCOPES`` once, so a
+    request only has to test membership.
+    """
+
+    __slots__ = ("entries", "roles")
+
+    def __init__(self, entries: Iterable[str]):
+        self.entries = tuple(sorted(entries))
+        roles = set()
+        for entry in self.entries:
+            if ":" in entry:
+                role, action = entry.split(":", 1)
+                if role_has_scope(role, action):
+                    roles.add(role)
+            else:
+                roles.add(entry)
+        self.roles = frozenset(roles)
+
+    def __repr__(self):
+        return f"Requirement({list(self.entries)!r})"
+
+
+class EndpointPolicy(NamedTuple):
+    mask: int
+    roles: frozenset
+    requirements: frozenset
+
+
+class AuthorizationTable:
+    """Frozen endpoint -> policy lookup built from ``app.url_map``."""
+
+    def __init__(self, role_bits, policies):
+        self.role_bits = MappingProxyType(dict(role_bits))
+        self.policies = MappingProxyType(dict(policies))
+
+    def get(self, endpoint):
+        return self.policies.get(endpoint)
+
+    def allows(self, policy: EndpointPolicy, role: str) -> bool:
+        return bool(self.role_bits.get(role, 0) & policy.mask)
+
+    def describe(self, url_map):
+        """Return one audit row per protected rule, sorted by path."""
+        rows = []
+        for rule in url_map.iter_rules():
+            policy = self.policies.get(rule.endpoint)
+            if policy is None:
+                continue
+            rows.append({
+                "rule": rule.rule,
+                "endpoint": rule.endpoint,
+                "methods": sorted(m for m in rule.methods if m not in ("HEAD", "OPTIONS")),
+                "roles": sorted(policy.roles),
+                "requirements": sorted(
+                    ",".join(req.entries) for req in policy.requirements
+                ),
+            })
+        rows.sort(key=lambda r: (r["rule"], r["endpoint"]))
+        return rows
+
+
+def requirements_of(func):
+    return getattr(func, "_authz_requirements", ())
+
+
+def _blueprint_chain(endpoint: str):
+    name = endpoint.rpartition(".")[0]
+    while name:
+        yield name
+        name = name.rpartition(".")[0]
+    yield None
+
+
+def compile_authorization(app) -> AuthorizationTable:
+    """Resolve every endpoint's stacked requirements into a role bitmask.
+
+    Requirements attached to blueprint (and app) ``before_request`` hooks
+    apply to every endpoint of that blueprint; route decorators add to them.
+    An endpoint admits a role only if every layer does.
+    """
+    known_roles = set(ROLE_SCOPES)
+    layers_by_endpoint = {}
+    for rule in app.url_map.iter_rules():
+        endpoint = rule.endpoint
+        if endpoint in layers_by_endpoint:
+            continue
+        layers = list(requirements_of(app.view_functions.get(endpoint)))
+        for bp_name in _blueprint_chain(endpoint):
+            for hook in app.before_request_funcs.get(bp_name, ()):
+                layers.extend(requirements_of(hook))
+        if layers:
+            layers_by_endpoint[endpoint] = layers
+            for req in layers:
+                known_roles.update(req.roles)
+
+    role_bits = {role: 1 << i for i, role in enumerate(sorted(known_roles))}
+    policies = {}
+    for endpoint, layers in layers_by_endpoint.items():
+        roles = frozenset.intersection(*(req.roles for req in layers))
+        mask = 0
+        for role in roles:
+            mask |= role_bits[role]
+        policies[endpoint] = EndpointPolicy(mask, roles, frozenset(layers))
+    return AuthorizationTable(role_bits, policies)
+
+
+def init_app(app):
+    app.authz_table = compile_authorization(app)
+    return app.authz_table
@@ -1,4 +1,5 @@
 import os
+import json
 import click
 from flask import current_app
 from flask.cli import with_appcontext
@@ -42,8 +43,69 @@ def db_stamp_safe(revision):
     click.echo(f"Database stamped at {revision}.")
 
 
+@click.command("authz-table")
+@click.option("--json", "as_json", is_flag=True, help="Emit JSON instead of a text table")
+@with_appcontext
+def authz_table_dump(as_json):
+    """Print the compiled per-endpoint authorization table."""
+    rows = current_app.authz_table.describe(current_app.url_map)
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        click.echo(
+            f"{','.join(row['methods']):<12} {row['rule']:<55} "
+            f"roles={','.join(row['roles']) or '-'}  "
+            f"requires={' & '.join(row['requirements'])}"
+        )
+
+
+@click.command("archive-orders")
+@click.option("--older-than-days", type=int, default=None, help="Idle age before archiving (ORDER_ARCHIVE_AFTER_DAYS)")
+@click.option("--batch-size", type=int, default=None, help="Orders per transaction (ORDER_ARCHIVE_BATCH_SIZE)")
+@click.option("--max-batches", type=int, default=None, help="Stop after this many batches")
+@with_appcontext
+def archive_orders(older_than_days, batch_size, max_batches):
+    """Move closed orders and their rows into the archive tables."""
+    from app.services.order_archive import archive_closed_orders
+
+    moved = archive_closed_orders(older_than_days, batch_size, max_batches)
+    click.echo(f"Archived {moved} orders.")
+
+
+@click.command("rebuild-shop-stats")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="First day (UTC), default: oldest event")
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Day after the last one, default: after newest event")
+@click.option("--chunk-days", type=int, default=31, help="Days recomputed per transaction")
+@with_appcontext
+def rebuild_shop_stats_command(since, until, chunk_days):
+    """Recompute shop_daily_stats from the order journal."""
+    from app.services.shop_stats import rebuild_shop_stats
+
+    written = rebuild_shop_stats(since and since.date(), until and until.date(), chunk_days)
+    click.echo(f"Wrote {written} shop_daily_stats rows.")
+
+
+@click.command("carts-to-store")
+@click.option("--batch-size", type=int, default=500, help="Consumers moved per transaction")
+@with_appcontext
+def carts_to_store(batch_size):
+    """Move cart_item rows into the store selected by CART_STORE_URL."""
+    from app.services.consumer.cart import move_carts_to_store
+    from app.utils.cart_store import SQLCartStore
+
+    if isinstance(current_app.cart_store, SQLCartStore):
+        raise click.ClickException("CART_STORE_URL is sql://; point it at memory:// or Redis first")
+    carts, skipped = move_carts_to_store(batch_size)
+    click.echo(f"Moved {carts} carts ({skipped} lines skipped).")
+
+
 def register_cli(app):
     app.cli.add_command(db_migrate_safe)
     app.cli.add_command(db_upgrade_safe)
     app.cli.add_command(db_stamp_safe)
+    app.cli.add_command(authz_table_dump)
+    app.cli.add_command(archive_orders)
+    app.cli.add_command(rebuild_shop_stats_command)
+    app.cli.add_command(carts_to_store)
 
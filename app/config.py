@@ -5,6 +5,8 @@ class BaseConfig:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     CORS_ALLOWED_ORIGINS = os.getenv("CORS_ALLOWED_ORIGINS", "*")
     RATELIMIT_STORAGE_URL = os.getenv("RATELIMIT_STORAGE_URL", "memory://")
+    OTP_STORE_URL = os.getenv("OTP_STORE_URL", "sql://")
+    OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", 10))
     OTP_SEND_LIMIT_PER_IP = os.getenv("OTP_SEND_LIMIT_PER_IP", "5 per 15 minutes")
     OTP_SEND_LIMIT_PER_PHONE = os.getenv("OTP_SEND_LIMIT_PER_PHONE", "3 per 15 minutes")
     LOGIN_LIMIT_PER_IP = os.getenv("LOGIN_LIMIT_PER_IP", "10 per 30 minutes")
@@ -13,6 +15,33 @@ class BaseConfig:
     JWT_PREVIOUS_SECRETS = [s for s in os.getenv("JWT_PREVIOUS_SECRETS", "").split(",") if s]
     ACCESS_TOKEN_LIFETIME_MIN = int(os.getenv("ACCESS_TOKEN_LIFETIME_MIN", 15))
     REFRESH_TOKEN_LIFETIME_DAYS = int(os.getenv("REFRESH_TOKEN_LIFETIME_DAYS", 30))
+    JWT_VERIFIED_CACHE_SIZE = int(os.getenv("JWT_VERIFIED_CACHE_SIZE", 1024))
+    REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", 100000))
+    REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", 0.001))
+    REVOCATION_SYNC_INTERVAL_SEC = float(os.getenv("REVOCATION_SYNC_INTERVAL_SEC", 2))
+    IDEMPOTENCY_STORE_URL = os.getenv("IDEMPOTENCY_STORE_URL", "sql://")
+    IDEMPOTENCY_TTL_SEC = int(os.getenv("IDEMPOTENCY_TTL_SEC", 86400))
+    IDEMPOTENCY_WAIT_SEC = float(os.getenv("IDEMPOTENCY_WAIT_SEC", 10))
+    PRINCIPAL_CACHE_URL = os.getenv("PRINCIPAL_CACHE_URL", "memory://")
+    PRINCIPAL_CACHE_TTL_SEC = int(os.getenv("PRINCIPAL_CACHE_TTL_SEC", 60))
+    PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+    CART_STORE_URL = os.getenv("CART_STORE_URL", "sql://")
+    CART_TTL_SEC = int(os.getenv("CART_TTL_SEC", 7 * 86400))
+    CART_CACHE_URL = os.getenv("CART_CACHE_URL", "")
+    CART_CACHE_TTL_SEC = int(os.getenv("CART_CACHE_TTL_SEC", 30))
+    CART_CACHE_MAX_ENTRIES = int(os.getenv("CART_CACHE_MAX_ENTRIES", 10000))
+    CATALOG_CACHE_MAX_ENTRIES = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", 1000))
+    ORDER_STREAM_URL = os.getenv("ORDER_STREAM_URL", "memory://")
+    ORDER_STREAM_MAX_CONNECTIONS = int(os.getenv("ORDER_STREAM_MAX_CONNECTIONS", 8))
+    ORDER_STREAM_ASYNC_WORKERS = os.getenv("ORDER_STREAM_ASYNC_WORKERS", "0") == "1"
+    # gunicorn reads the same variable for its worker count.
+    WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+    ORDER_STREAM_HEARTBEAT_SEC = float(os.getenv("ORDER_STREAM_HEARTBEAT_SEC", 15))
+    ORDER_STREAM_MAX_DURATION_SEC = float(os.getenv("ORDER_STREAM_MAX_DURATION_SEC", 300))
+    ORDER_STREAM_BACKLOG_LIMIT = int(os.getenv("ORDER_STREAM_BACKLOG_LIMIT", 500))
+    ORDER_MESSAGES_MAX_WAIT_SEC = float(os.getenv("ORDER_MESSAGES_MAX_WAIT_SEC", 25))
+    ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", 90))
+    ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", 500))
     TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")
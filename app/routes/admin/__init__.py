@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
+from sqlalchemy.orm import selectinload
 from app.version import API_PREFIX
 from app.utils import auth_required, role_required
+from app.utils.pagination import parse_expand
 from models.user import UserProfile
 from models.shop import Shop
 from models.order import Order
@@ -27,5 +29,21 @@ def list_shops():
 
 @admin_bp.route("/orders", methods=["GET"])
 def list_orders():
-    orders = Order.query.order_by(Order.id.desc()).limit(50).all()
-    return jsonify({"status": "success", "orders": [{"id": o.id, "status": o.status} for o in orders]}), 200
+    """Latest 50 orders with their headline; ``expand=items`` adds the lines."""
+    expand_items = "items" in parse_expand(request.args.get("expand"))
+    query = Order.query.order_by(Order.id.desc()).limit(50)
+    if expand_items:
+        query = query.options(selectinload(Order.items))
+    orders = []
+    for o in query:
+        row = {
+            "id": o.id,
+            "status": o.status,
+            "item_count": o.item_count,
+            "items_preview": o.items_preview,
+            "final_amount": None if o.final_amount is None else float(o.final_amount),
+        }
+        if expand_items:
+            row["items"] = [oi.to_dict() for oi in o.items]
+        orders.append(row)
+    return jsonify({"status": "success", "orders": orders}), 200
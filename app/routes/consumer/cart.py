@@ -1,11 +1,15 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from models import db
-from models.cart import CartItem
 from models.item import Item
-from decimal import Decimal
+from app.services.consumer.cart import cart_view
 from app.utils import transactional, error, internal_error_response
+from app.utils.cart_cache import invalidate_cart
+from app.utils.cart_store import CART_LIMIT, CART_MISSING, CART_OTHER_SHOP
 from . import consumer_bp
 
+MAX_QUANTITY_PER_ITEM = 10
+MAX_BATCH_LINES = 50
+
 
 @consumer_bp.route("/cart/add", methods=["POST"])
 def add_to_cart():
@@ -18,27 +22,18 @@ def add_to_cart():
         return error("Item not available", status=404)
     if quantity < 1:
         return error("Quantity must be at least 1", status=400)
-    MAX_QUANTITY_PER_ITEM = 10
     if quantity > MAX_QUANTITY_PER_ITEM:
         return error(f"Cannot add more than {MAX_QUANTITY_PER_ITEM} units per item", status=400)
-    existing_items = CartItem.query.filter_by(user_phone=phone).all()
-    if existing_items:
-        if any(ci.shop_id != item.shop_id for ci in existing_items):
-            return error("Cart contains items from a different shop", status=400)
-    cart_item = CartItem.query.filter_by(user_phone=phone, item_id=item_id).first()
-    if cart_item:
-        new_quantity = cart_item.quantity + quantity
-        if new_quantity > MAX_QUANTITY_PER_ITEM:
-            return error(f"Max limit is {MAX_QUANTITY_PER_ITEM} units", status=400)
-        cart_item.quantity = new_quantity
-    else:
-        cart_item = CartItem(user_phone=phone, item_id=item_id, shop_id=item.shop_id, quantity=quantity)
-        db.session.add(cart_item)
     try:
         with transactional("Failed to add to cart"):
-            pass
+            result = current_app.cart_store.add(phone, item.id, item.shop_id, quantity, MAX_QUANTITY_PER_ITEM)
+            invalidate_cart(phone)
     except Exception:
         return internal_error_response()
+    if result == CART_OTHER_SHOP:
+        return error("Cart contains items from a different shop", status=400)
+    if result == CART_LIMIT:
+        return error(f"Max limit is {MAX_QUANTITY_PER_ITEM} units", status=400)
     return jsonify({"status": "success", "message": "Item added to cart"}), 200
 
 
@@ -48,62 +43,76 @@ def update_cart_quantity():
     phone = request.phone
     item_id = data.get("item_id")
     quantity = data.get("quantity")
-    MAX_QUANTITY_PER_ITEM = 10
     if not item_id or quantity is None:
         return error("Item ID and quantity required", status=400)
     if quantity < 1 or quantity > MAX_QUANTITY_PER_ITEM:
         return error(f"Quantity must be between 1 and {MAX_QUANTITY_PER_ITEM}", status=400)
-    cart_item = CartItem.query.filter_by(user_phone=phone, item_id=item_id).first()
-    if not cart_item:
-        return error("Item not found in cart", status=404)
-    cart_item.quantity = quantity
     try:
         with transactional("Failed to update cart quantity"):
-            pass
+            result = current_app.cart_store.set_quantity(phone, item_id, quantity)
+            invalidate_cart(phone)
     except Exception:
         return internal_error_response()
+    if result == CART_MISSING:
+        return error("Item not found in cart", status=404)
     return jsonify({"status": "success", "message": "Cart quantity updated"}), 200
 
 
+@consumer_bp.route("/cart/batch", methods=["POST"])
+def apply_cart_batch():
+    """Set many cart lines in one request.
+
+    Body: ``{"lines": [{"item_id": 1, "quantity": 3}, ...]}``. Each quantity
+    replaces the line's quantity and 0 removes the line; a later entry for
+    the same item wins. The batch is applied all-or-nothing.
+    """
+    data = request.get_json(silent=True) or {}
+    lines = data.get("lines")
+    if not isinstance(lines, list) or not lines:
+        return error("lines must be a non-empty list", status=400)
+    if len(lines) > MAX_BATCH_LINES:
+        return error(f"At most {MAX_BATCH_LINES} lines per batch", status=400)
+    quantities = {}
+    for line in lines:
+        item_id = line.get("item_id") if isinstance(line, dict) else None
+        quantity = line.get("quantity") if isinstance(line, dict) else None
+        if type(item_id) is not int or type(quantity) is not int:
+            return error("Each line needs an integer item_id and quantity", status=400)
+        if quantity < 0 or quantity > MAX_QUANTITY_PER_ITEM:
+            return error(f"Quantity must be between 0 and {MAX_QUANTITY_PER_ITEM}", status=400)
+        quantities[item_id] = quantity
+
+    wanted = [item_id for item_id, quantity in quantities.items() if quantity]
+    shop_id = None
+    if wanted:
+        items = (
+            db.session.query(Item.id, Item.shop_id)
+            .filter(Item.id.in_(wanted), Item.is_available.is_(True))
+            .all()
+        )
+        if len(items) < len(wanted):
+            return error("Item not available", status=404)
+        shops = {item.shop_id for item in items}
+        if len(shops) > 1:
+            return error("Cart contains items from a different shop", status=400)
+        shop_id = shops.pop()
+
+    phone = request.phone
+    try:
+        with transactional("Failed to update cart"):
+            result = current_app.cart_store.apply(phone, shop_id, quantities)
+            invalidate_cart(phone)
+    except Exception:
+        return internal_error_response()
+    if result == CART_OTHER_SHOP:
+        return error("Cart contains items from a different shop", status=400)
+    return jsonify({"status": "success", "message": "Cart updated"}), 200
+
+
 @consumer_bp.route("/cart/view", methods=["GET"])
 def view_cart():
-    phone = request.phone
-    items = CartItem.query.filter_by(user_phone=phone).all()
-    cart_data = []
-    total_price = 0.0
-    savings = 0.0
-    for cart_item in items:
-        item = cart_item.item
-        shop = cart_item.shop
-        available = item.is_available
-        price = item.price
-        mrp = item.mrp
-        quantity = cart_item.quantity
-        subtotal = price * quantity
-        item_savings = (mrp - price) * quantity if mrp and price < mrp else 0
-        total_price += subtotal
-        savings += item_savings
-        cart_data.append({
-            "id": cart_item.id,
-            "item_id": item.id,
-            "item_name": item.title,
-            "available": available,
-            "price": price,
-            "mrp": mrp,
-            "savings": round(item_savings, 2),
-            "quantity": quantity,
-            "unit": item.unit,
-            "pack_size": item.pack_size,
-            "subtotal": round(subtotal, 2),
-            "shop_id": shop.id,
-            "shop_name": shop.shop_name,
-        })
-    return jsonify({
-        "status": "success",
-        "cart": cart_data,
-        "total_price": round(total_price, 2),
-        "total_savings": round(savings, 2),
-    }), 200
+    """The cart with item and shop details; one query, or none when cached."""
+    return jsonify({"status": "success", **cart_view(request.phone)}), 200
 
 
 @consumer_bp.route("/cart/remove", methods=["POST"])
@@ -111,25 +120,24 @@ def remove_item():
     data = request.get_json()
     phone = request.phone
     item_id = data.get("item_id")
-    cart_item = CartItem.query.filter_by(user_phone=phone, item_id=item_id).first()
-    if cart_item:
-        db.session.delete(cart_item)
-        try:
-            with transactional("Failed to remove cart item"):
-                pass
-        except Exception:
-            return internal_error_response()
-        return jsonify({"status": "success", "message": "Item removed"}), 200
-    return error("Item not found", status=404)
+    try:
+        with transactional("Failed to remove cart item"):
+            result = current_app.cart_store.remove(phone, item_id)
+            invalidate_cart(phone)
+    except Exception:
+        return internal_error_response()
+    if result == CART_MISSING:
+        return error("Item not found", status=404)
+    return jsonify({"status": "success", "message": "Item removed"}), 200
 
 
 @consumer_bp.route("/cart/clear", methods=["POST"])
 def clear_cart():
     phone = request.phone
-    CartItem.query.filter_by(user_phone=phone).delete()
     try:
         with transactional("Failed to clear cart"):
-            pass
+            current_app.cart_store.clear(phone)
+            invalidate_cart(phone)
     except Exception:
         return internal_error_response()
     return jsonify({"status": "success", "message": "Cart cleared"}), 200
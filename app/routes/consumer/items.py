@@ -1,17 +1,45 @@
-from flask import request, jsonify
+from flask import Response, current_app, request
+from models import db
 from app.utils import error
+from app.utils.catalog_cache import catalog_etag
 from models.item import Item
 from models.shop import Shop
 from . import consumer_bp
 
 @consumer_bp.route('/shop/<int:shop_id>/items', methods=['GET'])
 def view_items_by_shop(shop_id):
-    shop = Shop.query.get(shop_id)
+    """The shop's available items, cached per catalog version.
+
+    The response carries a strong ``ETag``; a request whose
+    ``If-None-Match`` still matches gets a 304 after reading only the shop
+    row.
+    """
+    shop = (
+        db.session.query(Shop.id, Shop.shop_name, Shop.shop_type, Shop.is_open, Shop.catalog_version)
+        .filter(Shop.id == shop_id)
+        .first()
+    )
     if not shop:
         return error("Shop not found", status=404)
     if not shop.is_open:
         return error("Shop is currently closed", status=403)
-    items = Item.query.filter_by(shop_id=shop_id, is_available=True).all()
+    etag = catalog_etag(shop.id, shop.catalog_version)
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        body = current_app.catalog_cache.get(shop.id, shop.catalog_version)
+        if body is None:
+            # Read after the version, so an entry can only be newer than its key.
+            body = _catalog_body(shop)
+            current_app.catalog_cache.set(shop.id, shop.catalog_version, body)
+        resp = Response(body, mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+def _catalog_body(shop) -> bytes:
+    items = Item.query.filter_by(shop_id=shop.id, is_available=True).all()
     item_list = []
     for item in items:
         item_list.append({
@@ -30,7 +58,7 @@ def view_items_by_shop(shop_id):
             "expiry_date": item.expiry_date.strftime('%Y-%m-%d') if item.expiry_date else None,
             "image_url": item.image_url
         })
-    return jsonify({
+    return (current_app.json.dumps({
         "status": "success",
         "shop": {
             "id": shop.id,
@@ -38,5 +66,5 @@ def view_items_by_shop(shop_id):
             "shop_type": shop.shop_type
         },
         "items": item_list
-    }), 200
+    }) + "\n").encode()
 
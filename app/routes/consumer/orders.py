@@ -1,18 +1,23 @@
 from flask import request, jsonify, current_app
 from flask_limiter.util import get_remote_address
+from sqlalchemy.orm import selectinload
 from extensions import limiter
 from models import db
 from models.order import (
     Order,
-    OrderItem,
-    OrderActionLog,
-    OrderMessage,
+    OrderEventKind,
     OrderRating,
     OrderIssue,
     OrderReturn,
+    parse_status_filter,
 )
+from models.order_archive import ArchivedOrder, may_be_archived
 from app.services.consumer.wallet import InsufficientFunds
-from app.utils import transactional, error, internal_error_response
+from app.services.order_events import record_event
+from app.services.order_state import TransitionConflict
+from app.utils import transactional, error, internal_error_response, idempotent
+from app.utils.order_stream import order_messages_response, order_stream_response
+from app.utils.pagination import keyset_page_union, parse_datetime, parse_expand, parse_limit
 from . import consumer_bp
 from app.services.consumer.orders import (
     ValidationError,
@@ -28,6 +33,7 @@ from app.services.consumer.orders import (
     key_func=get_remote_address,
     error_message="Too many orders from this IP",
 )
+@idempotent
 def confirm_order():
     user = request.user
     data = request.get_json()
@@ -57,39 +63,79 @@ def confirm_order():
 
 @consumer_bp.route("/order/history", methods=["GET"])
 def get_order_history():
+    """Newest-first order history, one page at a time.
+
+    Query parameters: ``limit`` (default 20, max 100), ``before`` (the
+    ``next_before`` cursor of the previous page), ``status`` (comma-separated),
+    ``from`` / ``to`` (ISO dates, ``to`` exclusive) and ``expand=items`` to
+    include order lines; without it rows carry only ``item_count`` and
+    ``items_preview`` and ``order_item`` is not read. Pages continue into
+    ``order_archive`` once the hot orders run out.
+    """
     user = request.user
-    orders = (
-        Order.query.filter_by(user_phone=user.phone)
-        .order_by(Order.created_at.desc())
-        .all()
-    )
+    args = request.args
+    try:
+        limit = parse_limit(args.get("limit"))
+        created_from = parse_datetime(args.get("from"))
+        created_to = parse_datetime(args.get("to"))
+    except ValueError:
+        return error("Invalid limit or date range", status=400)
+
+    expand_items = "items" in parse_expand(args.get("expand"))
+    try:
+        statuses = parse_status_filter(args.get("status"))
+    except ValueError:
+        return error("Invalid status", status=400)
+
+    def _history(model):
+        query = model.query.filter(model.user_phone == user.phone)
+        if expand_items:
+            query = query.options(selectinload(model.items))
+        if statuses:
+            query = query.filter(model.status.in_(statuses))
+        if created_from:
+            query = query.filter(model.created_at >= created_from)
+        if created_to:
+            query = query.filter(model.created_at < created_to)
+        return query, model.created_at, model.id
+
+    try:
+        orders, next_before = keyset_page_union(
+            _history(Order),
+            _history(ArchivedOrder) if may_be_archived(statuses) else None,
+            limit,
+            args.get("before"),
+        )
+    except ValueError:
+        return error("Invalid cursor", status=400)
+
     result = []
     for order in orders:
-        items = OrderItem.query.filter_by(order_id=order.id).all()
-        item_list = [
-            {
-                "name": oi.name,
-                "quantity": oi.quantity,
-                "unit_price": float(oi.unit_price),
-                "subtotal": float(oi.subtotal),
-            }
-            for oi in items
-        ]
-        result.append(
-            {
-                "order_id": order.id,
-                "shop_id": order.shop_id,
-                "payment_mode": order.payment_mode,
-                "payment_status": order.payment_status,
-                "status": order.status,
-                "total_amount": float(order.total_amount),
-                "final_amount": float(order.final_amount),
-                "delivery_notes": order.delivery_notes,
-                "created_at": order.created_at,
-                "items": item_list,
-            }
-        )
-    return jsonify({"status": "success", "orders": result}), 200
+        row = {
+            "order_id": order.id,
+            "shop_id": order.shop_id,
+            "payment_mode": order.payment_mode,
+            "payment_status": order.payment_status,
+            "status": order.status,
+            "total_amount": float(order.total_amount),
+            "final_amount": float(order.final_amount),
+            "delivery_notes": order.delivery_notes,
+            "created_at": order.created_at,
+            "item_count": order.item_count,
+            "items_preview": order.items_preview,
+        }
+        if expand_items:
+            row["items"] = [
+                {
+                    "name": oi.name,
+                    "quantity": oi.quantity,
+                    "unit_price": float(oi.unit_price),
+                    "subtotal": float(oi.subtotal),
+                }
+                for oi in order.items
+            ]
+        result.append(row)
+    return jsonify({"status": "success", "orders": result, "next_before": next_before}), 200
 
 
 @consumer_bp.route("/orders/<int:order_id>/confirm-modified", methods=["POST"])
@@ -111,6 +157,8 @@ def confirm_modified_order(order_id):
         )
     except InsufficientFunds as e:
         return error(str(e), status=400)
+    except TransitionConflict as e:
+        return error(str(e), status=409)
     except ValidationError as e:
         status = 403 if "Unauthorized" in str(e) else 400
         return error(str(e), status=status)
@@ -137,6 +185,8 @@ def cancel_order_consumer(order_id):
         )
     except InsufficientFunds as e:
         return error(str(e), status=400)
+    except TransitionConflict as e:
+        return error(str(e), status=409)
     except ValidationError as e:
         status = 403 if "Unauthorized" in str(e) else 400
         return error(str(e), status=status)
@@ -154,20 +204,15 @@ def send_order_message_consumer(order_id):
     order = Order.query.get(order_id)
     if not order or order.user_phone != user.phone:
         return error("Unauthorized", status=403)
-    db.session.add(
-        OrderMessage(order_id=order_id, sender_phone=user.phone, message=message)
-    )
-    db.session.add(
-        OrderActionLog(
-            order_id=order_id,
-            action_type="message_sent",
-            actor_phone=user.phone,
-            details=message,
-        )
-    )
     try:
         with transactional("Failed to send order message"):
-            pass
+            record_event(
+                order_id,
+                OrderEventKind.MESSAGE_SENT,
+                user.phone,
+                body=message,
+                route=(order.shop_id, order.user_phone),
+            )
     except Exception:
         return internal_error_response()
     return jsonify({"status": "success", "message": "Message sent"}), 200
@@ -175,17 +220,22 @@ def send_order_message_consumer(order_id):
 
 @consumer_bp.route("/orders/<int:order_id>/messages", methods=["GET"])
 def get_order_messages_consumer(order_id):
-    user = request.user
-    order = Order.query.get(order_id)
-    if not order or order.user_phone != user.phone:
+    """The order's chat; see ``order_messages_response`` for paging and ``wait``."""
+    phone = request.user.phone
+    owned = db.session.query(Order.id).filter(Order.id == order_id, Order.user_phone == phone).scalar()
+    if owned is None:
         return error("Unauthorized", status=403)
-    messages = (
-        OrderMessage.query.filter_by(order_id=order_id)
-        .order_by(OrderMessage.timestamp.asc())
-        .all()
-    )
-    result = [msg.to_dict() for msg in messages]
-    return jsonify({"status": "success", "messages": result}), 200
+    return order_messages_response(order_id, [f"consumer:{phone}"])
+
+
+@consumer_bp.route("/orders/stream", methods=["GET"])
+def stream_my_orders():
+    """Server-sent status changes and messages for the consumer's orders.
+
+    See ``order_stream_response`` for resuming with ``Last-Event-ID``.
+    """
+    phone = request.user.phone
+    return order_stream_response([f"consumer:{phone}"], Order.user_phone == phone)
 
 
 @consumer_bp.route("/orders/<int:order_id>/rate", methods=["POST"])
@@ -208,17 +258,14 @@ def rate_order(order_id):
         order_id=order.id, user_phone=user.phone, rating=int(rating), review=review
     )
     db.session.add(rating_entry)
-    db.session.add(
-        OrderActionLog(
-            order_id=order.id,
-            action_type="order_rated",
-            actor_phone=user.phone,
-            details=f"Rated {rating}/5. {review}" if review else f"Rated {rating}/5",
-        )
-    )
     try:
         with transactional("Failed to rate order"):
-            pass
+            record_event(
+                order.id,
+                OrderEventKind.ORDER_RATED,
+                user.phone,
+                body=f"Rated {rating}/5. {review}" if review else f"Rated {rating}/5",
+            )
     except Exception:
         return internal_error_response()
     return (
@@ -251,24 +298,15 @@ def raise_order_issue(order_id):
         description=description,
     )
     db.session.add(issue)
-    db.session.add(
-        OrderActionLog(
-            order_id=order.id,
-            action_type="issue_raised",
-            actor_phone=user.phone,
-            details=f"Issue: {issue_type} | {description}",
-        )
-    )
-    db.session.add(
-        OrderMessage(
-            order_id=order.id,
-            sender_phone=user.phone,
-            message=f"Issue raised: {issue_type}\n{description}",
-        )
-    )
     try:
         with transactional("Failed to raise issue"):
-            pass
+            record_event(
+                order.id,
+                OrderEventKind.ISSUE_RAISED,
+                user.phone,
+                body=f"Issue raised: {issue_type}\n{description}",
+                route=(order.shop_id, order.user_phone),
+            )
     except Exception:
         return internal_error_response()
     return jsonify({"status": "success", "message": "Issue raised"}), 200
@@ -296,17 +334,14 @@ def request_return(order_id):
                 status="requested",
             )
         )
-    db.session.add(
-        OrderActionLog(
-            order_id=order.id,
-            actor_phone=user.phone,
-            action_type="return_requested",
-            details=f"{len(items)} item(s) requested for return. Reason: {reason}",
-        )
-    )
     try:
         with transactional("Failed to request return"):
-            pass
+            record_event(
+                order.id,
+                OrderEventKind.RETURN_REQUESTED,
+                user.phone,
+                body=f"{len(items)} item(s) requested for return. Reason: {reason}",
+            )
     except Exception:
         return internal_error_response()
     return jsonify({"status": "success", "message": "Return request sent"}), 200
@@ -1,7 +1,7 @@
 from flask import request, jsonify
 from models import db
 from models.user import ConsumerProfile
-from app.utils import transactional, error, internal_error_response
+from app.utils import transactional, error, internal_error_response, invalidate_principal
 from . import consumer_bp
 
 
@@ -33,6 +33,7 @@ def consumer_onboarding():
             user.role_onboarding_done = True
     except Exception:
         return internal_error_response()
+    invalidate_principal(user.phone)
     return jsonify({"status": "success", "message": "Consumer onboarding done"}), 200
 
 
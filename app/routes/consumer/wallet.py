@@ -6,7 +6,7 @@ from app.services.consumer.wallet import (
     adjust_consumer_balance,
     InsufficientFunds,
 )
-from app.utils import transactional, error, internal_error_response
+from app.utils import transactional, error, internal_error_response, idempotent
 from . import consumer_bp
 
 
@@ -37,6 +37,7 @@ def wallet_transaction_history():
 
 
 @consumer_bp.route("/wallet/load", methods=["POST"])
+@idempotent
 def load_wallet():
     user = request.user
     data = request.get_json()
@@ -61,6 +62,7 @@ def load_wallet():
 
 
 @consumer_bp.route("/wallet/debit", methods=["POST"])
+@idempotent
 def debit_wallet():
     user = request.user
     data = request.get_json()
@@ -84,6 +86,7 @@ def debit_wallet():
 
 
 @consumer_bp.route("/wallet/refund", methods=["POST"])
+@idempotent
 def refund_wallet():
     user = request.user
     data = request.get_json()
@@ -2,21 +2,25 @@ from flask import Blueprint, request, jsonify, current_app
 from app.version import API_PREFIX
 from flask_limiter.util import get_remote_address
 from extensions import limiter
-from models.user import OTP, UserProfile
+from models.user import UserProfile
 from models import db
 import secrets
-from datetime import datetime, timedelta
 import logging
 from app.utils import internal_error_response
 from app.utils import error, transactional
 from app.utils.validation import validate_schema
+from app.utils.otp_store import OTP_VALID, OTP_EXPIRED
+from app.utils.revocation import token_expiry, family_expiry
+from sqlalchemy.exc import IntegrityError
 from app.schemas.auth import SendOTPRequest, VerifyOTPRequest
 from app.utils import (
     create_access_token,
     create_refresh_token,
+    new_token_family,
     decode_token,
     TokenError,
     normalize_phone,
+    invalidate_principal,
 )
 
 
@@ -30,12 +34,37 @@ def logout_handler():
         return error("Token missing", status=401)
     token = auth.split(" ", 1)[1]
     try:
-        decode_token(token)
+        payload = decode_token(token)
     except TokenError as e:
         return error(str(e), status=401)
+
+    # Revoking the family also ends the session's refresh token.
+    revocations = current_app.revocations
+    try:
+        with transactional("Failed to revoke token"):
+            if payload.get("jti"):
+                revocations.revoke(payload["jti"], token_expiry(payload), "logout")
+            if payload.get("fam"):
+                revocations.revoke(payload["fam"], family_expiry(current_app.config), "logout")
+    except Exception as e:
+        logging.error("Failed to revoke token: %s", e, exc_info=True)
+        return internal_error_response()
     return jsonify({"status": "success", "message": "Logged out"}), 200
 
 
+def _reject_reused_refresh(payload):
+    """A rotated refresh token came back: end the whole session."""
+    family = payload.get("fam")
+    logging.warning("Refresh token reuse detected for %s", payload.get("sub"))
+    if family:
+        try:
+            with transactional("Failed to revoke token family"):
+                current_app.revocations.revoke(family, family_expiry(current_app.config), "reuse")
+        except Exception:
+            return internal_error_response()
+    return error("refresh token reuse detected", status=401)
+
+
 @auth_bp.route("/auth/refresh", methods=["POST"])
 def refresh_tokens():
     j = request.get_json() or {}
@@ -45,11 +74,33 @@ def refresh_tokens():
     except TokenError as e:
         return error(str(e), status=401)
 
+    revocations = current_app.revocations
+    jti, family = payload.get("jti"), payload.get("fam")
+    # The refresh path always asks the table, never just the filter, so a
+    # rotation made by another worker is seen immediately.
+    if family and revocations.lookup(family):
+        return error("token revoked", status=401)
+    if jti and revocations.lookup(jti):
+        return _reject_reused_refresh(payload)
+
     phone = payload.get("sub")
     user = UserProfile.query.filter_by(phone=phone).first()
     role = user.role if user else ""
-    access_token = create_access_token(phone, role or "")
-    refresh_token = create_refresh_token(phone)
+    # Refresh tokens issued before rotation start a session family here.
+    family = family or new_token_family()
+    access_token = create_access_token(phone, role or "", family=family)
+    refresh_token = create_refresh_token(phone, family=family)
+    if jti:
+        try:
+            with transactional("Failed to rotate refresh token"):
+                rotated = revocations.revoke(jti, token_expiry(payload), "rotated")
+        except IntegrityError:
+            rotated = False
+        except Exception:
+            return internal_error_response()
+        if not rotated:
+            # Lost a race with a concurrent refresh of the same token.
+            return _reject_reused_refresh(payload)
     return jsonify({
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -95,21 +146,14 @@ def send_otp_handler():
 
     otp_code = generate_otp()
 
-    new_otp = OTP(
-        phone=phone,
-        otp=otp_code,
-        is_used=False,
-        created_at=datetime.utcnow()
-    )
-
     try:
         with transactional("Failed to create OTP"):
-            db.session.add(new_otp)
+            current_app.otp_store.issue(phone, otp_code)
     except Exception as e:
         logging.error("Failed to create OTP: %s", e, exc_info=True)
         return internal_error_response()
 
-    logging.info("Twilio disabled – OTP not sent; OTP stored in database for %s", phone)
+    logging.info("Twilio disabled – OTP not sent; OTP stored for %s", phone)
 
     return jsonify({"status": "success", "message": "OTP sent"}), 200
 
@@ -127,26 +171,12 @@ def verify_otp_handler():
     phone = normalize_phone(data.phone.strip())
     otp = data.otp.strip()
 
-    otp_record = OTP.query.filter_by(phone=phone, otp=otp, is_used=False).first()
-
-    if not otp_record:
-        recent_otp = OTP.query.filter_by(phone=phone).order_by(OTP.created_at.desc()).first()
-        if recent_otp:
-            logging.warning(
-                "OTP mismatch for %s; latest record status is_used=%s created_at=%s",
-                phone,
-                recent_otp.is_used,
-                recent_otp.created_at,
-            )
-        else:
-            logging.warning("No OTP record found for phone: %s", phone)
-        return error("Invalid or expired OTP", status=401)
-
-    otp_expiry_minutes = 10
-    if datetime.utcnow() - otp_record.created_at > timedelta(minutes=otp_expiry_minutes):
+    result = current_app.otp_store.consume(phone, otp)
+    if result == OTP_EXPIRED:
         return error("OTP expired", status=401)
-
-    otp_record.is_used = True
+    if result != OTP_VALID:
+        logging.warning("OTP mismatch or no pending OTP for %s", phone)
+        return error("Invalid or expired OTP", status=401)
 
     user_agent = request.headers.get("User-Agent", "")[:200]
 
@@ -155,17 +185,17 @@ def verify_otp_handler():
         user = UserProfile(phone=phone)
     user.device_info = user_agent
 
-    access_token = create_access_token(phone, user.role or "")
-    refresh_token = create_refresh_token(phone)
-    otp_record.token = "issued"
+    family = new_token_family()
+    access_token = create_access_token(phone, user.role or "", family=family)
+    refresh_token = create_refresh_token(phone, family=family)
 
     try:
         with transactional("Failed to verify OTP"):
-            db.session.add(otp_record)
             db.session.add(user)
     except Exception as e:
         logging.error("Failed to verify OTP: %s", e, exc_info=True)
         return internal_error_response()
+    invalidate_principal(phone)
 
     logging.info("[DEBUG] ✅ OTP verified. Tokens issued for %s", phone)
 
@@ -3,7 +3,7 @@ from app.version import API_PREFIX
 from models import db
 from app.utils import auth_required
 from app.utils import role_required
-from app.utils import error, transactional
+from app.utils import error, transactional, invalidate_principal
 from app.utils.validation import validate_schema
 from app.schemas.onboarding import BasicOnboardingRequest
 import logging
@@ -35,6 +35,7 @@ def basic_onboarding():
             db.session.add(user)
     except Exception:
         return internal_error_response()
+    invalidate_principal(user.phone)
 
     return jsonify({"status": "success", "message": "Basic onboarding complete"}), 200
 
@@ -0,0 +1,108 @@
+from itertools import groupby
+from flask import current_app
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from models.shop import Shop
+from app.utils.cart_store import CART_OK
+
+
+def _cart_lines(phone: str):
+    """The cart joined to its items and shops in one query."""
+    return current_app.cart_store.item_lines(
+        phone,
+        Item.title,
+        Item.is_available,
+        Item.price,
+        Item.mrp,
+        Item.unit,
+        Item.pack_size,
+        Shop.shop_name,
+    )
+
+
+def build_cart_view(phone: str) -> dict:
+    cart_data = []
+    total_price = 0.0
+    savings = 0.0
+    for line in _cart_lines(phone):
+        price, mrp, quantity = line.price, line.mrp, line.quantity
+        subtotal = price * quantity
+        item_savings = (mrp - price) * quantity if mrp and price < mrp else 0
+        total_price += subtotal
+        savings += item_savings
+        cart_data.append({
+            "id": line.line_id,
+            "item_id": line.item_id,
+            "item_name": line.title,
+            "available": line.is_available,
+            "price": price,
+            "mrp": mrp,
+            "savings": round(item_savings, 2),
+            "quantity": quantity,
+            "unit": line.unit,
+            "pack_size": line.pack_size,
+            "subtotal": round(subtotal, 2),
+            "shop_id": line.shop_id,
+            "shop_name": line.shop_name,
+        })
+    return {
+        "cart": cart_data,
+        "total_price": round(total_price, 2),
+        "total_savings": round(savings, 2),
+    }
+
+
+def cart_view(phone: str) -> dict:
+    """``/cart/view`` body for ``phone``, served from the cart cache when enabled."""
+    cache = getattr(current_app, "cart_cache", None)
+    if cache is not None:
+        cached = cache.get(phone)
+        if cached is not None:
+            return cached
+    view = build_cart_view(phone)
+    if cache is not None:
+        cache.set(phone, view)
+    return view
+
+
+def move_carts_to_store(batch_size: int = 500):
+    """Move ``cart_item`` rows into a document cart store.
+
+    Works through the rows a batch of consumers at a time and deletes each
+    batch once it is in the store. A consumer who already has a cart in the
+    store keeps it; legacy lines from another shop are dropped. Returns
+    ``(carts, skipped_lines)``.
+    """
+    store = current_app.cart_store
+    carts = skipped = 0
+    after = ""
+    while True:
+        phones = [
+            phone
+            for phone, in db.session.query(CartItem.user_phone)
+            .filter(CartItem.user_phone > after)
+            .group_by(CartItem.user_phone)
+            .order_by(CartItem.user_phone)
+            .limit(batch_size)
+        ]
+        if not phones:
+            break
+        rows = (
+            CartItem.query.filter(CartItem.user_phone.in_(phones))
+            .order_by(CartItem.user_phone, CartItem.id)
+            .all()
+        )
+        for phone, lines in groupby(rows, key=lambda row: row.user_phone):
+            lines = list(lines)
+            shop_id = lines[0].shop_id
+            kept = [(line.item_id, line.quantity) for line in lines if line.shop_id == shop_id]
+            skipped += len(lines) - len(kept)
+            if store.merge(phone, shop_id, kept) == CART_OK:
+                carts += 1
+            else:
+                skipped += len(kept)
+        CartItem.query.filter(CartItem.user_phone.in_(phones)).delete(synchronize_session=False)
+        db.session.commit()
+        after = phones[-1]
+    return carts, skipped
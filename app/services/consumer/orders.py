@@ -1,34 +1,84 @@
 from decimal import Decimal
+from flask import current_app
+from sqlalchemy import case, insert, or_, update
+from sqlalchemy.orm.util import identity_key
 from models import db
-from models.order import (
-    Order,
-    OrderItem,
-    OrderStatusLog,
-    OrderActionLog,
-    OrderMessage,
-)
-from models.cart import CartItem
+from models.order import Order, OrderEventKind, OrderItem, items_summary
 from models.item import Item
 from app.services.consumer.wallet import adjust_consumer_balance
+from app.services.order_events import record_event
+from app.services.order_state import allowed, transition
+from app.services.shop_stats import bump_shop_stats
+from app.utils.cart_cache import invalidate_cart
 
 
 class ValidationError(Exception):
     pass
 
 
+def _lock_cart_lines(phone: str):
+    """Read the cart joined to its items, locking the item rows.
+
+    Rows are locked in item-id order so concurrent checkouts that share
+    items always acquire locks in the same order and cannot deadlock.
+    """
+    return current_app.cart_store.item_lines(
+        phone,
+        Item.title,
+        Item.unit,
+        Item.price,
+        Item.quantity_in_stock,
+        lock=True,
+    )
+
+
+def _reserve_stock(lines) -> None:
+    """Decrement stock for every line in one conditional UPDATE.
+
+    ``quantity_in_stock`` of NULL means untracked stock and is left alone.
+    Raises ValidationError naming the first item that is short.
+    """
+    wanted = {}
+    for line in lines:
+        wanted[line.item_id] = wanted.get(line.item_id, 0) + line.quantity
+    qty = case(wanted, value=Item.id)
+    result = db.session.execute(
+        update(Item)
+        .where(
+            Item.id.in_(list(wanted)),
+            or_(Item.quantity_in_stock.is_(None), Item.quantity_in_stock >= qty),
+        )
+        .values(quantity_in_stock=Item.quantity_in_stock - qty)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(wanted):
+        short = next(
+            (line for line in lines
+             if line.quantity_in_stock is not None and line.quantity_in_stock < wanted[line.item_id]),
+            lines[0],
+        )
+        raise ValidationError(f"Not enough stock for item {short.title}")
+    # Keep already-loaded Item instances from serving pre-update stock.
+    for item_id in wanted:
+        item = db.session.identity_map.get(identity_key(Item, item_id))
+        if item is not None:
+            db.session.expire(item, ["quantity_in_stock"])
+
+
 def confirm_order_service(user, payment_mode: str = "cash", delivery_notes: str = ""):
-    cart_items = CartItem.query.filter_by(user_phone=user.phone).all()
-    if not cart_items:
+    """Turn the user's cart into a pending order.
+
+    Set-based: one locking read of the cart, one stock UPDATE, one INSERT
+    for the order and one multi-row INSERT for its lines.
+    """
+    lines = _lock_cart_lines(user.phone)
+    if not lines:
         raise ValidationError("Cart is empty")
-    shop_id = cart_items[0].shop_id
-    total_amount = sum(Decimal(ci.quantity) * Decimal(ci.item.price) for ci in cart_items)
+    shop_id = lines[0].shop_id
+    subtotals = [Decimal(line.quantity) * Decimal(str(line.price)) for line in lines]
+    total_amount = sum(subtotals)
 
-    for ci in cart_items:
-        item = Item.query.filter_by(id=ci.item_id).with_for_update().one()
-        if item.quantity_in_stock is not None:
-            if item.quantity_in_stock < ci.quantity:
-                raise ValidationError(f"Not enough stock for item {item.title}")
-            item.quantity_in_stock -= ci.quantity
+    _reserve_stock(lines)
 
     if payment_mode == "wallet":
         adjust_consumer_balance(
@@ -48,44 +98,48 @@ def confirm_order_service(user, payment_mode: str = "cash", delivery_notes: str
         total_amount=total_amount,
         final_amount=total_amount,
         status="pending",
+        **items_summary((line.title, line.quantity) for line in lines),
     )
     db.session.add(new_order)
     db.session.flush()
 
-    for ci in cart_items:
-        db.session.add(
-            OrderItem(
-                order_id=new_order.id,
-                item_id=ci.item.id,
-                name=ci.item.title,
-                unit=ci.item.unit,
-                unit_price=ci.item.price,
-                quantity=ci.quantity,
-                subtotal=Decimal(ci.quantity) * Decimal(ci.item.price),
-            )
-        )
+    db.session.execute(
+        insert(OrderItem).values([
+            {
+                "order_id": new_order.id,
+                "item_id": line.item_id,
+                "name": line.title,
+                "unit": line.unit,
+                "unit_price": Decimal(str(line.price)),
+                "quantity": line.quantity,
+                "subtotal": subtotal,
+            }
+            for line, subtotal in zip(lines, subtotals)
+        ])
+    )
 
-    CartItem.query.filter_by(user_phone=user.phone).delete()
+    current_app.cart_store.clear_on_commit(user.phone)
+    invalidate_cart(user.phone)
 
-    db.session.add(OrderStatusLog(order_id=new_order.id, status="pending", updated_by=user.phone))
-    db.session.add(
-        OrderActionLog(
-            order_id=new_order.id,
-            action_type="order_created",
-            actor_phone=user.phone,
-            details="Order placed",
-        )
+    record_event(
+        new_order.id,
+        OrderEventKind.ORDER_CREATED,
+        user.phone,
+        status="pending",
+        route=(shop_id, user.phone),
     )
+    bump_shop_stats(shop_id, orders_placed=1)
     return new_order
 
 
 def confirm_modified_order_service(user, order: Order) -> Decimal:
     if not order or order.user_phone != user.phone:
         raise ValidationError("Unauthorized")
-    if order.status != "awaiting_consumer_confirmation":
+    if not allowed("confirm_modified", order.status):
         raise ValidationError("Order not in modifiable state")
     old_amount = Decimal(order.total_amount)
     new_amount = Decimal(order.final_amount) if order.final_amount else old_amount
+    transition(order, "confirm_modified", total_amount=new_amount)
     refund_amount = Decimal(0)
     if order.payment_mode == "wallet" and new_amount < old_amount:
         delta = old_amount - new_amount
@@ -97,23 +151,13 @@ def confirm_modified_order_service(user, order: Order) -> Decimal:
             type="refund",
             source="order_modify",
         )
-    order.status = "confirmed"
-    order.total_amount = new_amount
-    db.session.add(OrderStatusLog(order_id=order.id, status="confirmed", updated_by=user.phone))
-    db.session.add(
-        OrderActionLog(
-            order_id=order.id,
-            action_type="modification_confirmed",
-            actor_phone=user.phone,
-            details=f"Confirmed modified order. Refund: ₹{float(refund_amount)}",
-        )
-    )
-    db.session.add(
-        OrderMessage(
-            order_id=order.id,
-            sender_phone=user.phone,
-            message="I’ve confirmed the changes. Please proceed.",
-        )
+    record_event(
+        order.id,
+        OrderEventKind.MODIFICATION_CONFIRMED,
+        user.phone,
+        status="confirmed",
+        body=f"Confirmed modified order. Refund: ₹{float(refund_amount)}",
+        route=(order.shop_id, order.user_phone),
     )
     return refund_amount
 
@@ -121,8 +165,9 @@ def confirm_modified_order_service(user, order: Order) -> Decimal:
 def cancel_order_by_consumer(user, order: Order) -> Decimal:
     if not order or order.user_phone != user.phone:
         raise ValidationError("Unauthorized")
-    if order.status in ["cancelled", "delivered"]:
+    if not allowed("cancel", order.status):
         raise ValidationError("Order already closed")
+    transition(order, "cancel")
     refund_amount = Decimal(0)
     if order.payment_mode == "wallet":
         refund_amount = Decimal(order.total_amount)
@@ -133,17 +178,14 @@ def cancel_order_by_consumer(user, order: Order) -> Decimal:
             type="refund",
             source="order_cancel",
         )
-    order.status = "cancelled"
-    db.session.add(OrderStatusLog(order_id=order.id, status="cancelled", updated_by=user.phone))
-    db.session.add(
-        OrderActionLog(
-            order_id=order.id,
-            action_type="order_cancelled",
-            actor_phone=user.phone,
-            details="Cancelled by consumer",
-        )
+    record_event(
+        order.id,
+        OrderEventKind.CANCELLED_BY_CONSUMER,
+        user.phone,
+        status="cancelled",
+        route=(order.shop_id, order.user_phone),
     )
-    db.session.add(OrderMessage(order_id=order.id, sender_phone=user.phone, message="Order cancelled by you."))
+    bump_shop_stats(order.shop_id, orders_cancelled=1)
     return refund_amount
 
 
@@ -0,0 +1,61 @@
+"""
+Postings that move money between two wallets in one step.
+
+Multi-wallet postings lock wallet rows in one global order, vendor wallet
+first and consumer wallet second, so concurrent transfers touching the
+same wallets queue behind each other instead of deadlocking.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from models import db
+from models.wallet import ConsumerWallet, VendorWallet, VendorWalletTransaction, WalletTransaction
+from app.services.consumer.wallet import InsufficientFunds
+
+TWOPLACES = Decimal("0.01")
+
+
+def _to_money(value):
+    return Decimal(str(value)).quantize(TWOPLACES, rounding=ROUND_HALF_UP)
+
+
+def transfer_vendor_to_consumer(vendor_phone: str, consumer_phone: str, amount, *, reference: str, source: str = None) -> Decimal:
+    """Debit ``vendor_phone`` and credit ``consumer_phone`` by ``amount``.
+
+    Both legs are written in the caller's transaction, or neither is.
+    Raises InsufficientFunds before anything is written when the vendor
+    balance does not cover the amount.
+    """
+    amount = _to_money(amount)
+    if amount <= 0:
+        raise ValueError("transfer amount must be positive")
+
+    vendor = VendorWallet.query.filter_by(user_phone=vendor_phone).with_for_update(of=VendorWallet).first()
+    if vendor is None or _to_money(vendor.balance) < amount:
+        raise InsufficientFunds("Insufficient balance")
+    consumer = ConsumerWallet.query.filter_by(user_phone=consumer_phone).with_for_update(of=ConsumerWallet).first()
+    if consumer is None:
+        consumer = ConsumerWallet(user_phone=consumer_phone, balance=_to_money("0"))
+        db.session.add(consumer)
+
+    vendor.balance = _to_money(vendor.balance) - amount
+    consumer.balance = _to_money(consumer.balance) + amount
+    db.session.add_all([
+        VendorWalletTransaction(
+            user_phone=vendor_phone,
+            amount=amount,
+            type="debit",
+            reference=reference,
+            status="success",
+        ),
+        WalletTransaction(
+            user_phone=consumer_phone,
+            amount=amount,
+            type="refund",
+            reference=reference,
+            status="success",
+            source=source,
+        ),
+    ])
+    return amount
+
+
+__all__ = ["transfer_vendor_to_consumer"]
@@ -0,0 +1,85 @@
+"""
+Move closed orders out of the hot tables.
+
+An order is archived once it is delivered, cancelled or return-completed
+and has not changed for ``ORDER_ARCHIVE_AFTER_DAYS``. Each batch copies the
+order and every child row into the ``*_archive`` tables with one
+``INSERT ... SELECT`` per table, deletes the hot rows, and commits, so a
+run can be stopped at any point and resumed.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, text
+from models import db
+from models.order import Order
+from models.order_archive import ARCHIVE_TABLES, ARCHIVED_STATUSES
+from app.utils import transactional
+
+
+def _archivable(cutoff):
+    # Legacy rows may never have had updated_at set.
+    return Order.status.in_(ARCHIVED_STATUSES), func.coalesce(Order.updated_at, Order.created_at) < cutoff
+
+
+def _ensure_partitions(order_ids) -> None:
+    """Create the monthly ``order_archive`` partitions a batch writes into.
+
+    Only PostgreSQL partitions the archive (by range of ``created_at``);
+    elsewhere this is a no-op.
+    """
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    months = db.session.execute(
+        select(func.date_trunc("month", Order.created_at)).where(Order.id.in_(order_ids)).distinct()
+    ).scalars()
+    for start in months:
+        if start is None:
+            continue  # NULL created_at lands in the default partition
+        end = (start + timedelta(days=32)).replace(day=1)
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS order_archive_{start:%Y_%m} PARTITION OF order_archive "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+
+
+def _archive_batch(cutoff, batch_size: int) -> int:
+    order_ids = db.session.execute(
+        select(Order.id).where(*_archivable(cutoff)).order_by(Order.id).limit(batch_size).with_for_update()
+    ).scalars().all()
+    if not order_ids:
+        return 0
+    _ensure_partitions(order_ids)
+    for hot, cold in ARCHIVE_TABLES:
+        key = hot.c.id if hot is Order.__table__ else hot.c.order_id
+        db.session.execute(insert(cold).from_select(list(cold.c), select(*hot.c).where(key.in_(order_ids))))
+    # Children first so the foreign keys to order.id hold throughout.
+    for hot, _ in reversed(ARCHIVE_TABLES):
+        key = hot.c.id if hot is Order.__table__ else hot.c.order_id
+        db.session.execute(delete(hot).where(key.in_(order_ids)).execution_options(synchronize_session=False))
+    return len(order_ids)
+
+
+def archive_closed_orders(older_than_days: int = None, batch_size: int = None, max_batches: int = None) -> int:
+    """Archive closed orders idle for ``older_than_days``; return how many moved.
+
+    Defaults come from ``ORDER_ARCHIVE_AFTER_DAYS`` and
+    ``ORDER_ARCHIVE_BATCH_SIZE``. Every batch is its own transaction.
+    """
+    config = current_app.config
+    if older_than_days is None:
+        older_than_days = config["ORDER_ARCHIVE_AFTER_DAYS"]
+    batch_size = batch_size or config["ORDER_ARCHIVE_BATCH_SIZE"]
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transactional("Failed to archive orders"):
+            count = _archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+    return moved
+
+
+__all__ = ["archive_closed_orders"]
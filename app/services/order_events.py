@@ -0,0 +1,140 @@
+"""
+Writers for the ``order_event`` journal.
+
+Every order mutation appends one event instead of separate status-log,
+action-log and chat rows; ``OrderStatusLog``, ``OrderActionLog`` and
+``OrderMessage`` are read-only projections of the journal. Status changes
+and chat messages are also pushed to the order streams after commit (see
+``app/utils/order_stream.py``).
+"""
+from sqlalchemy import insert, or_, select
+from models import db
+from models.order import EVENT_CATALOG, EVENT_MESSAGE_KINDS, Order, OrderEvent, OrderEventKind, OrderMessage
+from app.utils.order_stream import queue_publish
+
+_STREAMED_MESSAGE_KINDS = [int(kind) for kind in EVENT_MESSAGE_KINDS]
+
+
+def event_row(order_id: int, kind: OrderEventKind, actor: str, status: str = None, body: str = None) -> dict:
+    return {"order_id": order_id, "kind": int(kind), "status": status, "actor": actor, "body": body}
+
+
+def streamed_events():
+    """Criterion for journal rows that are pushed to order streams."""
+    return or_(OrderEvent.status.is_not(None), OrderEvent.kind.in_(_STREAMED_MESSAGE_KINDS))
+
+
+def stream_payload(row) -> dict:
+    """The SSE ``data`` of an ``order_event`` row."""
+    kind = OrderEventKind(row.kind)
+    message = None
+    if kind in EVENT_MESSAGE_KINDS:
+        message = EVENT_CATALOG[kind][2] or row.body
+    return {
+        "id": row.id,
+        "order_id": row.order_id,
+        "type": EVENT_CATALOG[kind][0],
+        "status": row.status,
+        "actor": row.actor,
+        "message": message,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def backlog_events(after_id: int, limit: int, *scope) -> list:
+    """Streamed journal rows after ``after_id``, oldest first.
+
+    ``scope`` holds criteria on ``Order`` that pick the subscriber's orders.
+    """
+    rows = db.session.execute(
+        select(
+            OrderEvent.id,
+            OrderEvent.order_id,
+            OrderEvent.kind,
+            OrderEvent.status,
+            OrderEvent.actor,
+            OrderEvent.body,
+            OrderEvent.created_at,
+        )
+        .join(Order, Order.id == OrderEvent.order_id)
+        .where(OrderEvent.id > after_id, streamed_events(), *scope)
+        .order_by(OrderEvent.id)
+        .limit(limit)
+    )
+    return [stream_payload(row) for row in rows]
+
+
+def order_messages(order_id: int, since_id: int = 0, limit: int = None) -> list:
+    """Chat messages of an order after ``since_id``, oldest first."""
+    query = (
+        OrderMessage.query.filter(OrderMessage.order_id == order_id, OrderMessage.id > since_id)
+        .order_by(OrderMessage.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def stream_channels(shop_id: int, user_phone: str):
+    return (f"shop:{shop_id}", f"consumer:{user_phone}")
+
+
+def _streamed(row: dict) -> bool:
+    return row["status"] is not None or row["kind"] in _STREAMED_MESSAGE_KINDS
+
+
+def record_events(rows, routes=None) -> None:
+    """Append ``event_row`` dicts with one multi-row INSERT.
+
+    ``routes`` maps order ids to ``(shop_id, user_phone)``. Streamed rows of
+    routed orders are published after commit, reading their ids back with
+    RETURNING; everything else is only journaled.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    routes = routes or {}
+    if not any(row["order_id"] in routes and _streamed(row) for row in rows):
+        db.session.execute(insert(OrderEvent).values(rows))
+        return
+    inserted = db.session.execute(
+        insert(OrderEvent)
+        .values(rows)
+        .returning(
+            OrderEvent.id,
+            OrderEvent.order_id,
+            OrderEvent.kind,
+            OrderEvent.status,
+            OrderEvent.actor,
+            OrderEvent.body,
+            OrderEvent.created_at,
+        )
+    ).all()
+    for row in sorted(inserted, key=lambda r: r.id):
+        if row.order_id in routes and (row.status is not None or row.kind in _STREAMED_MESSAGE_KINDS):
+            queue_publish(stream_channels(*routes[row.order_id]), stream_payload(row))
+
+
+def record_event(
+    order_id: int,
+    kind: OrderEventKind,
+    actor: str,
+    status: str = None,
+    body: str = None,
+    route: tuple = None,
+) -> None:
+    """Journal one event; pass ``route=(shop_id, user_phone)`` to stream it."""
+    record_events([event_row(order_id, kind, actor, status, body)], {order_id: route} if route else None)
+
+
+__all__ = [
+    "OrderEventKind",
+    "backlog_events",
+    "event_row",
+    "order_messages",
+    "record_event",
+    "record_events",
+    "stream_channels",
+    "stream_payload",
+    "streamed_events",
+]
@@ -0,0 +1,157 @@
+"""
+Order status transitions, compiled once at import time.
+
+Every status change runs as a single compare-and-set::
+
+    UPDATE "order" SET status=:target, version=version+1, ...
+    WHERE id=:id AND status IN (:sources) [AND version=:expected]
+    RETURNING version
+
+so two racing requests cannot both move the same order, and no row lock
+is held while the caller's side effects (refunds, credits) run.
+"""
+from types import MappingProxyType
+from typing import NamedTuple
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from models import db
+from models.order import Order, OrderStatus
+
+
+class TransitionError(Exception):
+    """The order's current status does not allow the requested action."""
+
+
+class TransitionConflict(TransitionError):
+    """The order changed between being read and being updated."""
+
+
+class Transition(NamedTuple):
+    action: str
+    sources: frozenset
+    mask: int
+    target: OrderStatus
+    message: str
+
+
+S = OrderStatus
+
+# Statuses from which an order can still be cancelled. Rejected orders stay
+# cancellable so a wallet payment can still be refunded.
+CANCELLABLE = (
+    S.PENDING,
+    S.ACCEPTED,
+    S.REJECTED,
+    S.AWAITING_CONSUMER_CONFIRMATION,
+    S.CONFIRMED,
+    S.MODIFIED,
+)
+
+_RULES = (
+    ("accept", (S.PENDING,), S.ACCEPTED, "Only pending orders can be accepted"),
+    ("reject", (S.PENDING,), S.REJECTED, "Only pending orders can be rejected"),
+    ("deliver", (S.PENDING, S.ACCEPTED, S.CONFIRMED), S.DELIVERED, "Order cannot be delivered in its current state"),
+    (
+        "modify",
+        (S.PENDING, S.ACCEPTED, S.CONFIRMED, S.AWAITING_CONSUMER_CONFIRMATION),
+        S.AWAITING_CONSUMER_CONFIRMATION,
+        "Cannot modify a closed order",
+    ),
+    ("confirm_modified", (S.AWAITING_CONSUMER_CONFIRMATION,), S.CONFIRMED, "Order not in modifiable state"),
+    ("cancel", CANCELLABLE, S.CANCELLED, "Order already closed"),
+    ("accept_return", (S.DELIVERED,), S.RETURN_ACCEPTED, "Only delivered orders can be returned"),
+    ("complete_return", (S.RETURN_ACCEPTED,), S.RETURN_COMPLETED, "Return not accepted yet"),
+)
+
+
+def _compile(rules):
+    table = {}
+    for action, sources, target, message in rules:
+        mask = 0
+        for status in sources:
+            mask |= 1 << status
+        table[action] = Transition(action, frozenset(sources), mask, target, message)
+    return MappingProxyType(table)
+
+
+TRANSITIONS = _compile(_RULES)
+
+# Vendor-facing status names accepted by ``POST /vendor/orders/<id>/status``.
+VENDOR_STATUS_ACTIONS = MappingProxyType({
+    "accepted": "accept",
+    "rejected": "reject",
+    "delivered": "deliver",
+})
+
+
+def _code(status) -> int:
+    if isinstance(status, int):
+        return status
+    return OrderStatus[status.upper()] if status else 0
+
+
+def allowed(action: str, status) -> bool:
+    """O(1) check of ``status`` (label or code) against ``action``."""
+    return bool(TRANSITIONS[action].mask >> _code(status) & 1)
+
+
+def transition(order: Order, action: str, expected_version: int = None, **values) -> Order:
+    """Move ``order`` through ``action`` with one conditional UPDATE.
+
+    ``values`` are written in the same statement. ``order`` is updated in
+    place without being marked dirty. Raises TransitionError if the loaded
+    status does not allow ``action`` and TransitionConflict if the row
+    changed underneath (status or ``expected_version`` no longer match).
+    """
+    rule = TRANSITIONS[action]
+    if not allowed(action, order.status):
+        raise TransitionError(rule.message)
+    stmt = (
+        update(Order)
+        .where(Order.id == order.id, Order.status.in_([int(s) for s in rule.sources]))
+        .values(status=int(rule.target), version=Order.version + 1, **values)
+        .returning(Order.version)
+        .execution_options(synchronize_session=False)
+    )
+    if expected_version is not None:
+        stmt = stmt.where(Order.version == expected_version)
+    row = db.session.execute(stmt).first()
+    if row is None:
+        raise TransitionConflict("Order was changed by another request; reload and retry")
+    set_committed_value(order, "status", rule.target.label)
+    set_committed_value(order, "version", row.version)
+    for key, value in values.items():
+        set_committed_value(order, key, value)
+    return order
+
+
+def transition_many(action: str, order_ids, *criteria) -> list:
+    """Apply ``action`` to every order in ``order_ids`` with one UPDATE.
+
+    Extra ``criteria`` narrow the statement (e.g. a shop filter). Returns
+    the ids that actually moved; the rest were in a status ``action`` does
+    not accept. Loaded ``Order`` instances are not refreshed.
+    """
+    rule = TRANSITIONS[action]
+    if not order_ids:
+        return []
+    stmt = (
+        update(Order)
+        .where(Order.id.in_(list(order_ids)), Order.status.in_([int(s) for s in rule.sources]), *criteria)
+        .values(status=int(rule.target), version=Order.version + 1)
+        .returning(Order.id)
+        .execution_options(synchronize_session=False)
+    )
+    return [row.id for row in db.session.execute(stmt)]
+
+
+__all__ = [
+    "TransitionError",
+    "TransitionConflict",
+    "TRANSITIONS",
+    "VENDOR_STATUS_ACTIONS",
+    "CANCELLABLE",
+    "allowed",
+    "transition",
+    "transition_many",
+]
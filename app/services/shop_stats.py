@@ -0,0 +1,193 @@
+"""
+Incremental per-shop daily rollups (``shop_daily_stats``).
+
+Order services call ``bump_shop_stats`` in the same transaction as the
+change it counts, so the rollup commits or rolls back with the order.
+Days are UTC dates. ``rebuild_shop_stats`` recomputes a range of days from
+the order journal (hot and archived) with a handful of GROUP BY queries
+per chunk of days.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import Date, and_, case, delete, func, insert, select, update
+from models import db
+from models.order import Order, OrderEvent, OrderEventKind, OrderItem, OrderReturn
+from models.order_archive import order_archive, order_event_archive, order_item_archive, order_return_archive
+from models.shop import ShopDailyStats
+from app.utils import transactional
+
+COUNTERS = (
+    "orders_placed",
+    "orders_delivered",
+    "orders_rejected",
+    "orders_cancelled",
+    "orders_returned",
+    "gmv",
+    "wallet_gmv",
+    "cash_gmv",
+    "items_delivered",
+    "returns_value",
+)
+
+# (order, order_event, order_return, order_item) for each store the rebuild reads.
+_SOURCES = (
+    (Order.__table__, OrderEvent.__table__, OrderReturn.__table__, OrderItem.__table__),
+    (order_archive, order_event_archive, order_return_archive, order_item_archive),
+)
+
+
+def _upsert(shop_id, day, deltas: dict) -> None:
+    table = ShopDailyStats.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(shop_id=shop_id, day=day, **{**dict.fromkeys(COUNTERS, 0), **deltas})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.shop_id, table.c.day],
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+        )
+        db.session.execute(stmt)
+        return
+    result = db.session.execute(
+        update(table)
+        .where(table.c.shop_id == shop_id, table.c.day == day)
+        .values({name: table.c[name] + value for name, value in deltas.items()})
+    )
+    if not result.rowcount:
+        db.session.execute(insert(table).values(shop_id=shop_id, day=day, **{**dict.fromkeys(COUNTERS, 0), **deltas}))
+
+
+def bump_shop_stats(shop_id: int, day=None, **deltas) -> None:
+    """Add ``deltas`` (counter name -> amount) to ``shop_id``'s row for ``day``.
+
+    ``day`` defaults to today (UTC). One upsert statement.
+    """
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f"unknown shop stats counters: {sorted(unknown)}")
+    deltas = {name: value for name, value in deltas.items() if value}
+    if deltas:
+        _upsert(shop_id, day or datetime.utcnow().date(), deltas)
+
+
+def delivery_deltas(orders) -> dict:
+    """Counters for delivering ``orders``.
+
+    ``orders`` are rows with ``payment_mode``, ``final_amount``,
+    ``total_amount`` and ``item_count``.
+    """
+    deltas = dict.fromkeys(("orders_delivered", "items_delivered"), 0)
+    deltas.update(dict.fromkeys(("gmv", "wallet_gmv", "cash_gmv"), Decimal(0)))
+    for order in orders:
+        amount = Decimal(str(order.final_amount or order.total_amount))
+        deltas["orders_delivered"] += 1
+        deltas["items_delivered"] += order.item_count or 0
+        deltas["gmv"] += amount
+        deltas["wallet_gmv" if order.payment_mode == "wallet" else "cash_gmv"] += amount
+    return deltas
+
+
+def _journal_counts(order, event, start, end):
+    day = func.date(event.c.created_at, type_=Date)
+    amount = func.coalesce(order.c.final_amount, order.c.total_amount)
+    delivered = event.c.status == "delivered"
+
+    def _sum(condition, value=1):
+        return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+    return db.session.execute(
+        select(
+            order.c.shop_id,
+            day.label("day"),
+            _sum(event.c.kind == int(OrderEventKind.ORDER_CREATED)).label("orders_placed"),
+            _sum(delivered).label("orders_delivered"),
+            _sum(event.c.status == "rejected").label("orders_rejected"),
+            _sum(event.c.status == "cancelled").label("orders_cancelled"),
+            _sum(event.c.status == "return_completed").label("orders_returned"),
+            _sum(delivered, amount).label("gmv"),
+            _sum(and_(delivered, order.c.payment_mode == "wallet"), amount).label("wallet_gmv"),
+            _sum(and_(delivered, order.c.payment_mode != "wallet"), amount).label("cash_gmv"),
+            _sum(delivered, order.c.item_count).label("items_delivered"),
+        )
+        .join(order, order.c.id == event.c.order_id)
+        .where(event.c.created_at >= start, event.c.created_at < end)
+        .where((event.c.kind == int(OrderEventKind.ORDER_CREATED)) | event.c.status.in_(
+            ["delivered", "rejected", "cancelled", "return_completed"]
+        ))
+        .group_by(order.c.shop_id, day)
+    ).mappings()
+
+
+def _returns_value(order, event, order_return, order_item, start, end):
+    day = func.date(event.c.created_at, type_=Date)
+    return db.session.execute(
+        select(
+            order.c.shop_id,
+            day.label("day"),
+            func.coalesce(func.sum(order_item.c.unit_price * order_return.c.quantity), 0).label("returns_value"),
+        )
+        .select_from(event)
+        .join(order, order.c.id == event.c.order_id)
+        .join(order_return, and_(order_return.c.order_id == event.c.order_id, order_return.c.status == "completed"))
+        .join(
+            order_item,
+            and_(order_item.c.order_id == order_return.c.order_id, order_item.c.item_id == order_return.c.item_id),
+        )
+        .where(event.c.status == "return_completed", event.c.created_at >= start, event.c.created_at < end)
+        .group_by(order.c.shop_id, day)
+    ).mappings()
+
+
+def _rebuild_chunk(start, end) -> int:
+    totals = {}
+    for order, event, order_return, order_item in _SOURCES:
+        rows = list(_journal_counts(order, event, start, end))
+        rows += _returns_value(order, event, order_return, order_item, start, end)
+        for row in rows:
+            entry = totals.setdefault((row["shop_id"], row["day"]), dict.fromkeys(COUNTERS, 0))
+            for name in COUNTERS:
+                if name in row:
+                    entry[name] += row[name]
+    db.session.execute(
+        delete(ShopDailyStats).where(ShopDailyStats.day >= start.date(), ShopDailyStats.day < end.date())
+    )
+    if totals:
+        db.session.execute(
+            insert(ShopDailyStats),
+            [{"shop_id": shop_id, "day": day, **counters} for (shop_id, day), counters in totals.items()],
+        )
+    return len(totals)
+
+
+def rebuild_shop_stats(since=None, until=None, chunk_days: int = 31) -> int:
+    """Recompute ``shop_daily_stats`` for the days in ``[since, until)``.
+
+    Defaults cover the whole journal. Each chunk of ``chunk_days`` days is
+    aggregated in SQL and replaced in its own transaction. Returns the
+    number of rows written.
+    """
+    if since is None or until is None:
+        first, last = None, None
+        for _, event, _, _ in _SOURCES:
+            low, high = db.session.execute(select(func.min(event.c.created_at), func.max(event.c.created_at))).one()
+            first = low if first is None or (low is not None and low < first) else first
+            last = high if last is None or (high is not None and high > last) else last
+        if first is None:
+            return 0
+        since = since or first.date()
+        until = until or last.date() + timedelta(days=1)
+    start = datetime.combine(since, datetime.min.time())
+    stop = datetime.combine(until, datetime.min.time())
+    written = 0
+    while start < stop:
+        end = min(start + timedelta(days=chunk_days), stop)
+        with transactional("Failed to rebuild shop stats"):
+            written += _rebuild_chunk(start, end)
+        start = end
+    return written
+
+
+__all__ = ["COUNTERS", "bump_shop_stats", "delivery_deltas", "rebuild_shop_stats"]
@@ -0,0 +1,22 @@
+import logging
+from celery import shared_task
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=300)
+def archive_closed_orders_task(self, older_than_days: int = None, max_batches: int = None) -> int:
+    """Periodic archival of closed orders; see app/services/order_archive.py."""
+    from app import create_app
+    from app.services.order_archive import archive_closed_orders
+
+    app = current_app._get_current_object() if current_app else create_app()
+    with app.app_context():
+        try:
+            moved = archive_closed_orders(older_than_days, max_batches=max_batches)
+        except Exception as exc:
+            logger.error("Order archival failed: %s", exc)
+            raise self.retry(exc=exc)
+        logger.info("Archived %s orders", moved)
+        return moved
@@ -3,6 +3,7 @@ from celery import shared_task
 from models import db
 from models.item import Item
 from app.utils import transactional
+from app.utils.catalog_cache import bump_catalog_version
 from flask import current_app
 
 logger = logging.getLogger(__name__)
@@ -48,5 +49,6 @@ def process_bulk_items_task(self, shop_id: int, dataframe_dict: dict) -> int:
                 logger.error("Failed to add item row: %s", exc)
                 continue
         with transactional("Failed to bulk upload items"):
-            pass
+            if created:
+                bump_catalog_version(shop_id)
         return created
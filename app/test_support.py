@@ -2,10 +2,11 @@ from flask import Blueprint, request, jsonify
 from app.utils.responses import ok, error
 from app.utils import auth_required
 from app.utils import role_required
+from app.utils.cart_cache import invalidate_cart
 import logging
 from app.services.consumer.wallet import adjust_consumer_balance, InsufficientFunds
 from app.services.vendor.wallet import adjust_vendor_balance
-from app.utils import create_access_token, create_refresh_token
+from app.utils import create_access_token, create_refresh_token, new_token_family
 from app.services.consumer.orders import (
     confirm_order_service,
     confirm_modified_order_service,
@@ -21,7 +22,7 @@ from models.user import UserProfile
 from models.shop import Shop
 from models.item import Item
 from models.cart import CartItem
-from models.order import Order, OrderItem, OrderReturn
+from models.order import Order, OrderItem, OrderReturn, items_summary
 from decimal import Decimal as D
 
 
@@ -62,9 +63,10 @@ def __login_stub():
     if not UserProfile.query.filter_by(phone=phone).first():
         db.session.add(UserProfile(phone=phone, role=role))
         db.session.commit()
+    family = new_token_family()
     return ok({
-        "access": create_access_token(phone, role),
-        "refresh": create_refresh_token(phone),
+        "access": create_access_token(phone, role, family=family),
+        "refresh": create_refresh_token(phone, family=family),
     })
 
 
@@ -142,6 +144,7 @@ def __seed_basic():
     db.session.flush()
     qty = int(p.get("cart_qty", 1))
     db.session.add(CartItem(user_phone=cphone, shop_id=shop.id, item_id=itm.id, quantity=qty))
+    invalidate_cart(cphone)
     db.session.commit()
     return ok({"shop_id": shop.id, "item_id": itm.id, "cart_qty": qty})
 
@@ -245,6 +248,7 @@ def __seed_order_paid():
         payment_status="paid" if j.get("wallet_paid", True) else "unpaid",
         total_amount=0,
         final_amount=0,
+        **items_summary((it.get("title", "A"), int(D(str(it.get("qty", 1))))) for it in items),
     )
     db.session.add(order)
     db.session.flush()
@@ -2,9 +2,12 @@ from .responses import ok, error, error_response, internal_error_response
 from .auth import auth_required, role_required
 from .validation import has_required_fields, validate_schema
 from .db import transactional
+from .idempotency import idempotent
+from .principal_cache import invalidate_principal
 from .jwt import (
     create_access_token,
     create_refresh_token,
+    new_token_family,
     decode_token,
     TokenError,
 )
@@ -19,10 +22,13 @@ __all__ = [
     'role_required',
     'create_access_token',
     'create_refresh_token',
+    'new_token_family',
     'decode_token',
     'TokenError',
     'has_required_fields',
     'validate_schema',
     'transactional',
+    'idempotent',
+    'invalidate_principal',
     'normalize_phone',
 ]
@@ -1,9 +1,10 @@
 from functools import wraps
-from flask import request, g
+from flask import request, g, current_app
 from .responses import error
-from app.auth.permissions import role_has_scope
+from app.auth.table import Requirement, requirements_of
 from .jwt import decode_token, TokenError
 from models.user import UserProfile
+from .principal_cache import snapshot, hydrate
 
 
 def auth_required(func):
@@ -17,13 +18,21 @@ def auth_required(func):
             payload = decode_token(token, expected_type="access")
         except TokenError as e:
             return error(str(e), status=401)
+        if current_app.revocations.is_revoked(payload):
+            return error("token revoked", status=401)
 
         g.phone = payload["sub"]
         g.role = payload.get("role")
         request.phone = g.phone
-        user = UserProfile.query.filter_by(phone=g.phone).first()
-        if not user:
-            return error("Invalid user", status=401)
+        cache = current_app.principal_cache
+        cached = cache.get(g.phone)
+        if cached is not None:
+            user = hydrate(cached)
+        else:
+            user = UserProfile.query.filter_by(phone=g.phone).first()
+            if not user:
+                return error("Invalid user", status=401)
+            cache.set(g.phone, snapshot(user))
         request.user = user
         return func(*args, **kwargs)
 
@@ -34,31 +43,44 @@ def _to_set(obj):
     return set(obj) if isinstance(obj, (list, tuple, set)) else {obj}
 
 
+def _current_role():
+    db_role = getattr(getattr(request, "user", None), "role", None)
+    return db_role or getattr(g, "role", None)
+
+
 def role_required(required):
-    """Authorize based on user role or scoped action."""
-    required_set = _to_set(required)
+    """Authorize based on user role or scoped action.
+
+    The requirement is resolved to a set of roles at decoration time. Once
+    ``app.authz_table`` is compiled, the first layer to run for an endpoint
+    checks the endpoint's combined bitmask and later layers are skipped.
+    """
+    requirement = Requirement(_to_set(required))
 
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
-            role = getattr(g, "role", None)
-            db_role = getattr(getattr(request, "user", None), "role", None)
-            if db_role:
-                role = db_role
+            table = getattr(current_app, "authz_table", None)
+            policy = table.get(request.endpoint) if table is not None else None
+            if policy is not None and requirement in policy.requirements:
+                if getattr(request, "authorized_endpoint", None) == request.endpoint:
+                    return fn(*args, **kwargs)
+                role = _current_role()
+                if not role:
+                    return error("Role missing", status=403)
+                if not table.allows(policy, role):
+                    return error("Forbidden", status=403)
+                request.authorized_endpoint = request.endpoint
+                return fn(*args, **kwargs)
+
+            role = _current_role()
             if not role:
                 return error("Role missing", status=403)
-            for entry in required_set:
-                if ":" in entry:
-                    r, action = entry.split(":", 1)
-                    if role == r and role_has_scope(role, action):
-                        break
-                else:
-                    if role == entry:
-                        break
-            else:
+            if role not in requirement.roles:
                 return error("Forbidden", status=403)
             return fn(*args, **kwargs)
 
+        wrapper._authz_requirements = requirements_of(fn) + (requirement,)
         return wrapper
 
     return decorator
@@ -0,0 +1,64 @@
+"""
+Per-consumer cache of the ``/cart/view`` response.
+
+Entries are keyed by phone and dropped after the transaction that changed
+the cart (or the price or availability of an item in it) commits; see
+``invalidate_cart``. ``CART_CACHE_URL`` picks the backend: empty disables the
+cache, ``memory://`` keeps it per process (one worker only, since other
+workers would never hear of the invalidation) and a Redis URL shares it.
+"""
+from sqlalchemy import event
+from flask import current_app
+from models import db
+from .ttl_cache import create_ttl_cache
+
+_PENDING_KEY = "cart_cache_pending"
+
+
+def create_cart_cache(config):
+    """Build the cart cache selected by ``CART_CACHE_URL``, or None."""
+    url = config.get("CART_CACHE_URL")
+    if not url:
+        return None
+    return create_ttl_cache(
+        url,
+        int(config.get("CART_CACHE_TTL_SEC", 30)),
+        int(config.get("CART_CACHE_MAX_ENTRIES", 10000)),
+        prefix="cart:",
+    )
+
+
+def invalidate_cart(*phones) -> None:
+    """Drop the cached carts of ``phones`` once the current transaction commits."""
+    if getattr(current_app, "cart_cache", None) is not None:
+        db.session.info.setdefault(_PENDING_KEY, set()).update(p for p in phones if p)
+
+
+def invalidate_item_carts(item_id) -> None:
+    """Drop the cached carts holding ``item_id`` after its price or availability changed."""
+    if getattr(current_app, "cart_cache", None) is None:
+        return
+    invalidate_cart(*current_app.cart_store.holders(item_id))
+
+
+def _drop_invalidated(session):
+    phones = session.info.pop(_PENDING_KEY, None)
+    cache = getattr(current_app, "cart_cache", None)
+    if not phones or cache is None:
+        return
+    for phone in phones:
+        try:
+            cache.delete(phone)
+        except Exception as exc:  # the entry still expires after CART_CACHE_TTL_SEC
+            current_app.logger.warning("Cart cache invalidation failed: %s", exc)
+
+
+def _forget_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    app.cart_cache = create_cart_cache(app.config)
+    if not event.contains(db.session, "after_commit", _drop_invalidated):
+        event.listen(db.session, "after_commit", _drop_invalidated)
+        event.listen(db.session, "after_rollback", _forget_pending)
@@ -0,0 +1,482 @@
+"""
+Pluggable storage for consumer carts, chosen by ``CART_STORE_URL``:
+
+- ``sql://`` (default) keeps the ``cart_item`` rows; changes are staged on
+  ``db.session`` and committed by the caller's transaction.
+- ``memory://`` keeps carts in the worker process, for single-worker setups.
+- ``redis://host:6379/0`` keeps one JSON document per cart, shared by every
+  worker.
+
+With the document stores, cart edits never touch the relational database;
+the cart is only joined to ``item`` when it is viewed or checked out, and
+carts untouched for ``CART_TTL_SEC`` expire. ``flask carts-to-store`` moves
+existing ``cart_item`` rows into the configured store.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import event, literal, select, union_all
+from flask import current_app
+from models import db, BIGINT
+from models.cart import CartItem
+from models.item import Item
+from models.shop import Shop
+
+CART_OK = "ok"
+CART_OTHER_SHOP = "other_shop"
+CART_LIMIT = "limit"
+CART_MISSING = "missing"
+
+_PENDING_KEY = "cart_store_pending_clear"
+
+
+def _dialect_insert():
+    """``insert`` with ``on_conflict_do_update``, or None on other backends."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def _other_shop(phone, shop_id, removed):
+    """Whether the cart keeps a line from a shop other than ``shop_id``."""
+    table = CartItem.__table__
+    query = select(table.c.id).where(table.c.user_phone == phone, table.c.shop_id != shop_id)
+    if removed:
+        query = query.where(table.c.item_id.not_in(removed))
+    return query.exists()
+
+
+def _upsert_lines(insert, phone, shop_id, source, removed):
+    """``INSERT INTO cart_item SELECT`` the ``(item_id, quantity)`` rows of
+    ``source``, or nothing when the cart holds another shop's lines."""
+    now = datetime.utcnow()
+    rows = select(
+        literal(phone).label("user_phone"),
+        literal(shop_id, BIGINT).label("shop_id"),
+        source.c.item_id,
+        source.c.quantity,
+        literal(now).label("added_at"),
+        literal(now).label("last_updated"),
+    ).where(~_other_shop(phone, shop_id, removed))
+    return insert(CartItem.__table__).from_select(
+        ["user_phone", "shop_id", "item_id", "quantity", "added_at", "last_updated"], rows
+    )
+
+
+class SQLCartStore:
+    """Carts as ``cart_item`` rows, staged on the caller's transaction."""
+
+    def lines(self, phone: str):
+        return (
+            db.session.query(CartItem.item_id, CartItem.shop_id, CartItem.quantity)
+            .filter(CartItem.user_phone == phone)
+            .order_by(CartItem.id)
+            .all()
+        )
+
+    def item_lines(self, phone: str, *columns, lock: bool = False):
+        """Cart lines joined to ``item`` and ``shop`` in one statement.
+
+        Rows carry ``line_id``, ``item_id``, ``shop_id``, ``quantity`` and
+        ``columns``; cart order, or item-id order with the item rows locked.
+        """
+        query = (
+            db.session.query(
+                CartItem.id.label("line_id"),
+                CartItem.item_id,
+                CartItem.shop_id,
+                CartItem.quantity,
+                *columns,
+            )
+            .join(Item, Item.id == CartItem.item_id)
+            .join(Shop, Shop.id == CartItem.shop_id)
+            .filter(CartItem.user_phone == phone)
+        )
+        if lock:
+            query = query.order_by(Item.id, CartItem.id).with_for_update(of=Item)
+        else:
+            query = query.order_by(CartItem.id)
+        return query.all()
+
+    def add(self, phone: str, item_id: int, shop_id: int, quantity: int, max_quantity: int) -> str:
+        """Add ``quantity`` of an item in one ``INSERT ... ON CONFLICT``.
+
+        The insert selects no row while the cart holds another shop's lines,
+        and the conflict update only applies within ``max_quantity``, so a
+        double tap can neither duplicate the line nor overshoot the limit.
+        """
+        insert = _dialect_insert()
+        if insert is None:
+            return self._add_rows(phone, item_id, shop_id, quantity, max_quantity)
+        table = CartItem.__table__
+        source = select(literal(item_id, BIGINT).label("item_id"), literal(quantity).label("quantity"))
+        stmt = _upsert_lines(insert, phone, shop_id, source.subquery(), ())
+        total = table.c.quantity + stmt.excluded.quantity
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_phone, table.c.item_id],
+            set_={"quantity": total, "last_updated": stmt.excluded.last_updated},
+            where=total <= max_quantity,
+        )
+        if db.session.execute(stmt.returning(table.c.id)).first():
+            return CART_OK
+        # Nothing written; a second look says why, off the happy path.
+        return CART_OTHER_SHOP if db.session.query(_other_shop(phone, shop_id, ())).scalar() else CART_LIMIT
+
+    def _add_rows(self, phone, item_id, shop_id, quantity, max_quantity):
+        existing = CartItem.query.filter_by(user_phone=phone).all()
+        if any(ci.shop_id != shop_id for ci in existing):
+            return CART_OTHER_SHOP
+        cart_item = next((ci for ci in existing if ci.item_id == item_id), None)
+        if cart_item:
+            if cart_item.quantity + quantity > max_quantity:
+                return CART_LIMIT
+            cart_item.quantity += quantity
+        else:
+            db.session.add(CartItem(user_phone=phone, item_id=item_id, shop_id=shop_id, quantity=quantity))
+        return CART_OK
+
+    def apply(self, phone: str, shop_id, quantities: dict) -> str:
+        """Set several lines at once; a quantity of 0 removes the line.
+
+        ``shop_id`` is the shop of the items being set (``None`` when the
+        batch only removes lines). All-or-nothing: with another shop's lines
+        left in the cart nothing is written.
+        """
+        removed = [item_id for item_id, quantity in quantities.items() if not quantity]
+        kept = {item_id: quantity for item_id, quantity in quantities.items() if quantity}
+        table = CartItem.__table__
+        if kept:
+            insert = _dialect_insert()
+            if insert is None:
+                if db.session.query(_other_shop(phone, shop_id, removed)).scalar():
+                    return CART_OTHER_SHOP
+                for item_id, quantity in kept.items():
+                    CartItem.query.filter_by(user_phone=phone, item_id=item_id).delete()
+                    db.session.add(CartItem(user_phone=phone, item_id=item_id, shop_id=shop_id, quantity=quantity))
+            else:
+                source = union_all(*(
+                    select(literal(item_id, BIGINT).label("item_id"), literal(quantity).label("quantity"))
+                    for item_id, quantity in kept.items()
+                )).subquery()
+                stmt = _upsert_lines(insert, phone, shop_id, source, removed)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.user_phone, table.c.item_id],
+                    set_={"quantity": stmt.excluded.quantity, "last_updated": stmt.excluded.last_updated},
+                )
+                if len(db.session.execute(stmt.returning(table.c.id)).all()) < len(kept):
+                    return CART_OTHER_SHOP
+        if removed:
+            db.session.execute(
+                table.delete().where(table.c.user_phone == phone, table.c.item_id.in_(removed))
+            )
+        return CART_OK
+
+    def set_quantity(self, phone: str, item_id: int, quantity: int) -> str:
+        cart_item = CartItem.query.filter_by(user_phone=phone, item_id=item_id).first()
+        if not cart_item:
+            return CART_MISSING
+        cart_item.quantity = quantity
+        return CART_OK
+
+    def remove(self, phone: str, item_id: int) -> str:
+        cart_item = CartItem.query.filter_by(user_phone=phone, item_id=item_id).first()
+        if not cart_item:
+            return CART_MISSING
+        db.session.delete(cart_item)
+        return CART_OK
+
+    def clear(self, phone: str) -> None:
+        CartItem.query.filter_by(user_phone=phone).delete()
+
+    def clear_on_commit(self, phone: str) -> None:
+        """Empty the cart as part of the current transaction."""
+        self.clear(phone)
+
+    def holders(self, item_id: int):
+        rows = db.session.query(CartItem.user_phone).filter(CartItem.item_id == item_id).distinct()
+        return [phone for phone, in rows]
+
+
+def _empty():
+    return {"shop_id": None, "lines": {}}
+
+
+def _add(cart, item_id, shop_id, quantity, max_quantity):
+    if cart["lines"] and cart["shop_id"] != shop_id:
+        return CART_OTHER_SHOP
+    key = str(item_id)
+    new_quantity = cart["lines"].get(key, 0) + quantity
+    if new_quantity > max_quantity:
+        return CART_LIMIT
+    cart["shop_id"] = shop_id
+    cart["lines"][key] = new_quantity
+    return CART_OK
+
+
+def _set_quantity(cart, item_id, quantity):
+    if str(item_id) not in cart["lines"]:
+        return CART_MISSING
+    cart["lines"][str(item_id)] = quantity
+    return CART_OK
+
+
+def _merge(cart, shop_id, lines):
+    if cart["lines"] and cart["shop_id"] != shop_id:
+        return CART_OTHER_SHOP
+    cart["shop_id"] = shop_id
+    for item_id, quantity in lines:
+        cart["lines"].setdefault(str(item_id), quantity)
+    return CART_OK
+
+
+def _apply(cart, shop_id, quantities):
+    lines = dict(cart["lines"])
+    for item_id, quantity in quantities.items():
+        if quantity:
+            lines[str(item_id)] = quantity
+        else:
+            lines.pop(str(item_id), None)
+    kept = set(lines) - {str(item_id) for item_id, quantity in quantities.items() if quantity}
+    if shop_id is not None and kept and cart["shop_id"] != shop_id:
+        return CART_OTHER_SHOP
+    if shop_id is not None:
+        cart["shop_id"] = shop_id
+    cart["lines"] = lines
+    return CART_OK
+
+
+def _remove(cart, item_id):
+    if cart["lines"].pop(str(item_id), None) is None:
+        return CART_MISSING
+    return CART_OK
+
+
+class _DocumentCartStore:
+    """Carts as ``{"shop_id", "lines": {item_id: quantity}}`` documents.
+
+    Subclasses provide ``_load(phone)`` and ``_modify(phone, change)``, which
+    applies ``change`` to the stored document atomically.
+    """
+
+    def lines(self, phone: str):
+        cart = self._load(phone)
+        return [
+            SimpleNamespace(item_id=int(item_id), shop_id=cart["shop_id"], quantity=quantity)
+            for item_id, quantity in cart["lines"].items()
+        ]
+
+    def item_lines(self, phone: str, *columns, lock: bool = False):
+        """See ``SQLCartStore.item_lines``; ``line_id`` is the item id here."""
+        lines = self.lines(phone)
+        if not lines:
+            return []
+        query = (
+            db.session.query(Item.id, *columns)
+            .join(Shop, Shop.id == Item.shop_id)
+            .filter(Item.id.in_([line.item_id for line in lines]))
+            .order_by(Item.id)
+        )
+        if lock:
+            query = query.with_for_update(of=Item)
+        found = {row.id: row for row in query}
+        if lock:
+            lines = sorted(lines, key=lambda line: line.item_id)
+        return [
+            SimpleNamespace(
+                line_id=line.item_id,
+                item_id=line.item_id,
+                shop_id=line.shop_id,
+                quantity=line.quantity,
+                **{key: value for key, value in found[line.item_id]._mapping.items() if key != "id"},
+            )
+            for line in lines
+            if line.item_id in found
+        ]
+
+    def add(self, phone, item_id, shop_id, quantity, max_quantity):
+        return self._modify(phone, lambda cart: _add(cart, item_id, shop_id, quantity, max_quantity))
+
+    def set_quantity(self, phone, item_id, quantity):
+        return self._modify(phone, lambda cart: _set_quantity(cart, item_id, quantity))
+
+    def remove(self, phone, item_id):
+        return self._modify(phone, lambda cart: _remove(cart, item_id))
+
+    def clear(self, phone):
+        self._modify(phone, lambda cart: cart["lines"].clear() or CART_OK)
+
+    def apply(self, phone, shop_id, quantities):
+        """See ``SQLCartStore.apply``."""
+        return self._modify(phone, lambda cart: _apply(cart, shop_id, quantities))
+
+    def merge(self, phone, shop_id, lines) -> str:
+        """Add ``(item_id, quantity)`` lines the cart does not hold yet.
+
+        Repeating a merge changes nothing, so an interrupted import can be
+        rerun.
+        """
+        return self._modify(phone, lambda cart: _merge(cart, shop_id, lines))
+
+    def clear_on_commit(self, phone: str) -> None:
+        """Empty the cart once the current transaction commits, so a failed
+        checkout leaves it intact."""
+        db.session.info.setdefault(_PENDING_KEY, set()).add(phone)
+
+
+class InMemoryCartStore(_DocumentCartStore):
+    """Single-process carts, evicted ``ttl`` seconds after their last change.
+
+    Holds at most ``max_entries`` carts: once expired ones are swept, the
+    least recently changed cart is dropped to make room.
+    """
+
+    def __init__(self, ttl: int, max_entries: int = 100000, clock=time.time):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._carts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        expired = [phone for phone, (expires_at, _) in self._carts.items() if expires_at <= now]
+        for phone in expired:
+            del self._carts[phone]
+
+    def _load(self, phone):
+        with self._lock:
+            entry = self._carts.get(phone)
+            if entry is None or entry[0] <= self._clock():
+                return _empty()
+            return json.loads(entry[1])
+
+    def _modify(self, phone, change):
+        now = self._clock()
+        with self._lock:
+            entry = self._carts.get(phone)
+            cart = json.loads(entry[1]) if entry and entry[0] > now else _empty()
+            result = change(cart)
+            if result != CART_OK:
+                return result
+            if cart["lines"]:
+                if phone not in self._carts and len(self._carts) >= self._max_entries:
+                    self._sweep(now)
+                    while len(self._carts) >= self._max_entries:
+                        self._carts.popitem(last=False)
+                self._carts[phone] = (now + self._ttl, json.dumps(cart))
+                self._carts.move_to_end(phone)
+            else:
+                self._carts.pop(phone, None)
+            return result
+
+    def holders(self, item_id):
+        key, now = str(item_id), self._clock()
+        with self._lock:
+            return [
+                phone for phone, (expires_at, raw) in self._carts.items()
+                if expires_at > now and key in json.loads(raw)["lines"]
+            ]
+
+
+class RedisCartStore(_DocumentCartStore):
+    """Carts on a Redis-compatible server, one key per consumer.
+
+    Writes use WATCH/MULTI so concurrent taps on the same cart cannot lose
+    an update. ``<prefix>holders:<item_id>`` sets record which carts hold an
+    item so cached cart views can be dropped when it changes.
+    """
+
+    def __init__(self, client, ttl: int, prefix: str = "cart-store:"):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _key(self, phone):
+        return f"{self._prefix}{phone}"
+
+    def _holders_key(self, item_id):
+        return f"{self._prefix}holders:{item_id}"
+
+    @staticmethod
+    def _decode(raw):
+        if raw is None:
+            return _empty()
+        return json.loads(raw.decode() if isinstance(raw, bytes) else raw)
+
+    def _load(self, phone):
+        return self._decode(self._client.get(self._key(phone)))
+
+    def _modify(self, phone, change):
+        from redis.exceptions import WatchError
+
+        key = self._key(phone)
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    cart = self._decode(pipe.get(key))
+                    before = set(cart["lines"])
+                    result = change(cart)
+                    if result != CART_OK:
+                        pipe.unwatch()
+                        return result
+                    pipe.multi()
+                    if cart["lines"]:
+                        pipe.setex(key, self._ttl, json.dumps(cart))
+                    else:
+                        pipe.delete(key)
+                    for item_id in cart["lines"]:
+                        pipe.sadd(self._holders_key(item_id), phone)
+                        pipe.expire(self._holders_key(item_id), self._ttl)
+                    for item_id in before - set(cart["lines"]):
+                        pipe.srem(self._holders_key(item_id), phone)
+                    pipe.execute()
+                    return result
+                except WatchError:
+                    continue
+
+    def holders(self, item_id):
+        return [p.decode() if isinstance(p, bytes) else p for p in self._client.smembers(self._holders_key(item_id))]
+
+
+def create_cart_store(config):
+    """Build the cart store selected by ``CART_STORE_URL``."""
+    url = config.get("CART_STORE_URL") or "sql://"
+    ttl = int(config.get("CART_TTL_SEC", 7 * 86400))
+    if url.startswith("memory://"):
+        return InMemoryCartStore(ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisCartStore(redis.Redis.from_url(url), ttl)
+    return SQLCartStore()
+
+
+def _clear_pending(session):
+    phones = session.info.pop(_PENDING_KEY, None)
+    store = getattr(current_app, "cart_store", None)
+    if not phones or store is None:
+        return
+    for phone in phones:
+        try:
+            store.clear(phone)
+        except Exception as exc:  # the cart then lingers until it expires
+            current_app.logger.warning("Clearing cart after checkout failed: %s", exc)
+
+
+def _forget_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_app(app):
+    app.cart_store = create_cart_store(app.config)
+    if not event.contains(db.session, "after_commit", _clear_pending):
+        event.listen(db.session, "after_commit", _clear_pending)
+        event.listen(db.session, "after_rollback", _forget_pending)
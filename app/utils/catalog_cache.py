@@ -0,0 +1,63 @@
+"""
+Per-process cache of the serialized ``/shop/<id>/items`` catalog.
+
+Entries are keyed by ``(shop_id, catalog_version)`` and never invalidated:
+every write that changes what the catalog shows calls
+``bump_catalog_version`` in its transaction, so the next visit looks up a new
+key and stale entries age out of the LRU. The version also makes the strong
+``ETag``, which lets a repeat visit get a 304 from the shop row alone.
+"""
+import threading
+from collections import OrderedDict
+from sqlalchemy import update
+from models import db
+from models.shop import Shop
+
+
+class CatalogCache:
+    """Bounded LRU of ``(shop_id, version) -> bytes``."""
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, shop_id, version):
+        with self._lock:
+            body = self._data.get((shop_id, version))
+            if body is not None:
+                self._data.move_to_end((shop_id, version))
+            return body
+
+    def set(self, shop_id, version, body: bytes):
+        with self._lock:
+            self._data[(shop_id, version)] = body
+            self._data.move_to_end((shop_id, version))
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def catalog_etag(shop_id, version) -> str:
+    return f"catalog-{shop_id}-{version}"
+
+
+def bump_catalog_version(shop_id) -> None:
+    """Move ``shop_id`` to a new catalog version as part of the current transaction.
+
+    Call this from every write that changes an item's catalog fields or
+    availability, or the shop's name or type.
+    """
+    db.session.execute(
+        update(Shop).where(Shop.id == shop_id).values(catalog_version=Shop.catalog_version + 1)
+    )
+
+
+def init_app(app):
+    app.catalog_cache = CatalogCache(int(app.config.get("CATALOG_CACHE_MAX_ENTRIES", 1000)))
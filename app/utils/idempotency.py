@@ -0,0 +1,284 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db
+from models.idempotency import IdempotencyKey
+from .responses import error
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAY_HEADER = "Idempotent-Replayed"
+
+CLAIMED = "claimed"
+PENDING = "pending"
+DONE = "done"
+MISMATCH = "mismatch"
+
+# How long an unfinished claim blocks duplicates if its worker dies.
+PENDING_TTL = 60
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "record", "expires_at", "event")
+
+    def __init__(self, fingerprint, expires_at):
+        self.fingerprint = fingerprint
+        self.record = None
+        self.expires_at = expires_at
+        self.event = threading.Event()
+
+
+class InMemoryIdempotencyStore:
+    """Single-process store; duplicates block on the first request's event.
+
+    Holds at most ``max_entries`` keys: once expired ones are swept, the
+    oldest claim is evicted to make room.
+    """
+
+    def __init__(self, ttl: int, max_entries: int = 100000, clock=time.monotonic):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        expired = [k for k, e in self._entries.items() if e.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def claim(self, key, fingerprint):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                self._entries.pop(key, None)
+                if len(self._entries) >= self._max_entries:
+                    self._sweep(now)
+                while len(self._entries) >= self._max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    evicted.event.set()
+                self._entries[key] = _Entry(fingerprint, now + PENDING_TTL)
+                return CLAIMED, None
+            if entry.fingerprint != fingerprint:
+                return MISMATCH, None
+            if entry.record is not None:
+                return DONE, entry.record
+            return PENDING, None
+
+    def wait(self, key, timeout):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            entry.event.wait(timeout)
+
+    def complete(self, key, record):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.record = record
+            entry.expires_at = self._clock() + self._ttl
+        entry.event.set()
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.event.set()
+
+
+class SQLIdempotencyStore:
+    """Keys in the ``idempotency_key`` table, shared by every worker.
+
+    Each call runs in its own short transaction on a separate connection, so
+    a claim is visible to other workers before the view runs and never
+    commits the view's own work. Waiters poll.
+    """
+
+    def __init__(self, ttl: int, poll_interval: float = 0.05):
+        self._ttl = ttl
+        self._poll_interval = poll_interval
+
+    def claim(self, key, fingerprint):
+        table = IdempotencyKey.__table__
+        now = datetime.utcnow()
+        pending = {"fingerprint": fingerprint, "record": None, "expires_at": now + timedelta(seconds=PENDING_TTL)}
+        with db.engine.begin() as conn:
+            # An expired row is taken over in place.
+            if conn.execute(update(table).where(table.c.key == key, table.c.expires_at <= now).values(**pending)).rowcount:
+                return CLAIMED, None
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.expires_at <= now))
+                conn.execute(insert(table).values(key=key, **pending))
+            return CLAIMED, None
+        except IntegrityError:
+            pass
+        with db.engine.connect() as conn:
+            row = conn.execute(select(table.c.fingerprint, table.c.record).where(table.c.key == key)).first()
+        if row is None:
+            # Released between the two statements; let the caller retry.
+            return PENDING, None
+        if row.fingerprint != fingerprint:
+            return MISMATCH, None
+        if row.record is not None:
+            return DONE, json.loads(row.record)
+        return PENDING, None
+
+    def wait(self, key, timeout):
+        time.sleep(min(self._poll_interval, max(timeout, 0)))
+
+    def complete(self, key, record):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.key == key)
+                .values(record=json.dumps(record), expires_at=datetime.utcnow() + timedelta(seconds=self._ttl))
+            )
+
+    def release(self, key):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.key == key))
+
+
+class RedisIdempotencyStore:
+    """Store shared by every worker; claims use ``SET NX`` and waiters poll."""
+
+    def __init__(self, client, ttl: int, prefix: str = "idem:", poll_interval: float = 0.05):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+        self._poll_interval = poll_interval
+
+    def _key(self, key):
+        return f"{self._prefix}{key}"
+
+    def claim(self, key, fingerprint):
+        pending = json.dumps({"fingerprint": fingerprint})
+        if self._client.set(self._key(key), pending, nx=True, ex=PENDING_TTL):
+            return CLAIMED, None
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            # Released or expired between the two calls; let the caller retry.
+            return PENDING, None
+        stored = json.loads(raw)
+        if stored["fingerprint"] != fingerprint:
+            return MISMATCH, None
+        if "record" in stored:
+            return DONE, stored["record"]
+        return PENDING, None
+
+    def wait(self, key, timeout):
+        time.sleep(min(self._poll_interval, max(timeout, 0)))
+
+    def complete(self, key, record):
+        value = json.dumps({"fingerprint": record["fingerprint"], "record": record})
+        self._client.setex(self._key(key), self._ttl, value)
+
+    def release(self, key):
+        self._client.delete(self._key(key))
+
+
+def create_idempotency_store(config):
+    """Build the store selected by ``IDEMPOTENCY_STORE_URL``."""
+    url = config.get("IDEMPOTENCY_STORE_URL") or "sql://"
+    ttl = int(config.get("IDEMPOTENCY_TTL_SEC", 86400))
+    if url.startswith("memory://"):
+        return InMemoryIdempotencyStore(ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisIdempotencyStore(redis.Redis.from_url(url), ttl)
+    return SQLIdempotencyStore(ttl)
+
+
+def init_app(app):
+    store = create_idempotency_store(app.config)
+    if isinstance(store, InMemoryIdempotencyStore) and not (app.debug or app.testing):
+        # Each gunicorn worker would hold its own keys, so a retry landing
+        # on another worker would charge twice.
+        raise RuntimeError("IDEMPOTENCY_STORE_URL=memory:// is only allowed with DEBUG or TESTING")
+    app.idempotency_store = store
+
+
+def _fingerprint():
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b"\0")
+    digest.update(request.path.encode())
+    digest.update(b"\0")
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(record):
+    resp = current_app.response_class(
+        record["body"], status=record["status"], mimetype=record["mimetype"]
+    )
+    resp.headers[REPLAY_HEADER] = "true"
+    return resp
+
+
+def idempotent(func):
+    """Honour an ``Idempotency-Key`` header on a mutating endpoint.
+
+    The first request with a key runs normally. Its response is stored
+    under the caller's phone and key for ``IDEMPOTENCY_TTL_SEC`` seconds;
+    5xx responses are not stored. A retry with the same body receives the
+    stored response without running the view. A duplicate that arrives
+    while the first is still running waits up to ``IDEMPOTENCY_WAIT_SEC``
+    seconds for it. Reusing a key for a different request is rejected.
+    Must run after ``auth_required``.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return func(*args, **kwargs)
+        if len(key) > 255:
+            return error("Idempotency-Key too long", status=400)
+
+        store = current_app.idempotency_store
+        scoped = f"{getattr(request, 'phone', '')}:{key}"
+        fingerprint = _fingerprint()
+        deadline = time.monotonic() + float(current_app.config.get("IDEMPOTENCY_WAIT_SEC", 10))
+        while True:
+            state, record = store.claim(scoped, fingerprint)
+            if state == CLAIMED:
+                break
+            if state == DONE:
+                return _replay(record)
+            if state == MISMATCH:
+                return error("Idempotency-Key was already used for a different request", status=422)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return error("A request with this Idempotency-Key is still in progress", status=409)
+            store.wait(scoped, remaining)
+
+        try:
+            resp = current_app.make_response(func(*args, **kwargs))
+        except BaseException:
+            store.release(scoped)
+            raise
+        if resp.status_code >= 500:
+            store.release(scoped)
+        else:
+            store.complete(scoped, {
+                "fingerprint": fingerprint,
+                "status": resp.status_code,
+                "body": resp.get_data(as_text=True),
+                "mimetype": resp.mimetype,
+            })
+        return resp
+
+    return wrapper
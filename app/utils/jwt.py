@@ -1,4 +1,9 @@
 import datetime as dt
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from typing import Dict
 import jwt
 from flask import current_app
@@ -16,6 +21,64 @@ def _all_secrets() -> list:
     return secrets
 
 
+def key_id(secret: str) -> str:
+    """Stable, non-reversible identifier placed in the ``kid`` header."""
+    return hashlib.sha256(secret.encode()).hexdigest()[:16]
+
+
+def _now() -> float:
+    return time.time()
+
+
+class _Keyring:
+    """Signing keys indexed by ``kid`` plus an LRU of already-verified tokens.
+
+    Entries are keyed by the token's SHA-256 digest and are served only until
+    the token's ``exp`` claim passes.
+    """
+
+    def __init__(self, secrets: tuple, cache_size: int):
+        self.secrets = secrets
+        self.by_kid = {}
+        for secret in secrets:
+            self.by_kid.setdefault(key_id(secret), secret)
+        self._cache_size = cache_size
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, digest: bytes):
+        if not self._cache_size:
+            return None
+        with self._lock:
+            entry = self._verified.get(digest)
+            if entry is None:
+                return None
+            if entry.get("exp", 0) <= _now():
+                del self._verified[digest]
+                raise TokenError("token expired")
+            self._verified.move_to_end(digest)
+            return entry
+
+    def remember(self, digest: bytes, data: Dict) -> None:
+        if not self._cache_size or "exp" not in data:
+            return
+        with self._lock:
+            self._verified[digest] = data
+            self._verified.move_to_end(digest)
+            while len(self._verified) > self._cache_size:
+                self._verified.popitem(last=False)
+
+
+def _keyring() -> _Keyring:
+    secrets = tuple(_all_secrets())
+    keyring = current_app.extensions.get("jwt_keyring")
+    if keyring is None or keyring.secrets != secrets:
+        size = int(current_app.config.get("JWT_VERIFIED_CACHE_SIZE", 1024))
+        keyring = _Keyring(secrets, size)
+        current_app.extensions["jwt_keyring"] = keyring
+    return keyring
+
+
 def _utcnow():
     return dt.datetime.utcnow()
 
@@ -29,46 +92,84 @@ def _exp(minutes: int = None, days: int = None):
     raise ValueError("must supply minutes or days")
 
 
-def create_access_token(phone: str, role: str) -> str:
+def _encode(payload: Dict) -> str:
+    secret = _secret()
+    return jwt.encode(payload, secret, algorithm="HS256", headers={"kid": key_id(secret)})
+
+
+def new_token_family() -> str:
+    """Id shared by every token of one login session (``fam`` claim)."""
+    return uuid.uuid4().hex
+
+
+def create_access_token(phone: str, role: str, family: str = None) -> str:
     cfg = current_app.config
     payload: Dict = {
         "sub": phone,
         "role": role,
         "type": "access",
+        "jti": uuid.uuid4().hex,
         "exp": _exp(minutes=cfg["ACCESS_TOKEN_LIFETIME_MIN"]),
     }
-    return jwt.encode(payload, _secret(), algorithm="HS256")
+    if family:
+        payload["fam"] = family
+    return _encode(payload)
 
 
-def create_refresh_token(phone: str) -> str:
+def create_refresh_token(phone: str, family: str = None) -> str:
     cfg = current_app.config
     payload = {
         "sub": phone,
         "type": "refresh",
+        "jti": uuid.uuid4().hex,
         "exp": _exp(days=cfg["REFRESH_TOKEN_LIFETIME_DAYS"]),
     }
-    return jwt.encode(payload, _secret(), algorithm="HS256")
+    if family:
+        payload["fam"] = family
+    return _encode(payload)
 
 
 class TokenError(Exception):
     pass
 
 
-def decode_token(token: str, expected_type: str = "access") -> Dict:
+def _verify(token: str, keyring: _Keyring) -> Dict:
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+    except jwt.InvalidTokenError:
+        raise TokenError("invalid token")
+    if kid is not None:
+        secret = keyring.by_kid.get(kid)
+        if secret is None:
+            raise TokenError("invalid token")
+        candidates = (secret,)
+    else:
+        # Tokens minted before key ids were introduced.
+        candidates = keyring.secrets
+
     last_error = TokenError("invalid token")
-    for secret in _all_secrets():
+    for secret in candidates:
         try:
-            data = jwt.decode(token, secret, algorithms=["HS256"])
-            break
+            return jwt.decode(token, secret, algorithms=["HS256"])
         except jwt.ExpiredSignatureError:
             raise TokenError("token expired")
         except jwt.InvalidSignatureError:
             last_error = TokenError("invalid token")
         except jwt.InvalidTokenError:
             last_error = TokenError("invalid token")
-    else:
-        raise last_error
+    raise last_error
+
+
+def decode_token(token: str, expected_type: str = "access") -> Dict:
+    if not isinstance(token, str):
+        raise TokenError("invalid token")
+    keyring = _keyring()
+    digest = hashlib.sha256(token.encode()).digest()
+    data = keyring.cached(digest)
+    if data is None:
+        data = _verify(token, keyring)
+        keyring.remember(digest, data)
 
     if data.get("type") != expected_type:
         raise TokenError(f"expected {expected_type} token")
-    return data
+    return dict(data)
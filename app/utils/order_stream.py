@@ -0,0 +1,459 @@
+"""
+Pub/sub hub behind the server-sent order event streams.
+
+Events are the ``order_event`` rows the order services journal. They are
+queued on the session by ``app/services/order_events.py`` and published
+only after the transaction commits; a rollback drops them. Subscribers
+listen on ``shop:<id>`` (the shop owner) and ``consumer:<phone>`` channels.
+
+``ORDER_STREAM_URL`` picks the backend: ``memory://`` fans out inside one
+process, a Redis URL fans out across workers through PUBLISH/SUBSCRIBE.
+``ORDER_STREAM_MAX_CONNECTIONS`` caps the open streams of the whole
+deployment: the Redis hub counts them in Redis, and the in-process hub
+refuses streams when ``WEB_CONCURRENCY`` says there is more than one
+worker. Each stream holds a worker (or thread) until it ends.
+"""
+import json
+import queue
+import threading
+import time
+import uuid
+from sqlalchemy import event
+from flask import Response, current_app, jsonify, request
+from models import db
+from .pagination import parse_limit
+from .responses import error
+
+_PENDING_KEY = "order_stream_pending"
+
+# Reconnect delay suggested to EventSource clients, in milliseconds.
+RETRY_MS = 3000
+
+MESSAGES_PAGE_SIZE = 100
+MAX_MESSAGES_PAGE_SIZE = 200
+
+
+class StreamLimitReached(Exception):
+    """Raised by ``subscribe`` when every stream slot is in use."""
+
+
+class _LocalSlots:
+    """Stream slots counted inside this process."""
+
+    def __init__(self, limit: int):
+        self._limit = limit
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        return self._open
+
+    def acquire(self):
+        with self._lock:
+            if self._open >= self._limit:
+                return None
+            self._open += 1
+            return True
+
+    def release(self, token):
+        with self._lock:
+            self._open -= 1
+
+
+class _RedisSlots:
+    """Stream slots counted across every worker in a Redis sorted set.
+
+    Each slot is a member scored by when its lease runs out, so the slots of
+    a worker that died mid-stream free themselves.
+    """
+
+    def __init__(self, client, key: str, limit: int, lease: float, clock=time.time):
+        self._client = client
+        self._key = key
+        self._limit = limit
+        self._lease = lease
+        self._clock = clock
+
+    def count(self) -> int:
+        return self._client.zcount(self._key, self._clock(), "+inf")
+
+    def acquire(self):
+        import redis
+
+        token = uuid.uuid4().hex
+        with self._client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self._key)
+                    now = self._clock()
+                    if pipe.zcount(self._key, now, "+inf") >= self._limit:
+                        pipe.unwatch()
+                        return None
+                    pipe.multi()
+                    pipe.zremrangebyscore(self._key, "-inf", now)
+                    pipe.zadd(self._key, {token: now + self._lease})
+                    pipe.expire(self._key, int(self._lease) + 1)
+                    pipe.execute()
+                    return token
+                except redis.WatchError:
+                    continue
+
+    def release(self, token):
+        self._client.zrem(self._key, token)
+
+
+class OrderStreamHub:
+    """Connection cap shared by the backends.
+
+    Backends define ``publish(channels, payload)`` and ``_listen(channels)``,
+    which returns a subscription with ``get(timeout)`` and ``close()``. A hub
+    built with ``unavailable`` refuses every subscription with that reason.
+    """
+
+    def __init__(self, slots, unavailable=None):
+        self._slots = slots
+        self.unavailable = unavailable
+
+    @property
+    def open_connections(self) -> int:
+        return self._slots.count()
+
+    def subscribe(self, channels):
+        """Return a subscription with ``get(timeout)`` and ``close()``."""
+        if self.unavailable:
+            raise StreamLimitReached(self.unavailable)
+        token = self._slots.acquire()
+        if token is None:
+            raise StreamLimitReached("Too many open order streams")
+        try:
+            return _Capped(self._listen(list(channels)), lambda: self._slots.release(token))
+        except BaseException:
+            self._slots.release(token)
+            raise
+
+
+class _Capped:
+    """Subscription wrapper that gives its slot back exactly once."""
+
+    def __init__(self, subscription, release):
+        self._subscription = subscription
+        self._release = release
+        self._closed = False
+
+    def get(self, timeout: float):
+        return self._subscription.get(timeout)
+
+    def wait_for(self, predicate, timeout: float, clock=time.monotonic) -> bool:
+        """Block until an event matching ``predicate`` arrives or ``timeout`` passes."""
+        deadline = clock() + timeout
+        while True:
+            remaining = deadline - clock()
+            if remaining <= 0:
+                return False
+            payload = self._subscription.get(remaining)
+            if payload is not None and predicate(payload):
+                return True
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._subscription.close()
+            self._release()
+
+
+class InMemoryOrderStreamHub(OrderStreamHub):
+    """Single-process hub; each subscriber owns a bounded queue.
+
+    A subscriber that falls ``queue_size`` events behind loses the oldest
+    ones; it can recover them by reconnecting with ``Last-Event-ID``.
+    """
+
+    def __init__(self, max_connections: int, queue_size: int = 256, unavailable=None):
+        super().__init__(_LocalSlots(max_connections), unavailable)
+        self._queue_size = queue_size
+        self._subscribers = {}
+        self._subscribers_lock = threading.Lock()
+
+    def publish(self, channels, payload):
+        with self._subscribers_lock:
+            targets = {id(q): q for channel in channels for q in self._subscribers.get(channel, ())}
+        for q in targets.values():
+            while True:
+                try:
+                    q.put_nowait(payload)
+                    break
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def _listen(self, channels):
+        q = queue.Queue(self._queue_size)
+        with self._subscribers_lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, []).append(q)
+        return _QueueSubscription(self, channels, q)
+
+    def _unsubscribe(self, channels, q):
+        with self._subscribers_lock:
+            for channel in channels:
+                listeners = self._subscribers.get(channel, [])
+                if q in listeners:
+                    listeners.remove(q)
+                if not listeners:
+                    self._subscribers.pop(channel, None)
+
+
+class _QueueSubscription:
+    def __init__(self, hub, channels, q):
+        self._hub = hub
+        self._channels = channels
+        self._queue = q
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._hub._unsubscribe(self._channels, self._queue)
+
+
+class RedisOrderStreamHub(OrderStreamHub):
+    """Hub shared by every worker through a Redis-compatible client.
+
+    A stream slot is leased for ``lease`` seconds; keep it above the longest
+    stream or long-poll.
+    """
+
+    def __init__(self, client, max_connections: int, prefix: str = "order-stream:", lease: float = 600):
+        super().__init__(_RedisSlots(client, f"{prefix}slots", max_connections, lease))
+        self._client = client
+        self._prefix = prefix
+
+    def publish(self, channels, payload):
+        message = json.dumps(payload)
+        for channel in channels:
+            self._client.publish(f"{self._prefix}{channel}", message)
+
+    def _listen(self, channels):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*(f"{self._prefix}{channel}" for channel in channels))
+        return _RedisSubscription(pubsub)
+
+
+class _RedisSubscription:
+    def __init__(self, pubsub, clock=time.monotonic):
+        self._pubsub = pubsub
+        self._clock = clock
+
+    def get(self, timeout):
+        # Subscribe confirmations come back as None; keep waiting for data.
+        deadline = self._clock() + max(timeout, 0)
+        while True:
+            message = self._pubsub.get_message(timeout=max(deadline - self._clock(), 0))
+            if message is not None and message.get("type") == "message":
+                return json.loads(message["data"])
+            if self._clock() >= deadline:
+                return None
+
+    def close(self):
+        self._pubsub.close()
+
+
+def stream_slot_limit(config) -> int:
+    """``ORDER_STREAM_MAX_CONNECTIONS``, clamped to what the workers can spare.
+
+    A sync gunicorn worker serves one request at a time, so with several of
+    them streams may take at most half; ``ORDER_STREAM_ASYNC_WORKERS`` lifts
+    the clamp for threaded or gevent workers.
+    """
+    limit = int(config.get("ORDER_STREAM_MAX_CONNECTIONS", 8))
+    workers = int(config.get("WEB_CONCURRENCY", 1))
+    if workers > 1 and not config.get("ORDER_STREAM_ASYNC_WORKERS"):
+        limit = min(limit, workers // 2)
+    return limit
+
+
+def create_order_stream_hub(config):
+    """Build the hub selected by ``ORDER_STREAM_URL``."""
+    url = config.get("ORDER_STREAM_URL") or "memory://"
+    max_connections = stream_slot_limit(config)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        lease = max(
+            float(config.get("ORDER_STREAM_MAX_DURATION_SEC", 300)),
+            float(config.get("ORDER_MESSAGES_MAX_WAIT_SEC", 25)),
+        ) + 60
+        return RedisOrderStreamHub(redis.Redis.from_url(url), max_connections, lease=lease)
+    unavailable = None
+    if int(config.get("WEB_CONCURRENCY", 1)) > 1:
+        # Events published in one worker would never reach the others.
+        unavailable = "Order streams need a Redis ORDER_STREAM_URL with several workers"
+    return InMemoryOrderStreamHub(max_connections, unavailable=unavailable)
+
+
+def queue_publish(channels, payload: dict) -> None:
+    """Publish ``payload`` once the current transaction commits."""
+    db.session.info.setdefault(_PENDING_KEY, []).append((tuple(channels), payload))
+
+
+def _publish_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    hub = getattr(current_app, "order_stream", None)
+    if hub is None:
+        return
+    for channels, payload in pending:
+        try:
+            hub.publish(channels, payload)
+        except Exception as exc:  # a lost notification is recoverable via Last-Event-ID
+            current_app.logger.warning("Order stream publish failed: %s", exc)
+
+
+def _drop_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _format(payload) -> str:
+    return f"id: {payload['id']}\nevent: order\ndata: {json.dumps(payload)}\n\n"
+
+
+def _events(subscription, backlog, truncated, heartbeat, max_duration, clock=time.monotonic):
+    yield f"retry: {RETRY_MS}\n\n"
+    # Ids are assigned at INSERT but published after COMMIT, so live events
+    # can arrive out of id order; ids only skip what the backlog replayed.
+    replayed = set()
+    for payload in backlog:
+        replayed.add(payload["id"])
+        yield _format(payload)
+    if truncated:
+        return  # the client reconnects from the last id for the rest
+    deadline = clock() + max_duration
+    while True:
+        remaining = deadline - clock()
+        if remaining <= 0:
+            return
+        payload = subscription.get(min(heartbeat, remaining))
+        if payload is None:
+            yield ": heartbeat\n\n"
+        elif payload["id"] not in replayed:
+            yield _format(payload)
+
+
+def _last_event_id():
+    raw = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    return None if raw in (None, "") else int(raw)
+
+
+def order_stream_response(channels, *scope):
+    """Server-sent events for ``channels``.
+
+    With a ``Last-Event-ID`` header (or ``last_event_id`` parameter) the
+    journal rows after it, narrowed by the ``Order`` criteria in ``scope``,
+    are replayed first, at most ``ORDER_STREAM_BACKLOG_LIMIT`` per
+    connection. The stream sends a comment every
+    ``ORDER_STREAM_HEARTBEAT_SEC`` seconds and ends after
+    ``ORDER_STREAM_MAX_DURATION_SEC``; clients reconnect with the last id.
+    """
+    from app.services.order_events import backlog_events
+
+    config = current_app.config
+    try:
+        last_id = _last_event_id()
+    except ValueError:
+        return error("Invalid Last-Event-ID", status=400)
+    try:
+        subscription = current_app.order_stream.subscribe(channels)
+    except StreamLimitReached as exc:
+        resp, status = error(str(exc), status=503)
+        resp.headers["Retry-After"] = str(RETRY_MS // 1000)
+        return resp, status
+    try:
+        limit = int(config["ORDER_STREAM_BACKLOG_LIMIT"])
+        backlog = backlog_events(last_id, limit, *scope) if last_id is not None else []
+    except BaseException:
+        subscription.close()
+        raise
+    # Streaming holds no database connection.
+    db.session.close()
+
+    resp = Response(
+        _events(
+            subscription,
+            backlog,
+            len(backlog) >= limit,
+            float(config["ORDER_STREAM_HEARTBEAT_SEC"]),
+            float(config["ORDER_STREAM_MAX_DURATION_SEC"]),
+        ),
+        mimetype="text/event-stream",
+    )
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.call_on_close(subscription.close)
+    return resp
+
+
+def order_messages_response(order_id: int, channels):
+    """Chat thread of an already authorized order, optionally long-polled.
+
+    ``since_id`` returns only later messages and ``limit`` (default 100, max
+    200) caps them; ``next_since_id`` continues from the last one. With
+    ``wait=N`` and nothing new, the request blocks for up to N seconds
+    (capped by ``ORDER_MESSAGES_MAX_WAIT_SEC``) until a message for the order
+    is published on ``channels``. A wait takes one of the deployment-wide
+    order stream slots, since it holds a worker just like a stream; when
+    none is free, or the hub refuses streams, the request answers at once.
+    """
+    from app.services.order_events import order_messages
+
+    args = request.args
+    try:
+        since_id = int(args.get("since_id") or 0)
+        limit = parse_limit(args.get("limit"), default=MESSAGES_PAGE_SIZE, maximum=MAX_MESSAGES_PAGE_SIZE)
+        wait = float(args.get("wait") or 0)
+    except ValueError:
+        return error("Invalid since_id, limit or wait", status=400)
+    wait = min(max(wait, 0), float(current_app.config["ORDER_MESSAGES_MAX_WAIT_SEC"]))
+
+    subscription = None
+    if wait:
+        # Subscribe before reading so a message committed in between still wakes us.
+        try:
+            subscription = current_app.order_stream.subscribe(channels)
+        except StreamLimitReached:
+            pass
+    try:
+        messages = order_messages(order_id, since_id, limit)
+        if not messages and subscription is not None:
+            db.session.close()
+            subscription.wait_for(
+                lambda payload: payload["order_id"] == order_id and payload["message"] is not None,
+                wait,
+            )
+            messages = order_messages(order_id, since_id, limit)
+    finally:
+        if subscription is not None:
+            subscription.close()
+    return jsonify({
+        "status": "success",
+        "messages": [msg.to_dict() for msg in messages],
+        "next_since_id": messages[-1].id if messages else since_id,
+    }), 200
+
+
+def init_app(app):
+    hub = create_order_stream_hub(app.config)
+    if hub.unavailable:
+        if not (app.debug or app.testing):
+            # Every stream and long poll would answer 503 in production.
+            raise RuntimeError(f"{hub.unavailable} (or set WEB_CONCURRENCY=1)")
+        app.logger.warning("Order streams are disabled: %s", hub.unavailable)
+    app.order_stream = hub
+    if not event.contains(db.session, "after_commit", _publish_pending):
+        event.listen(db.session, "after_commit", _publish_pending)
+        event.listen(db.session, "after_rollback", _drop_pending)
@@ -0,0 +1,127 @@
+import hmac
+import threading
+import time
+from datetime import datetime, timedelta
+from models import db
+from models.user import OTP
+
+OTP_VALID = "valid"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+
+
+class InMemoryOTPStore:
+    """Single-process OTP store; one pending code per phone, evicted on expiry."""
+
+    def __init__(self, ttl: int, max_entries: int = 100000, clock=time.time):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def _sweep(self, now):
+        expired = [phone for phone, (_, exp) in self._codes.items() if exp <= now]
+        for phone in expired:
+            del self._codes[phone]
+
+    def issue(self, phone: str, code: str) -> None:
+        now = self._clock()
+        with self._lock:
+            if len(self._codes) >= self._max_entries:
+                self._sweep(now)
+            self._codes[phone] = (code, now + self._ttl)
+
+    def consume(self, phone: str, code: str) -> str:
+        with self._lock:
+            entry = self._codes.get(phone)
+            if entry is None or not hmac.compare_digest(entry[0], code):
+                return OTP_INVALID
+            del self._codes[phone]
+            if entry[1] <= self._clock():
+                return OTP_EXPIRED
+            return OTP_VALID
+
+
+class RedisOTPStore:
+    """OTP store on a Redis-compatible server; expiry is delegated to ``SETEX``."""
+
+    def __init__(self, client, ttl: int, prefix: str = "otp:"):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def issue(self, phone: str, code: str) -> None:
+        self._client.setex(f"{self._prefix}{phone}", self._ttl, code)
+
+    def consume(self, phone: str, code: str) -> str:
+        key = f"{self._prefix}{phone}"
+        stored = self._client.get(key)
+        if stored is None:
+            return OTP_INVALID
+        if isinstance(stored, bytes):
+            stored = stored.decode()
+        if not hmac.compare_digest(stored, code):
+            return OTP_INVALID
+        # Only the request that actually removes the key wins the code.
+        if not self._client.delete(key):
+            return OTP_INVALID
+        return OTP_VALID
+
+
+class SQLOTPStore:
+    """OTP rows keyed by a unique phone index; expired rows are purged on issue.
+
+    Changes are staged on ``db.session`` and committed by the caller's
+    transaction.
+    """
+
+    def __init__(self, ttl: int):
+        self._ttl = ttl
+
+    def issue(self, phone: str, code: str) -> None:
+        now = datetime.utcnow()
+        OTP.query.filter(OTP.expires_at < now).delete(synchronize_session=False)
+        values = {"otp": code, "is_used": False, "created_at": now, "expires_at": now + timedelta(seconds=self._ttl)}
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            # One upsert, so two first requests for a phone cannot race on its unique index.
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            stmt = dialect_insert(OTP.__table__).values(phone=phone, **values)
+            db.session.execute(stmt.on_conflict_do_update(index_elements=[OTP.__table__.c.phone], set_=values))
+            return
+        record = OTP.query.filter_by(phone=phone).first()
+        if record is None:
+            record = OTP(phone=phone)
+            db.session.add(record)
+        for name, value in values.items():
+            setattr(record, name, value)
+
+    def consume(self, phone: str, code: str) -> str:
+        record = OTP.query.filter_by(phone=phone).first()
+        if record is None or record.is_used or not hmac.compare_digest(record.otp, code):
+            return OTP_INVALID
+        if record.expires_at <= datetime.utcnow():
+            return OTP_EXPIRED
+        record.is_used = True
+        return OTP_VALID
+
+
+def create_otp_store(config):
+    """Build the OTP store selected by ``OTP_STORE_URL``."""
+    url = config.get("OTP_STORE_URL") or "sql://"
+    ttl = int(config.get("OTP_EXPIRY_MINUTES", 10)) * 60
+    if url.startswith("memory://"):
+        return InMemoryOTPStore(ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisOTPStore(redis.Redis.from_url(url), ttl)
+    return SQLOTPStore(ttl)
+
+
+def init_app(app):
+    app.otp_store = create_otp_store(app.config)
@@ -0,0 +1,99 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_limit(raw, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Parse a ``limit`` query parameter, clamped to ``1..maximum``.
+
+    Raises ValueError if ``raw`` is not an integer.
+    """
+    if raw in (None, ""):
+        return default
+    return max(1, min(int(raw), maximum))
+
+
+def parse_datetime(raw):
+    """Parse an ISO date or datetime query parameter; None passes through."""
+    if raw in (None, ""):
+        return None
+    return datetime.fromisoformat(raw)
+
+
+def parse_expand(raw) -> set:
+    """Names listed in a comma-separated ``expand`` query parameter."""
+    return {name.strip() for name in (raw or "").split(",") if name.strip()}
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return ``(created_at, id)`` from an opaque cursor; raises ValueError."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError):
+        raise ValueError("invalid cursor")
+
+
+def _keyset_rows(query, created_col, id_col, limit: int, before: str = None):
+    if before:
+        created_at, row_id = decode_cursor(before)
+        query = query.filter(
+            or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id),
+            )
+        )
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+
+def _cut_page(rows, created_col, id_col, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            getattr(last, created_col.key), getattr(last, id_col.key)
+        )
+    return rows, next_cursor
+
+
+def keyset_page(query, created_col, id_col, limit: int, before: str = None):
+    """Return one newest-first page and the cursor for the next one.
+
+    Rows are ordered by ``(created_col, id_col)`` descending; ``before`` is
+    the cursor returned by the previous page. Fetches ``limit + 1`` rows to
+    learn whether another page exists, so no COUNT query is needed.
+    """
+    rows = _keyset_rows(query, created_col, id_col, limit, before)
+    return _cut_page(rows, created_col, id_col, limit)
+
+
+def keyset_page_union(hot, cold, limit: int, before: str = None):
+    """``keyset_page`` over ``hot`` that continues into ``cold``.
+
+    ``hot`` and ``cold`` are ``(query, created_col, id_col)`` triples over
+    tables with the same row shape (e.g. ``order`` and ``order_archive``);
+    the cursor is shared. ``cold`` is only read for the part of the page
+    the hot rows leave open: from the cursor when the hot page is short,
+    otherwise down to the oldest hot row fetched. A ``cold`` of None is
+    plain ``keyset_page``.
+    """
+    if cold is None:
+        return keyset_page(*hot, limit, before)
+    hot_query, created_col, id_col = hot
+    cold_query, cold_created, cold_id = cold
+    rows = _keyset_rows(hot_query, created_col, id_col, limit, before)
+    if len(rows) > limit:
+        cold_query = cold_query.filter(cold_created >= getattr(rows[-1], created_col.key))
+    rows += _keyset_rows(cold_query, cold_created, cold_id, limit, before)
+    rows.sort(key=lambda row: (getattr(row, created_col.key), getattr(row, id_col.key)), reverse=True)
+    return _cut_page(rows, created_col, id_col, limit)
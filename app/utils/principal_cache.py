@@ -0,0 +1,54 @@
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from models import db
+from models.user import UserProfile
+from .ttl_cache import create_ttl_cache
+
+# Columns copied into the cache. Anything else on ``UserProfile`` is left
+# expired on the hydrated instance and loads lazily if a route touches it.
+PRINCIPAL_FIELDS = (
+    "phone",
+    "name",
+    "city",
+    "society",
+    "role",
+    "basic_onboarding_done",
+    "role_onboarding_done",
+    "kyc_status",
+)
+
+
+def create_principal_cache(config):
+    """Build the principal cache selected by ``PRINCIPAL_CACHE_URL``."""
+    return create_ttl_cache(
+        config.get("PRINCIPAL_CACHE_URL") or "memory://",
+        int(config.get("PRINCIPAL_CACHE_TTL_SEC", 60)),
+        int(config.get("PRINCIPAL_CACHE_MAX_ENTRIES", 10000)),
+        prefix="principal:",
+    )
+
+
+def init_app(app):
+    app.principal_cache = create_principal_cache(app.config)
+
+
+def snapshot(user) -> dict:
+    return {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+
+
+def hydrate(data: dict) -> UserProfile:
+    """Attach a cached snapshot to the session as a persistent ``UserProfile``.
+
+    No SQL is emitted; routes that mutate the returned instance flush only
+    the attributes they change.
+    """
+    user = UserProfile(**data)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def invalidate_principal(phone: str) -> None:
+    """Drop the cached principal after its role or onboarding flags change."""
+    cache = getattr(current_app, "principal_cache", None)
+    if cache is not None and phone:
+        cache.delete(phone)
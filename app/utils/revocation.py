@@ -0,0 +1,164 @@
+import hashlib
+import math
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from models import db
+from models.user import RevokedToken
+
+# Rows committed by another worker can carry a ``revoked_at`` slightly older
+# than the newest row already seen; incremental syncs re-read this window.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+_DIGEST = struct.Struct("<QQ")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (no deletes, no false negatives)."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(int(capacity), 1)
+        bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.capacity = capacity
+        self.num_bits = max(bits, 8)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # Double hashing: k positions from one 128-bit digest.
+        h1, h2 = _DIGEST.unpack(hashlib.blake2b(key.encode(), digest_size=16).digest())
+        h2 |= 1
+        m = self.num_bits
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % m
+
+    def add(self, key: str) -> None:
+        added = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self._bits[pos >> 3] & mask:
+                self._bits[pos >> 3] |= mask
+                added = True
+        # Re-adding a key (incremental syncs overlap) leaves the count alone.
+        if added:
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        # Most keys are absent, so stop at the first clear bit.
+        bits = self._bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """Per-worker Bloom filter in front of the ``revoked_token`` table.
+
+    A miss in the filter is final. A hit is confirmed against the table, so
+    false positives cost one indexed lookup. Every ``sync_interval`` seconds
+    the filter pulls rows revoked since its watermark, which is how
+    revocations made by other workers arrive. It is rebuilt from scratch
+    (dropping expired rows) once it has absorbed ``capacity`` keys.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float, clock=time.monotonic):
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._sync_interval = sync_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._filter = BloomFilter(self._capacity, self._error_rate)
+        self._watermark = None
+        self._next_sync = 0.0
+
+    def sync(self, force: bool = False) -> None:
+        if not force and self._clock() < self._next_sync:
+            return
+        with self._lock:
+            if not force and self._clock() < self._next_sync:
+                return
+            rebuild = self._watermark is None or self._filter.count >= self._filter.capacity
+            query = db.session.query(RevokedToken.jti, RevokedToken.revoked_at).filter(
+                RevokedToken.expires_at > datetime.utcnow()
+            )
+            if not rebuild:
+                query = query.filter(RevokedToken.revoked_at >= self._watermark - SYNC_OVERLAP)
+            rows = query.all()
+            if rebuild:
+                target = BloomFilter(max(self._capacity, 2 * len(rows)), self._error_rate)
+            else:
+                target = self._filter
+            watermark = self._watermark
+            for jti, revoked_at in rows:
+                target.add(jti)
+                if revoked_at is not None and (watermark is None or revoked_at > watermark):
+                    watermark = revoked_at
+            self._filter = target
+            self._watermark = watermark or datetime.utcnow()
+            self._next_sync = self._clock() + self._sync_interval
+
+    def might_contain(self, key: str) -> bool:
+        return key in self._filter
+
+    def is_revoked(self, payload: dict) -> bool:
+        """True if the token's ``jti`` or session family has been revoked.
+
+        Tokens minted before ``jti`` was introduced are never revoked.
+        """
+        keys = [k for k in (payload.get("jti"), payload.get("fam")) if k]
+        if not keys:
+            return False
+        self.sync()
+        candidates = [k for k in keys if k in self._filter]
+        if not candidates:
+            return False
+        return self.lookup(*candidates) is not None
+
+    def lookup(self, *keys):
+        """Authoritative check; returns the first matching ``reason`` or None."""
+        row = (
+            db.session.query(RevokedToken.reason)
+            .filter(RevokedToken.jti.in_(keys), RevokedToken.expires_at > datetime.utcnow())
+            .first()
+        )
+        return row.reason if row is not None else None
+
+    def revoke(self, key: str, expires_at: datetime, reason: str) -> bool:
+        """Stage a revocation on ``db.session``; the caller commits.
+
+        Returns False if ``key`` was already revoked.
+        """
+        now = datetime.utcnow()
+        RevokedToken.query.filter(RevokedToken.expires_at < now).delete(synchronize_session=False)
+        if RevokedToken.query.filter_by(jti=key).first() is not None:
+            return False
+        db.session.add(RevokedToken(jti=key, expires_at=expires_at, reason=reason, revoked_at=now))
+        self._filter.add(key)
+        return True
+
+
+def create_revocation_list(config) -> RevocationList:
+    return RevocationList(
+        capacity=int(config.get("REVOCATION_FILTER_CAPACITY", 100000)),
+        error_rate=float(config.get("REVOCATION_FILTER_ERROR_RATE", 0.001)),
+        sync_interval=float(config.get("REVOCATION_SYNC_INTERVAL_SEC", 2)),
+    )
+
+
+def init_app(app):
+    app.revocations = create_revocation_list(app.config)
+
+
+def token_expiry(payload: dict) -> datetime:
+    return datetime.utcfromtimestamp(payload["exp"])
+
+
+def family_expiry(config) -> datetime:
+    """A family outlives every token in it: at most one refresh lifetime from now."""
+    return datetime.utcnow() + timedelta(days=int(config["REFRESH_TOKEN_LIFETIME_DAYS"]))
@@ -0,0 +1,92 @@
+"""
+Key-value caches of JSON-able dicts with a per-entry TTL.
+
+``LocalTTLCache`` is a bounded in-process LRU; ``RedisTTLCache`` shares the
+entries across workers through ``SETEX``. Both expose ``get``, ``set``,
+``delete`` and ``clear``; ``create_ttl_cache`` picks one from a URL.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalTTLCache:
+    """Bounded in-process LRU with a per-entry TTL."""
+
+    def __init__(self, ttl: int, max_entries: int, clock=time.monotonic):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return dict(value)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock() + self._ttl, dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisTTLCache:
+    """TTL cache shared by every worker through a Redis-compatible client."""
+
+    def __init__(self, client, ttl: int, prefix: str):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def _key(self, key):
+        return f"{self._prefix}{key}"
+
+    def get(self, key):
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self._client.setex(self._key(key), self._ttl, json.dumps(value))
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def clear(self):
+        for key in self._client.scan_iter(match=f"{self._prefix}*"):
+            self._client.delete(key)
+
+
+def create_ttl_cache(url: str, ttl: int, max_entries: int, prefix: str):
+    """A ``RedisTTLCache`` for Redis URLs, otherwise a ``LocalTTLCache``.
+
+    ``prefix`` namespaces the Redis keys; ``max_entries`` bounds the local LRU.
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisTTLCache(redis.Redis.from_url(url), ttl, prefix)
+    return LocalTTLCache(ttl, max_entries)
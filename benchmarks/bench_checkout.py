@@ -0,0 +1,90 @@
+"""Checkout latency and round trips versus cart size.
+
+"before" replays the per-line checkout (lazy price loads, one locked
+SELECT per line, one INSERT per order line); "set-based" is
+``confirm_order_service``. Both run against in-memory SQLite, where a
+round trip is nearly free, so the statement count is the number to watch
+for a networked database.
+
+Run with ``python -m benchmarks.bench_checkout``.
+"""
+import os
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy import event
+
+os.environ.setdefault("APP_ENV", "testing")
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.services.consumer.orders import confirm_order_service  # noqa: E402
+from models import db  # noqa: E402
+from models.cart import CartItem  # noqa: E402
+from models.item import Item  # noqa: E402
+from models.order import Order, OrderItem  # noqa: E402
+from models.shop import Shop  # noqa: E402
+
+ROUNDS = 50
+PHONE = "bench"
+
+
+def _legacy_confirm(user):
+    cart_items = CartItem.query.filter_by(user_phone=user.phone).all()
+    total = sum(Decimal(ci.quantity) * Decimal(ci.item.price) for ci in cart_items)
+    for ci in cart_items:
+        item = Item.query.filter_by(id=ci.item_id).with_for_update().one()
+        item.quantity_in_stock -= ci.quantity
+    order = Order(user_phone=user.phone, shop_id=cart_items[0].shop_id, payment_mode="cash",
+                  total_amount=total, final_amount=total, status="pending")
+    db.session.add(order)
+    db.session.flush()
+    for ci in cart_items:
+        db.session.add(OrderItem(order_id=order.id, item_id=ci.item.id, name=ci.item.title, unit=ci.item.unit,
+                                 unit_price=ci.item.price, quantity=ci.quantity,
+                                 subtotal=Decimal(ci.quantity) * Decimal(ci.item.price)))
+    CartItem.query.filter_by(user_phone=user.phone).delete()
+    return order
+
+
+def _measure(confirm, shop_id, item_ids):
+    user = SimpleNamespace(phone=PHONE)
+    statements = [0]
+
+    def _count(*_):
+        statements[0] += 1
+
+    elapsed = 0.0
+    for _ in range(ROUNDS):
+        db.session.add_all(CartItem(user_phone=PHONE, shop_id=shop_id, item_id=i, quantity=1) for i in item_ids)
+        db.session.commit()
+        db.session.expire_all()
+        event.listen(db.engine, "before_cursor_execute", _count)
+        start = time.perf_counter()
+        confirm(user)
+        db.session.commit()
+        elapsed += time.perf_counter() - start
+        event.remove(db.engine, "before_cursor_execute", _count)
+    return elapsed / ROUNDS * 1e3, statements[0] // ROUNDS
+
+
+def run():
+    app = create_app(TestingConfig)
+    print(f"{'lines':>5} {'before ms':>10} {'stmts':>6} {'set-based ms':>13} {'stmts':>6}")
+    with app.app_context():
+        db.create_all()
+        shop = Shop(shop_name="B", shop_type="grocery", society="s", city="c", phone="vendor", is_open=True)
+        db.session.add(shop)
+        db.session.flush()
+        items = [Item(shop_id=shop.id, title=f"i{n}", price=9.5, quantity_in_stock=10**9) for n in range(50)]
+        db.session.add_all(items)
+        db.session.commit()
+        ids = [item.id for item in items]
+        for lines in (1, 5, 10, 25, 50):
+            before = _measure(_legacy_confirm, shop.id, ids[:lines])
+            after = _measure(confirm_order_service, shop.id, ids[:lines])
+            print(f"{lines:>5} {before[0]:>10.2f} {before[1]:>6} {after[0]:>13.2f} {after[1]:>6}")
+
+
+if __name__ == "__main__":
+    run()
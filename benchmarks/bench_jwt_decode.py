@@ -0,0 +1,63 @@
+"""Per-decode cost of ``decode_token`` with 0, 1 and 5 previous secrets.
+
+"before" replays the legacy path: a token without a ``kid`` signed by the
+oldest secret, with the verified-token cache disabled, so every call tries
+each secret in turn. "kid" verifies against the single matching key, and
+"kid+cache" additionally serves repeat decodes from the verified-token LRU.
+
+Run with ``python -m benchmarks.bench_jwt_decode``.
+"""
+import datetime as dt
+import os
+import timeit
+import jwt
+
+os.environ.setdefault("APP_ENV", "testing")
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.utils.jwt import create_access_token, decode_token  # noqa: E402
+
+ROUNDS = 5000
+
+
+def _legacy_token(secret):
+    payload = {
+        "sub": "bench",
+        "role": "consumer",
+        "type": "access",
+        "exp": dt.datetime.utcnow() + dt.timedelta(minutes=15),
+    }
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def _per_call_us(token):
+    return timeit.timeit(lambda: decode_token(token), number=ROUNDS) / ROUNDS * 1e6
+
+
+def run():
+    app = create_app(TestingConfig)
+    print(f"{'previous':>8} {'before':>10} {'kid':>10} {'kid+cache':>10}  (us/decode)")
+    for n_prev in (0, 1, 5):
+        previous = [f"old-secret-{i}" for i in range(n_prev)]
+        with app.app_context():
+            app.config["JWT_PREVIOUS_SECRETS"] = previous
+            oldest = previous[-1] if previous else app.config["JWT_SECRET"]
+
+            app.config["JWT_VERIFIED_CACHE_SIZE"] = 0
+            app.extensions.pop("jwt_keyring", None)
+            before = _per_call_us(_legacy_token(oldest))
+
+            app.config["JWT_SECRET"], current = oldest, app.config["JWT_SECRET"]
+            token = create_access_token("bench", "consumer")
+            app.config["JWT_SECRET"] = current
+            with_kid = _per_call_us(token)
+
+            app.config["JWT_VERIFIED_CACHE_SIZE"] = 1024
+            app.extensions.pop("jwt_keyring", None)
+            cached = _per_call_us(token)
+        print(f"{n_prev:>8} {before:>10.1f} {with_kid:>10.1f} {cached:>10.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,114 @@
+"""Write amplification of order audit rows: legacy triple write vs journal.
+
+"legacy" replays what a cancel used to write (an ``order_status_log`` row,
+an ``order_action_log`` row and a system ``order_messages`` row, through
+the ORM); "journal" is ``record_event`` with the order's stream route, as the
+order services call it. Rows, statements and bound payload bytes are counted
+per mutation; payload is the sum of the bound parameter sizes and
+approximates what reaches the WAL.
+
+Run with ``python -m benchmarks.bench_order_events``.
+"""
+import os
+import time
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, Text, event, insert
+from sqlalchemy.sql import func
+
+os.environ.setdefault("APP_ENV", "testing")
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.services.order_events import record_event  # noqa: E402
+from models import db  # noqa: E402
+from models.order import Order, OrderEventKind  # noqa: E402
+from models.shop import Shop  # noqa: E402
+
+ROUNDS = 2000
+ACTOR = "9000000000"
+
+_legacy = MetaData()
+_pk = BigInteger().with_variant(Integer(), "sqlite")
+STATUS_LOG = Table(
+    "legacy_order_status_log", _legacy,
+    Column("id", _pk, primary_key=True),
+    Column("order_id", BigInteger, nullable=False),
+    Column("status", String(30), nullable=False),
+    Column("updated_by", String(15), nullable=False),
+    Column("timestamp", DateTime, default=func.now()),
+)
+ACTION_LOG = Table(
+    "legacy_order_action_log", _legacy,
+    Column("id", _pk, primary_key=True),
+    Column("order_id", BigInteger, nullable=False),
+    Column("action_type", String(50), nullable=False),
+    Column("actor_phone", String(15), nullable=False),
+    Column("details", Text),
+    Column("timestamp", DateTime, default=func.now()),
+)
+MESSAGES = Table(
+    "legacy_order_messages", _legacy,
+    Column("id", _pk, primary_key=True),
+    Column("order_id", BigInteger, nullable=False),
+    Column("sender_phone", String(15), nullable=False),
+    Column("message", Text, nullable=False),
+    Column("timestamp", DateTime, default=func.now()),
+)
+
+
+def _legacy_write(order_id, shop_id):
+    db.session.execute(insert(STATUS_LOG).values(order_id=order_id, status="cancelled", updated_by=ACTOR))
+    db.session.execute(insert(ACTION_LOG).values(
+        order_id=order_id, action_type="order_cancelled", actor_phone=ACTOR, details="Cancelled by consumer"))
+    db.session.execute(insert(MESSAGES).values(order_id=order_id, sender_phone=ACTOR, message="Order cancelled by you."))
+
+
+def _journal_write(order_id, shop_id):
+    record_event(order_id, OrderEventKind.CANCELLED_BY_CONSUMER, ACTOR, status="cancelled", route=(shop_id, ACTOR))
+
+
+def _payload(parameters):
+    rows = parameters if isinstance(parameters, list) else [parameters]
+    size = 0
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else row
+        size += sum(len(str(v).encode()) if v is not None else 1 for v in values)
+    return size
+
+
+def _measure(write, order_id, shop_id):
+    counts = {"statements": 0, "bytes": 0}
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+        counts["bytes"] += _payload(parameters)
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        write(order_id, shop_id)
+        db.session.commit()
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, "before_cursor_execute", _count)
+    return elapsed / ROUNDS * 1e6, counts["statements"] / ROUNDS, counts["bytes"] / ROUNDS
+
+
+def run():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        _legacy.create_all(db.engine)
+        shop = Shop(shop_name="B", shop_type="grocery", society="s", city="c", phone="vendor", is_open=True)
+        db.session.add(shop)
+        db.session.flush()
+        order = Order(user_phone=ACTOR, shop_id=shop.id, status="pending", payment_mode="cash", total_amount=1)
+        db.session.add(order)
+        db.session.commit()
+
+        print(f"{'writer':>8} {'rows':>5} {'stmts':>6} {'bytes':>6} {'us/op':>7}")
+        for name, write, rows in (("legacy", _legacy_write, 3), ("journal", _journal_write, 1)):
+            us, statements, size = _measure(write, order.id, shop.id)
+            print(f"{name:>8} {rows:>5} {statements:>6.1f} {size:>6.0f} {us:>7.1f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,111 @@
+"""Resident memory while streaming the vendor order export.
+
+Seeds 500k orders of two lines each for one shop into a temporary SQLite
+file, then reads ``/vendor/orders/export`` chunk by chunk through the test
+client and samples RSS every 50k orders, for both formats. For contrast, it
+then loads the same rows with ``.all()``, which is the minimum a response
+built in memory would cost. RSS comes from ``/proc/self/statm`` (Linux).
+
+Run with ``python -m benchmarks.bench_order_export``.
+"""
+import gc
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+os.environ.setdefault("APP_ENV", "testing")
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.routes.vendor.export import _export_rows  # noqa: E402
+from app.version import API_PREFIX  # noqa: E402
+from models import db  # noqa: E402
+from models.order import Order, OrderItem  # noqa: E402
+from models.shop import Shop  # noqa: E402
+
+ORDERS = 500_000
+LINES = 2
+SEED_CHUNK = 50_000
+SAMPLE_EVERY = 50_000
+VENDOR = "bench-vendor"
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as fh:
+        pages = int(fh.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _seed(shop_id):
+    base = datetime(2026, 1, 1)
+    for first in range(1, ORDERS + 1, SEED_CHUNK):
+        ids = range(first, min(first + SEED_CHUNK, ORDERS + 1))
+        db.session.execute(insert(Order), [
+            {"id": n, "user_phone": "bench-consumer", "shop_id": shop_id, "status": "delivered", "version": 1,
+             "payment_mode": "cash", "total_amount": 40, "final_amount": 40, "item_count": LINES,
+             "created_at": base + timedelta(minutes=n)}
+            for n in ids
+        ])
+        db.session.execute(insert(OrderItem), [
+            {"order_id": n, "item_id": i, "name": f"item-{i}", "unit": "pcs", "unit_price": 10, "quantity": 2,
+             "subtotal": 20}
+            for n in ids
+            for i in range(LINES)
+        ])
+        db.session.commit()
+    db.session.remove()
+    gc.collect()
+
+
+def _export(client, headers, fmt):
+    resp = client.get(f"{API_PREFIX}/vendor/orders/export", headers=headers,
+                      query_string={"format": fmt}, buffered=False)
+    orders, last_order, next_sample, samples = 0, None, SAMPLE_EVERY, []
+    start = time.perf_counter()
+    for chunk in resp.response:
+        for line in chunk.decode().splitlines():
+            order_id = line.split(",", 1)[0] if fmt == "csv" else line[len('{"order_id": '):].split(",", 1)[0]
+            if order_id != last_order and order_id != "order_id":
+                orders, last_order = orders + 1, order_id
+        if orders >= next_sample:
+            samples.append((orders, _rss_mb()))
+            next_sample += SAMPLE_EVERY
+    elapsed = time.perf_counter() - start
+    resp.close()
+    return orders, elapsed, samples
+
+
+def run():
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'export.db')}"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            shop = Shop(shop_name="B", shop_type="grocery", society="s", city="c", phone=VENDOR, is_open=True)
+            db.session.add(shop)
+            db.session.commit()
+            shop_id = shop.id
+            _seed(shop_id)
+
+            client = app.test_client()
+            token = client.post("/__auth/login_stub", json={"phone": VENDOR, "role": "vendor"}).get_json()
+            headers = {"Authorization": f"Bearer {token['data']['access']}"}
+            print(f"{ORDERS} orders x {LINES} lines; RSS before export {_rss_mb():.1f} MB")
+            for fmt in ("ndjson", "csv"):
+                orders, elapsed, samples = _export(client, headers, fmt)
+                rss = [mb for _, mb in samples]
+                print(f"{fmt:>6}: {orders} orders in {elapsed:.1f}s, RSS {min(rss):.1f}..{max(rss):.1f} MB")
+                print("        " + " ".join(f"{n // 1000}k:{mb:.0f}" for n, mb in samples))
+
+            gc.collect()
+            before = _rss_mb()
+            rows = _export_rows(shop_id, None, None).all()
+            print(f"   all: {len(rows)} rows held in memory, RSS {before:.1f} -> {_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,96 @@
+"""Order list latency with the stored preview versus loading order lines.
+
+Seeds 100k orders of four lines each for one shop and one consumer, then
+walks the first pages of the vendor order list and the consumer history
+through the test client. "preview" is the default response built from
+``item_count`` / ``items_preview``; "expand" passes ``expand=items`` and
+adds the ``selectinload`` of ``order_item`` the lists used to always run.
+
+Run with ``python -m benchmarks.bench_order_list``.
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert
+
+os.environ.setdefault("APP_ENV", "testing")
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from app.version import API_PREFIX  # noqa: E402
+from models import db  # noqa: E402
+from models.order import Order, OrderItem, items_summary  # noqa: E402
+from models.shop import Shop  # noqa: E402
+
+ORDERS = 100_000
+LINES = 4
+PAGES = 50
+LIMIT = 20
+CONSUMER = "bench-consumer"
+VENDOR = "bench-vendor"
+NAMES = [f"item-{n}" for n in range(LINES)]
+
+
+def _seed(shop_id):
+    base = datetime(2026, 1, 1)
+    summary = items_summary((name, 2) for name in NAMES)
+    db.session.execute(insert(Order), [
+        {"id": n, "user_phone": CONSUMER, "shop_id": shop_id, "status": "delivered", "version": 1,
+         "payment_mode": "cash", "total_amount": 80, "final_amount": 80,
+         "created_at": base + timedelta(minutes=n), **summary}
+        for n in range(1, ORDERS + 1)
+    ])
+    db.session.execute(insert(OrderItem), [
+        {"order_id": n, "item_id": i, "name": name, "unit": "pcs", "unit_price": 10, "quantity": 2, "subtotal": 20}
+        for n in range(1, ORDERS + 1)
+        for i, name in enumerate(NAMES)
+    ])
+    db.session.commit()
+
+
+def _walk(client, url, headers, **params):
+    statements = [0]
+
+    def _count(*_):
+        statements[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", _count)
+    cursor = None
+    start = time.perf_counter()
+    for _ in range(PAGES):
+        query = dict(params, limit=LIMIT, **({"before": cursor} if cursor else {}))
+        cursor = client.get(url, headers=headers, query_string=query).get_json()["next_before"]
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine, "before_cursor_execute", _count)
+    return elapsed / PAGES * 1e3, statements[0] / PAGES
+
+
+def _login(client, phone, role):
+    token = client.post("/__auth/login_stub", json={"phone": phone, "role": role}).get_json()["data"]["access"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def run():
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        shop = Shop(shop_name="B", shop_type="grocery", society="s", city="c", phone=VENDOR, is_open=True)
+        db.session.add(shop)
+        db.session.commit()
+        _seed(shop.id)
+        client = app.test_client()
+        lists = (
+            ("vendor", f"{API_PREFIX}/vendor/orders", _login(client, VENDOR, "vendor")),
+            ("consumer", f"{API_PREFIX}/consumer/order/history", _login(client, CONSUMER, "consumer")),
+        )
+        print(f"{ORDERS} orders x {LINES} lines, {PAGES} pages of {LIMIT}")
+        print(f"{'list':>8} {'preview ms':>11} {'stmts':>6} {'expand ms':>10} {'stmts':>6}")
+        for name, url, headers in lists:
+            _walk(client, url, headers)  # warm auth caches
+            preview = _walk(client, url, headers)
+            expand = _walk(client, url, headers, expand="items")
+            print(f"{name:>8} {preview[0]:>11.2f} {preview[1]:>6.1f} {expand[0]:>10.2f} {expand[1]:>6.1f}")
+
+
+if __name__ == "__main__":
+    run()
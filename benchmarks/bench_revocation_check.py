@@ -0,0 +1,66 @@
+"""Per-request cost of the revocation check in ``auth_required``.
+
+"filter" is ``RevocationList.is_revoked`` for a live token with a warm
+filter: the path every authenticated request takes. "table" is the naive
+alternative of asking ``revoked_token`` on every request. "revoked" is a
+revoked token: a filter hit confirmed against the table.
+
+Run with ``python -m benchmarks.bench_revocation_check``.
+"""
+import os
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+os.environ.setdefault("APP_ENV", "testing")
+
+from app import create_app  # noqa: E402
+from app.config import TestingConfig  # noqa: E402
+from models import db  # noqa: E402
+from models.user import RevokedToken  # noqa: E402
+
+ROUNDS = 5000
+
+
+def _per_call_us(fn, rounds=ROUNDS):
+    return timeit.timeit(fn, number=rounds) / rounds * 1e6
+
+
+def _seed(n):
+    if n <= 0:
+        return
+    expires = datetime.utcnow() + timedelta(days=1)
+    now = datetime.utcnow()
+    db.session.execute(
+        RevokedToken.__table__.insert(),
+        [{"jti": uuid.uuid4().hex, "reason": "logout", "revoked_at": now, "expires_at": expires} for _ in range(n)],
+    )
+    db.session.commit()
+
+
+def run():
+    app = create_app(TestingConfig)
+    print(f"{'revoked rows':>12} {'filter':>10} {'table':>10} {'revoked':>10}  (us/check)")
+    with app.app_context():
+        db.create_all()
+        seeded = 0
+        for total in (0, 10000, 100000):
+            _seed(total - seeded)
+            seeded = total
+            revocations = app.revocations
+            revocations.reset()
+            revocations.sync(force=True)
+            live = {"jti": uuid.uuid4().hex, "fam": uuid.uuid4().hex}
+            revoked = {"jti": uuid.uuid4().hex}
+            revocations.revoke(revoked["jti"], datetime.utcnow() + timedelta(days=1), "logout")
+            db.session.commit()
+            seeded += 1
+
+            filtered = _per_call_us(lambda: revocations.is_revoked(live))
+            table = _per_call_us(lambda: revocations.lookup(live["jti"], live["fam"]), rounds=500)
+            hit = _per_call_us(lambda: revocations.is_revoked(revoked), rounds=500)
+            print(f"{total:>12} {filtered:>10.1f} {table:>10.1f} {hit:>10.1f}")
+
+
+if __name__ == "__main__":
+    run()
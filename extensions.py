@@ -1,11 +1,12 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import os
+import ratelimit_storage  # noqa: F401  registers the shm:// storage scheme
 
 # Global limiter instance used across the app
 limiter = Limiter(
     key_func=get_remote_address,
     storage_uri=os.getenv("RATELIMIT_STORAGE_URL", "memory://"),
-    strategy="fixed-window",
+    strategy=os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter"),
     default_limits=["200 per hour"],
 )
@@ -0,0 +1,38 @@
+"""one pending otp per phone with indexed expiry
+
+Revision ID: 5d2f7a9c1e43
+Revises: 4b0611360b37
+Create Date: 2026-10-17 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5d2f7a9c1e43'
+down_revision = '4b0611360b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep only the latest OTP per phone so the unique index can be built.
+    op.execute("DELETE FROM otp WHERE id NOT IN (SELECT MAX(id) FROM otp GROUP BY phone)")
+    with op.batch_alter_table('otp', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+        batch_op.drop_column('token')
+        batch_op.create_index('ix_otp_phone', ['phone'], unique=True)
+        batch_op.create_index('ix_otp_expires_at', ['expires_at'], unique=False)
+    # Pending codes issued before the upgrade keep the old fixed 10 minute window.
+    op.execute(
+        "UPDATE otp SET expires_at = created_at + INTERVAL '10 minutes'"
+        if op.get_bind().dialect.name == "postgresql"
+        else "UPDATE otp SET expires_at = datetime(created_at, '+10 minutes')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('otp', schema=None) as batch_op:
+        batch_op.drop_index('ix_otp_expires_at')
+        batch_op.drop_index('ix_otp_phone')
+        batch_op.add_column(sa.Column('token', sa.String(length=64), nullable=True))
+        batch_op.drop_column('expires_at')
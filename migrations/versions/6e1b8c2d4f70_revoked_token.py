@@ -0,0 +1,38 @@
+"""revoked token table for jti and session-family revocation
+
+Revision ID: 6e1b8c2d4f70
+Revises: 5d2f7a9c1e43
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '6e1b8c2d4f70'
+down_revision = '5d2f7a9c1e43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'revoked_token',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('jti', sa.String(length=64), nullable=False),
+        sa.Column('reason', sa.String(length=20), nullable=False),
+        sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.create_index('ix_revoked_token_jti', ['jti'], unique=True)
+        batch_op.create_index('ix_revoked_token_revoked_at', ['revoked_at'], unique=False)
+        batch_op.create_index('ix_revoked_token_expires_at', ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.drop_index('ix_revoked_token_expires_at')
+        batch_op.drop_index('ix_revoked_token_revoked_at')
+        batch_op.drop_index('ix_revoked_token_jti')
+    op.drop_table('revoked_token')
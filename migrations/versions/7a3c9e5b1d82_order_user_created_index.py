@@ -0,0 +1,23 @@
+"""index order history by (user_phone, created_at)
+
+Revision ID: 7a3c9e5b1d82
+Revises: 6e1b8c2d4f70
+Create Date: 2026-10-17 11:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7a3c9e5b1d82'
+down_revision = '6e1b8c2d4f70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index('ix_order_user_created', ['user_phone', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_user_created')
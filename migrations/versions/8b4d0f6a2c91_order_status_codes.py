@@ -0,0 +1,61 @@
+"""store order status as a small integer code and add a version column
+
+Revision ID: 8b4d0f6a2c91
+Revises: 7a3c9e5b1d82
+Create Date: 2026-10-17 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8b4d0f6a2c91'
+down_revision = '7a3c9e5b1d82'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of models.order.OrderStatus at the time of this migration.
+CODES = {
+    'pending': 1,
+    'accepted': 2,
+    'rejected': 3,
+    'awaiting_consumer_confirmation': 4,
+    'confirmed': 5,
+    'delivered': 6,
+    'cancelled': 7,
+    'return_accepted': 8,
+    'return_completed': 9,
+    'modified': 10,
+}
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_code', sa.SmallInteger(), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    order = sa.table('order', sa.column('status', sa.String), sa.column('status_code', sa.SmallInteger))
+    op.execute(order.update().values(status_code=sa.case(CODES, value=order.c.status, else_=None)))
+
+    op.drop_index('ix_order_shop_status', table_name='order')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('status')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.alter_column('status_code', new_column_name='status')
+    op.create_index('ix_order_shop_status', 'order', ['shop_id', 'status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status_label', sa.String(length=50), nullable=True))
+
+    order = sa.table('order', sa.column('status', sa.SmallInteger), sa.column('status_label', sa.String))
+    labels = {code: label for label, code in CODES.items()}
+    op.execute(order.update().values(status_label=sa.case(labels, value=order.c.status, else_=None)))
+
+    op.drop_index('ix_order_shop_status', table_name='order')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('status')
+        batch_op.drop_column('version')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.alter_column('status_label', new_column_name='status')
+    op.create_index('ix_order_shop_status', 'order', ['shop_id', 'status'], unique=False)
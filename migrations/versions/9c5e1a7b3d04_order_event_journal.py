@@ -0,0 +1,133 @@
+"""order_event journal replacing status log, action log and system messages
+
+Revision ID: 9c5e1a7b3d04
+Revises: 8b4d0f6a2c91
+Create Date: 2026-10-17 13:00:00.000000
+
+The legacy order_status_log, order_action_log and order_messages tables are
+left in place as an archive. Action-log rows are copied with the kind of
+their action_type and their original details as the body; every legacy chat
+message was written next to one of those actions, so the chat is rebuilt
+from them too. Status rows are copied as LEGACY_STATUS, which feeds the
+status timeline only. Action types outside ACTION_KINDS are not copied.
+
+Migrated issues keep the old "Issue: <type> | <description>" details, which
+the chat now shows as well; new issues use "Issue raised: <type>\n<description>"
+for both.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9c5e1a7b3d04'
+down_revision = '8b4d0f6a2c91'
+branch_labels = None
+depends_on = None
+
+# Frozen copies of models.order.OrderStatus / OrderEventKind codes.
+STATUS_CODES = {
+    'pending': 1,
+    'accepted': 2,
+    'rejected': 3,
+    'awaiting_consumer_confirmation': 4,
+    'confirmed': 5,
+    'delivered': 6,
+    'cancelled': 7,
+    'return_accepted': 8,
+    'return_completed': 9,
+    'modified': 10,
+}
+ACTION_KINDS = {
+    'order_created': 1,
+    'status_updated': 2,
+    'vendor_modified': 5,
+    'modification_confirmed': 6,
+    'return_requested': 7,
+    'return_accepted': 8,
+    'vendor_forced_return': 9,
+    'return_completed': 10,
+    'issue_raised': 11,
+    'order_rated': 12,
+    'message_sent': 13,
+}
+CANCELLED_BY_CONSUMER = 3
+CANCELLED_BY_VENDOR = 4
+LEGACY_STATUS = 14
+
+
+def upgrade():
+    op.create_table(
+        'order_event',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('order_id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.SmallInteger(), nullable=False),
+        sa.Column('status', sa.SmallInteger(), nullable=True),
+        sa.Column('actor', sa.String(length=15), nullable=False),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['order.id'], name='fk_order_event_order_id'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    with op.batch_alter_table('order_event', schema=None) as batch_op:
+        batch_op.create_index('ix_order_event_order', ['order_id', 'id'], unique=False)
+
+    event = sa.table(
+        'order_event',
+        sa.column('order_id'), sa.column('kind'), sa.column('status'),
+        sa.column('actor'), sa.column('body'), sa.column('created_at'),
+    )
+    status_log = sa.table(
+        'order_status_log',
+        sa.column('id'), sa.column('order_id'), sa.column('status'),
+        sa.column('updated_by'), sa.column('timestamp'),
+    )
+    action_log = sa.table(
+        'order_action_log',
+        sa.column('id'), sa.column('order_id'), sa.column('action_type'),
+        sa.column('actor_phone'), sa.column('details'), sa.column('timestamp'),
+    )
+    action_kind = sa.case(
+        (
+            action_log.c.action_type == 'order_cancelled',
+            sa.case(
+                (action_log.c.details == 'Cancelled by consumer', CANCELLED_BY_CONSUMER),
+                else_=CANCELLED_BY_VENDOR,
+            ),
+        ),
+        else_=sa.case(ACTION_KINDS, value=action_log.c.action_type),
+    )
+    legacy = sa.union_all(
+        sa.select(
+            status_log.c.order_id,
+            sa.literal(LEGACY_STATUS).label('kind'),
+            sa.case(STATUS_CODES, value=status_log.c.status, else_=None).label('status'),
+            status_log.c.updated_by.label('actor'),
+            sa.null().label('body'),
+            status_log.c.timestamp.label('created_at'),
+            sa.literal(0).label('source'),
+            status_log.c.id.label('source_id'),
+        ),
+        sa.select(
+            action_log.c.order_id,
+            action_kind.label('kind'),
+            sa.null().label('status'),
+            action_log.c.actor_phone.label('actor'),
+            action_log.c.details.label('body'),
+            action_log.c.timestamp.label('created_at'),
+            sa.literal(1).label('source'),
+            action_log.c.id.label('source_id'),
+        ).where(action_log.c.action_type.in_(list(ACTION_KINDS) + ['order_cancelled'])),
+    ).subquery('legacy')
+    op.execute(event.insert().from_select(
+        ['order_id', 'kind', 'status', 'actor', 'body', 'created_at'],
+        sa.select(
+            legacy.c.order_id, legacy.c.kind, legacy.c.status,
+            legacy.c.actor, legacy.c.body, legacy.c.created_at,
+        ).order_by(legacy.c.created_at, legacy.c.source, legacy.c.source_id),
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('order_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_event_order')
+    op.drop_table('order_event')
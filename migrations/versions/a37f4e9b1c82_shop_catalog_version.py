@@ -0,0 +1,27 @@
+"""add shop.catalog_version
+
+Revision ID: a37f4e9b1c82
+Revises: f26e3d8a0b71
+Create Date: 2026-10-17 22:00:00.000000
+
+Versions each shop's consumer catalog so the serialized item list can be
+cached and served with an ETag.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a37f4e9b1c82'
+down_revision = 'f26e3d8a0b71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shop', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('catalog_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('shop', schema=None) as batch_op:
+        batch_op.drop_column('catalog_version')
@@ -0,0 +1,67 @@
+"""order item_count and items_preview for list views
+
+Revision ID: ad1e7f3b5c26
+Revises: 9c5e1a7b3d04
+Create Date: 2026-10-17 14:00:00.000000
+
+Existing orders are backfilled from order_item in batches.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'ad1e7f3b5c26'
+down_revision = '9c5e1a7b3d04'
+branch_labels = None
+depends_on = None
+
+# Frozen copies of models.order.PREVIEW_ITEMS / ITEMS_PREVIEW_LENGTH.
+PREVIEW_ITEMS = 3
+ITEMS_PREVIEW_LENGTH = 255
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('items_preview', sa.String(length=ITEMS_PREVIEW_LENGTH), nullable=True))
+
+    order = sa.table('order', sa.column('id'), sa.column('item_count'), sa.column('items_preview'))
+    order_item = sa.table(
+        'order_item', sa.column('id'), sa.column('order_id'), sa.column('name'), sa.column('quantity'),
+    )
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        order_ids = conn.execute(
+            sa.select(order.c.id).where(order.c.id > last_id).order_by(order.c.id).limit(BATCH_SIZE)
+        ).scalars().all()
+        if not order_ids:
+            break
+        last_id = order_ids[-1]
+        lines = {}
+        for row in conn.execute(
+            sa.select(order_item.c.order_id, order_item.c.name, order_item.c.quantity)
+            .where(order_item.c.order_id.in_(order_ids))
+            .order_by(order_item.c.order_id, order_item.c.id)
+        ):
+            lines.setdefault(row.order_id, []).append((row.name, row.quantity))
+        if not lines:
+            continue
+        conn.execute(
+            order.update().where(order.c.id == sa.bindparam('b_id')),
+            [
+                {
+                    'b_id': order_id,
+                    'item_count': len(rows),
+                    'items_preview': ", ".join(f"{name} x{qty}" for name, qty in rows[:PREVIEW_ITEMS])[:ITEMS_PREVIEW_LENGTH] or None,
+                }
+                for order_id, rows in lines.items()
+            ],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('items_preview')
+        batch_op.drop_column('item_count')
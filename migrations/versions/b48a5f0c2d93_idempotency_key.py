@@ -0,0 +1,36 @@
+"""add idempotency_key
+
+Revision ID: b48a5f0c2d93
+Revises: a37f4e9b1c82
+Create Date: 2026-10-18 09:00:00.000000
+
+Idempotency keys move from per-process memory to a table shared by every
+gunicorn worker.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b48a5f0c2d93'
+down_revision = 'a37f4e9b1c82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'idempotency_key',
+        sa.Column('key', sa.String(length=300), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('record', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    with op.batch_alter_table('idempotency_key', schema=None) as batch_op:
+        batch_op.create_index('ix_idempotency_key_expires_at', ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_key', schema=None) as batch_op:
+        batch_op.drop_index('ix_idempotency_key_expires_at')
+    op.drop_table('idempotency_key')
@@ -0,0 +1,141 @@
+"""archive tables for closed orders
+
+Revision ID: be2f8a4c6d37
+Revises: ad1e7f3b5c26
+Create Date: 2026-10-17 15:00:00.000000
+
+On PostgreSQL order_archive is range-partitioned by created_at. The archive
+job adds one partition per month; rows with a NULL created_at land in the
+default partition. A partitioned table's primary key would have to include
+created_at, which is nullable, so there the archive is keyed by a plain
+index on id instead.
+
+The legacy order_status_log, order_action_log and order_messages tables
+lose their foreign keys to order so archived orders can be deleted; the
+keys are not restored on downgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'be2f8a4c6d37'
+down_revision = 'ad1e7f3b5c26'
+branch_labels = None
+depends_on = None
+
+LEGACY_TABLES = ('order_status_log', 'order_action_log', 'order_messages')
+
+
+def _order_archive(postgresql):
+    columns = [
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('user_phone', sa.String(length=15), nullable=False),
+        sa.Column('shop_id', sa.BigInteger(), nullable=False),
+        sa.Column('status', sa.SmallInteger(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('payment_mode', sa.String(length=10), nullable=False),
+        sa.Column('payment_status', sa.String(length=20), nullable=True),
+        sa.Column('delivery_notes', sa.Text(), nullable=True),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('final_amount', sa.Float(), nullable=True),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.Column('items_preview', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ]
+    if postgresql:
+        op.create_table('order_archive', *columns, postgresql_partition_by='RANGE (created_at)')
+        op.execute('CREATE TABLE order_archive_default PARTITION OF order_archive DEFAULT')
+        op.create_index('ix_order_archive_id', 'order_archive', ['id'], unique=False)
+    else:
+        op.create_table('order_archive', *columns, sa.PrimaryKeyConstraint('id'))
+    op.create_index('ix_order_archive_user_created', 'order_archive', ['user_phone', 'created_at'], unique=False)
+    op.create_index('ix_order_archive_shop_created', 'order_archive', ['shop_id', 'created_at'], unique=False)
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    _order_archive(postgresql)
+
+    op.create_table(
+        'order_item_archive',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('order_id', sa.BigInteger(), nullable=False),
+        sa.Column('item_id', sa.BigInteger(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=True),
+        sa.Column('unit', sa.String(length=50), nullable=True),
+        sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_item_archive_order', 'order_item_archive', ['order_id'], unique=False)
+
+    op.create_table(
+        'order_event_archive',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('order_id', sa.BigInteger(), nullable=False),
+        sa.Column('kind', sa.SmallInteger(), nullable=False),
+        sa.Column('status', sa.SmallInteger(), nullable=True),
+        sa.Column('actor', sa.String(length=15), nullable=False),
+        sa.Column('body', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_event_archive_order', 'order_event_archive', ['order_id', 'id'], unique=False)
+
+    op.create_table(
+        'order_return_archive',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('order_id', sa.BigInteger(), nullable=False),
+        sa.Column('item_id', sa.BigInteger(), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(length=255), nullable=True),
+        sa.Column('initiated_by', sa.String(length=20), nullable=True),
+        sa.Column('status', sa.String(length=30), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_return_archive_order', 'order_return_archive', ['order_id'], unique=False)
+
+    op.create_table(
+        'order_rating_archive',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('order_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_phone', sa.String(length=15), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('review', sa.String(length=250), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_rating_archive_order', 'order_rating_archive', ['order_id'], unique=False)
+
+    op.create_table(
+        'order_issue_archive',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('order_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_phone', sa.String(), nullable=False),
+        sa.Column('issue_type', sa.String(length=50), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=30), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_order_issue_archive_order', 'order_issue_archive', ['order_id'], unique=False)
+
+    if postgresql:
+        for table in LEGACY_TABLES:
+            op.execute(f'ALTER TABLE IF EXISTS {table} DROP CONSTRAINT IF EXISTS {table}_order_id_fkey')
+
+
+def downgrade():
+    for table in ('order_issue', 'order_rating', 'order_return', 'order_event', 'order_item'):
+        op.drop_index(f'ix_{table}_archive_order', table_name=f'{table}_archive')
+        op.drop_table(f'{table}_archive')
+    op.drop_index('ix_order_archive_shop_created', table_name='order_archive')
+    op.drop_index('ix_order_archive_user_created', table_name='order_archive')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_order_archive_id', table_name='order_archive')
+        op.drop_table('order_archive_default')
+    op.drop_table('order_archive')
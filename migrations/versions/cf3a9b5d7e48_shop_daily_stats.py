@@ -0,0 +1,40 @@
+"""shop_daily_stats rollup for the vendor dashboard
+
+Revision ID: cf3a9b5d7e48
+Revises: be2f8a4c6d37
+Create Date: 2026-10-17 16:00:00.000000
+
+The table starts empty; fill it from history with `flask rebuild-shop-stats`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'cf3a9b5d7e48'
+down_revision = 'be2f8a4c6d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'shop_daily_stats',
+        sa.Column('shop_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('orders_placed', sa.Integer(), nullable=False),
+        sa.Column('orders_delivered', sa.Integer(), nullable=False),
+        sa.Column('orders_rejected', sa.Integer(), nullable=False),
+        sa.Column('orders_cancelled', sa.Integer(), nullable=False),
+        sa.Column('orders_returned', sa.Integer(), nullable=False),
+        sa.Column('gmv', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('wallet_gmv', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('cash_gmv', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('items_delivered', sa.Integer(), nullable=False),
+        sa.Column('returns_value', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['shop_id'], ['shop.id'], name='fk_shop_daily_stats_shop_id'),
+        sa.PrimaryKeyConstraint('shop_id', 'day'),
+    )
+
+
+def downgrade():
+    op.drop_table('shop_daily_stats')
@@ -0,0 +1,33 @@
+"""partial index on order_event for chat threads
+
+Revision ID: d04b1c6e8f59
+Revises: cf3a9b5d7e48
+Create Date: 2026-10-17 18:00:00.000000
+
+Message reads filter on the kinds in models.order.EVENT_MESSAGE_KINDS; the
+predicate below must match models.order._MESSAGE_KINDS_SQL exactly.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd04b1c6e8f59'
+down_revision = 'cf3a9b5d7e48'
+branch_labels = None
+depends_on = None
+
+MESSAGE_KINDS_SQL = "kind IN (3, 4, 5, 6, 11, 13)"
+
+
+def upgrade():
+    op.create_index(
+        'ix_order_event_message',
+        'order_event',
+        ['order_id', 'id'],
+        postgresql_where=sa.text(MESSAGE_KINDS_SQL),
+        sqlite_where=sa.text(MESSAGE_KINDS_SQL),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_order_event_message', table_name='order_event')
@@ -0,0 +1,24 @@
+"""index order_item by order_id
+
+Revision ID: e15c2d7f9a60
+Revises: d04b1c6e8f59
+Create Date: 2026-10-17 19:00:00.000000
+
+Order lines were only reachable by scanning order_item; the vendor export
+joins them for every order of a shop.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e15c2d7f9a60'
+down_revision = 'd04b1c6e8f59'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_order_item_order', 'order_item', ['order_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_order_item_order', table_name='order_item')
@@ -0,0 +1,42 @@
+"""one cart_item row per (user_phone, item_id)
+
+Revision ID: f26e3d8a0b71
+Revises: e15c2d7f9a60
+Create Date: 2026-10-17 21:00:00.000000
+
+Cart adds become a single INSERT ... ON CONFLICT on this key. Duplicate
+lines left by concurrent adds are folded into the oldest one first, up to
+the per-item limit.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f26e3d8a0b71'
+down_revision = 'e15c2d7f9a60'
+branch_labels = None
+depends_on = None
+
+MAX_QUANTITY_PER_ITEM = 10
+
+
+def upgrade():
+    # Capped at the per-item limit (MAX_QUANTITY_PER_ITEM in
+    # app/routes/consumer/cart.py), which the cart upsert never exceeds.
+    op.execute(
+        "UPDATE cart_item SET quantity = ("
+        " SELECT CASE WHEN SUM(COALESCE(dup.quantity, 1)) > %d THEN %d"
+        " ELSE SUM(COALESCE(dup.quantity, 1)) END FROM cart_item dup"
+        " WHERE dup.user_phone = cart_item.user_phone AND dup.item_id = cart_item.item_id)"
+        " WHERE id IN (SELECT MIN(id) FROM cart_item GROUP BY user_phone, item_id HAVING COUNT(*) > 1)"
+        % (MAX_QUANTITY_PER_ITEM, MAX_QUANTITY_PER_ITEM)
+    )
+    op.execute(
+        "DELETE FROM cart_item WHERE id NOT IN (SELECT MIN(id) FROM cart_item GROUP BY user_phone, item_id)"
+    )
+    with op.batch_alter_table('cart_item', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_cart_item_user_item', ['user_phone', 'item_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('cart_item', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_cart_item_user_item', type_='unique')
@@ -10,3 +10,4 @@ db = SQLAlchemy()
 from .user import UserProfile  # noqa: F401
 from .shop import Shop  # noqa: F401
 from .order import Order  # noqa: F401
+from .order_archive import ArchivedOrder  # noqa: F401
@@ -3,6 +3,7 @@ from datetime import datetime
 
 class CartItem(db.Model):
     __tablename__ = "cart_item"
+    __table_args__ = (db.UniqueConstraint("user_phone", "item_id", name="uq_cart_item_user_item"),)
 
     id = db.Column(BIGINT, primary_key=True)
     user_phone = db.Column(db.String(15), db.ForeignKey("user_profile.phone"), nullable=False)
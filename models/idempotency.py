@@ -0,0 +1,15 @@
+from models import db
+
+
+class IdempotencyKey(db.Model):
+    """A claimed ``Idempotency-Key`` and, once the request finished, its stored response.
+
+    ``record`` is NULL while the first request is still running; ``expires_at``
+    then bounds how long a crashed worker's claim blocks retries.
+    """
+    __tablename__ = "idempotency_key"
+
+    key = db.Column(db.String(300), primary_key=True)  # "<phone>:<Idempotency-Key>"
+    fingerprint = db.Column(db.String(64), nullable=False)
+    record = db.Column(db.Text, nullable=True)  # JSON
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
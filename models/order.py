@@ -1,24 +1,101 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+import enum
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, Text, DateTime, ForeignKey, case, literal, select, text
+from sqlalchemy.types import TypeDecorator
 from models import BIGINT
 from sqlalchemy.sql import func
 from models import db
 from datetime import datetime
 
 
+class OrderStatus(enum.IntEnum):
+    """Order statuses and the small integer codes they are stored as.
+
+    Codes are persisted; never renumber an existing member.
+    """
+
+    PENDING = 1
+    ACCEPTED = 2
+    REJECTED = 3
+    AWAITING_CONSUMER_CONFIRMATION = 4
+    CONFIRMED = 5
+    DELIVERED = 6
+    CANCELLED = 7
+    RETURN_ACCEPTED = 8
+    RETURN_COMPLETED = 9
+    MODIFIED = 10
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
+_STATUS_BY_LABEL = {status.label: status for status in OrderStatus}
+
+
+def parse_status_filter(raw) -> list:
+    """Status labels from a comma-separated ``status`` query parameter.
+
+    Raises ValueError for a label that is not an ``OrderStatus``.
+    """
+    statuses = [s for s in (raw or "").split(",") if s]
+    unknown = [s for s in statuses if s not in _STATUS_BY_LABEL]
+    if unknown:
+        raise ValueError(f"unknown order status {unknown[0]!r}")
+    return statuses
+
+
+class OrderStatusType(TypeDecorator):
+    """Status labels in Python, ``OrderStatus`` codes in the database."""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, int):
+            return value
+        try:
+            return int(_STATUS_BY_LABEL[value])
+        except KeyError:
+            raise ValueError(f"unknown order status {value!r}")
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else OrderStatus(value).label
+
+
+PREVIEW_ITEMS = 3
+ITEMS_PREVIEW_LENGTH = 255
+
+
+def items_summary(lines) -> dict:
+    """``item_count`` and ``items_preview`` for ``(name, quantity)`` lines.
+
+    ``lines`` are in display order; the preview names the first
+    ``PREVIEW_ITEMS`` of them, e.g. ``"Milk x2, Bread x1"``.
+    """
+    lines = list(lines)
+    preview = ", ".join(f"{name} x{quantity}" for name, quantity in lines[:PREVIEW_ITEMS])
+    return {"item_count": len(lines), "items_preview": preview[:ITEMS_PREVIEW_LENGTH] or None}
+
+
 class Order(db.Model):
     __tablename__ = "order"
     __table_args__ = (
         db.Index("ix_order_shop_status", "shop_id", "status"),
+        db.Index("ix_order_user_created", "user_phone", "created_at"),
     )
     id = Column(BIGINT, primary_key=True)
     user_phone = Column(String(15), ForeignKey("user_profile.phone"), nullable=False)
     shop_id = Column(BIGINT, ForeignKey("shop.id"), nullable=False)
-    status = Column(String(50), default="pending")  # pending, accepted, modified, confirmed, cancelled, delivered
+    status = Column(OrderStatusType(), default="pending")  # see OrderStatus
+    version = Column(Integer, nullable=False, default=1)
     payment_mode = Column(String(10), nullable=False)  # wallet or cash
     payment_status = Column(String(20), default="unpaid")  # unpaid, paid, refunded, partially_refunded
     delivery_notes = Column(Text, nullable=True)
     total_amount = Column(Float, nullable=False)
     final_amount = Column(Float, nullable=True)
+    # List-view headline, kept in step with order_item by the order services.
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
+    items_preview = Column(String(ITEMS_PREVIEW_LENGTH), nullable=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     ratings = db.relationship("OrderRating", backref="order", lazy=True)
@@ -27,8 +104,13 @@ class Order(db.Model):
     shop = db.relationship("Shop", backref="orders", lazy=True)
     items = db.relationship("OrderItem", backref="order", cascade="all, delete-orphan", lazy=True)
 
+    # Every UPDATE of an order checks and bumps ``version``.
+    __mapper_args__ = {"version_id_col": version}
+
 class OrderItem(db.Model):
     __tablename__ = "order_item"
+    __table_args__ = (db.Index("ix_order_item_order", "order_id"),)
+
     id = db.Column(BIGINT, primary_key=True)
     order_id = db.Column(BIGINT, db.ForeignKey("order.id"), nullable=False)
     item_id = db.Column(BIGINT, nullable=False)
@@ -52,13 +134,118 @@ class OrderItem(db.Model):
 
 
 
-class OrderMessage(db.Model):
-    __tablename__ = "order_messages"
+class OrderEventKind(enum.IntEnum):
+    """What happened to an order; stored as a small integer on ``OrderEvent``.
+
+    Codes are persisted; never renumber an existing member.
+    """
+
+    ORDER_CREATED = 1
+    STATUS_UPDATED = 2
+    CANCELLED_BY_CONSUMER = 3
+    CANCELLED_BY_VENDOR = 4
+    MODIFIED_BY_VENDOR = 5
+    MODIFICATION_CONFIRMED = 6
+    RETURN_REQUESTED = 7
+    RETURN_ACCEPTED = 8
+    RETURN_FORCED = 9
+    RETURN_COMPLETED = 10
+    ISSUE_RAISED = 11
+    ORDER_RATED = 12
+    MESSAGE_SENT = 13
+    # Rows copied from the pre-journal order_status_log. Their actions were
+    # copied separately with the kinds above, so these feed the status
+    # timeline only.
+    LEGACY_STATUS = 14
+
+
+# kind -> (action_type, fixed details, fixed chat message). A missing detail
+# or message falls back to the event body; kinds absent from
+# EVENT_MESSAGE_KINDS post nothing to the order chat.
+EVENT_CATALOG = {
+    OrderEventKind.ORDER_CREATED: ("order_created", "Order placed", None),
+    OrderEventKind.STATUS_UPDATED: ("status_updated", None, None),
+    OrderEventKind.CANCELLED_BY_CONSUMER: ("order_cancelled", "Cancelled by consumer", "Order cancelled by you."),
+    OrderEventKind.CANCELLED_BY_VENDOR: ("order_cancelled", "Cancelled by vendor", "Order cancelled by shop."),
+    OrderEventKind.MODIFIED_BY_VENDOR: ("vendor_modified", None, "Order modified. Awaiting your confirmation."),
+    OrderEventKind.MODIFICATION_CONFIRMED: ("modification_confirmed", None, "I’ve confirmed the changes. Please proceed."),
+    OrderEventKind.RETURN_REQUESTED: ("return_requested", None, None),
+    OrderEventKind.RETURN_ACCEPTED: ("return_accepted", "Vendor accepted the return request", None),
+    OrderEventKind.RETURN_FORCED: ("vendor_forced_return", None, None),
+    OrderEventKind.RETURN_COMPLETED: ("return_completed", "Vendor marked return as picked up", None),
+    OrderEventKind.ISSUE_RAISED: ("issue_raised", None, None),
+    OrderEventKind.ORDER_RATED: ("order_rated", None, None),
+    OrderEventKind.MESSAGE_SENT: ("message_sent", None, None),
+    OrderEventKind.LEGACY_STATUS: ("status_updated", None, None),
+}
+
+EVENT_MESSAGE_KINDS = frozenset({
+    OrderEventKind.CANCELLED_BY_CONSUMER,
+    OrderEventKind.CANCELLED_BY_VENDOR,
+    OrderEventKind.MODIFIED_BY_VENDOR,
+    OrderEventKind.MODIFICATION_CONFIRMED,
+    OrderEventKind.ISSUE_RAISED,
+    OrderEventKind.MESSAGE_SENT,
+})
+
+# Rendered literally so the planner can match the partial index
+# ix_order_event_message; changing the kinds needs a migration for it.
+_MESSAGE_KINDS_SQL = "kind IN (%s)" % ", ".join(str(int(k)) for k in sorted(EVENT_MESSAGE_KINDS))
+
+
+class OrderEvent(db.Model):
+    """Append-only order journal.
+
+    One row per order mutation. ``status`` is set when the event moved the
+    order to a new status; ``body`` only holds text that cannot be derived
+    from ``kind`` (chat messages, modification summaries). The status
+    timeline, action log and chat below are read-only projections of it.
+    """
+
+    __tablename__ = "order_event"
+    __table_args__ = (
+        db.Index("ix_order_event_order", "order_id", "id"),
+        # Chat threads: only the message rows of each order.
+        db.Index(
+            "ix_order_event_message",
+            "order_id",
+            "id",
+            postgresql_where=text(_MESSAGE_KINDS_SQL),
+            sqlite_where=text(_MESSAGE_KINDS_SQL),
+        ),
+    )
+
     id = Column(BIGINT, primary_key=True)
     order_id = Column(BIGINT, ForeignKey("order.id"), nullable=False)
-    sender_phone = Column(String(15), nullable=False)
-    message = Column(Text, nullable=False)
-    timestamp = Column(DateTime, default=func.now())
+    kind = Column(SmallInteger, nullable=False)
+    status = Column(OrderStatusType(), nullable=True)
+    actor = Column(String(15), nullable=False)
+    body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+
+def _catalog_case(index):
+    return case(
+        {int(kind): entry[index] for kind, entry in EVENT_CATALOG.items() if entry[index] is not None},
+        value=OrderEvent.kind,
+    )
+
+
+_status_label = case({int(s): s.label for s in OrderStatus}, value=OrderEvent.__table__.c.status)
+
+
+class OrderMessage(db.Model):
+    __table__ = (
+        select(
+            OrderEvent.id,
+            OrderEvent.order_id,
+            OrderEvent.actor.label("sender_phone"),
+            func.coalesce(_catalog_case(2), OrderEvent.body).label("message"),
+            OrderEvent.created_at.label("timestamp"),
+        )
+        .where(text(f"order_event.{_MESSAGE_KINDS_SQL}"))
+        .subquery("order_messages")
+    )
 
     def to_dict(self):
         return {
@@ -71,12 +258,17 @@ class OrderMessage(db.Model):
 
 
 class OrderStatusLog(db.Model):
-    __tablename__ = "order_status_log"
-    id = Column(BIGINT, primary_key=True)
-    order_id = Column(BIGINT, ForeignKey("order.id"), nullable=False)
-    status = Column(String(30), nullable=False)
-    updated_by = Column(String(15), nullable=False)
-    timestamp = Column(DateTime, default=func.now())
+    __table__ = (
+        select(
+            OrderEvent.id,
+            OrderEvent.order_id,
+            OrderEvent.status,
+            OrderEvent.actor.label("updated_by"),
+            OrderEvent.created_at.label("timestamp"),
+        )
+        .where(OrderEvent.status.is_not(None))
+        .subquery("order_status_log")
+    )
 
     def to_dict(self):
         return {
@@ -88,13 +280,16 @@ class OrderStatusLog(db.Model):
 
 
 class OrderActionLog(db.Model):
-    __tablename__ = "order_action_log"
-    id = Column(BIGINT, primary_key=True)
-    order_id = Column(BIGINT, ForeignKey("order.id"), nullable=False)
-    action_type = Column(String(50), nullable=False)
-    actor_phone = Column(String(15), nullable=False)
-    details = Column(Text, nullable=True)
-    timestamp = Column(DateTime, default=func.now())
+    __table__ = select(
+        OrderEvent.id,
+        OrderEvent.order_id,
+        _catalog_case(0).label("action_type"),
+        OrderEvent.actor.label("actor_phone"),
+        func.coalesce(
+            OrderEvent.body, _catalog_case(1), literal("Order status updated to ") + _status_label
+        ).label("details"),
+        OrderEvent.created_at.label("timestamp"),
+    ).where(OrderEvent.kind != int(OrderEventKind.LEGACY_STATUS)).subquery("order_action_log")
 
 
 class OrderRating(db.Model):
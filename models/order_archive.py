@@ -0,0 +1,70 @@
+"""Cold copies of closed orders.
+
+Each ``<table>_archive`` has the columns of its hot table but no foreign
+keys, defaults or autoincrement: rows arrive by ``INSERT ... SELECT`` from
+``app/services/order_archive.py`` and keep their original ids. On
+PostgreSQL the migration creates ``order_archive`` range-partitioned by
+``created_at``; these definitions describe the columns, not that layout.
+"""
+from sqlalchemy import Column
+from sqlalchemy.orm import foreign
+from models import db
+from models.order import Order, OrderEvent, OrderIssue, OrderItem, OrderRating, OrderReturn
+
+# Statuses an order must have reached before it can be archived.
+ARCHIVED_STATUSES = ("delivered", "cancelled", "return_completed")
+
+
+def may_be_archived(statuses) -> bool:
+    """Whether a list filtered to ``statuses`` (empty: any) can hit the archive."""
+    return not statuses or any(status in ARCHIVED_STATUSES for status in statuses)
+
+
+def _archive_table(model, *indexes):
+    hot = model.__table__
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+        for c in hot.columns
+    ]
+    return db.Table(f"{hot.name}_archive", db.metadata, *columns, *indexes)
+
+
+order_archive = _archive_table(
+    Order,
+    db.Index("ix_order_archive_user_created", "user_phone", "created_at"),
+    db.Index("ix_order_archive_shop_created", "shop_id", "created_at"),
+)
+order_item_archive = _archive_table(OrderItem, db.Index("ix_order_item_archive_order", "order_id"))
+order_event_archive = _archive_table(OrderEvent, db.Index("ix_order_event_archive_order", "order_id", "id"))
+order_return_archive = _archive_table(OrderReturn, db.Index("ix_order_return_archive_order", "order_id"))
+order_rating_archive = _archive_table(OrderRating, db.Index("ix_order_rating_archive_order", "order_id"))
+order_issue_archive = _archive_table(OrderIssue, db.Index("ix_order_issue_archive_order", "order_id"))
+
+# (hot table, archive table), parent first.
+ARCHIVE_TABLES = (
+    (Order.__table__, order_archive),
+    (OrderItem.__table__, order_item_archive),
+    (OrderEvent.__table__, order_event_archive),
+    (OrderReturn.__table__, order_return_archive),
+    (OrderRating.__table__, order_rating_archive),
+    (OrderIssue.__table__, order_issue_archive),
+)
+
+
+class ArchivedOrderItem(db.Model):
+    __table__ = order_item_archive
+
+    to_dict = OrderItem.to_dict
+
+
+class ArchivedOrder(db.Model):
+    """Read-only ``Order`` look-alike for history pages past the archive boundary."""
+
+    __table__ = order_archive
+
+    items = db.relationship(
+        ArchivedOrderItem,
+        primaryjoin=order_archive.c.id == foreign(order_item_archive.c.order_id),
+        order_by=order_item_archive.c.id,
+        viewonly=True,
+    )
@@ -12,6 +12,8 @@ class Shop(db.Model):
     delivers = db.Column(db.Boolean, default=False)
     appointment_only = db.Column(db.Boolean, default=False)
     is_open = db.Column(db.Boolean, default=False)
+    # Bumped by every write that changes the consumer catalog; see app/utils/catalog_cache.py
+    catalog_version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
     last_opened_at = db.Column(db.DateTime)
     last_closed_at = db.Column(db.DateTime)
 
@@ -51,3 +53,26 @@ class ShopActionLog(db.Model):
     action = db.Column(db.String(50))  # 'opened' or 'closed'
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+
+class ShopDailyStats(db.Model):
+    """Per-shop, per-day (UTC) order rollup behind ``GET /vendor/dashboard``.
+
+    Order services add to these counters as orders change; see
+    ``app/services/shop_stats.py``. ``flask rebuild-shop-stats`` recomputes
+    them from the order journal.
+    """
+
+    __tablename__ = "shop_daily_stats"
+
+    shop_id = db.Column(BIGINT, db.ForeignKey("shop.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    orders_placed = db.Column(db.Integer, nullable=False, default=0)
+    orders_delivered = db.Column(db.Integer, nullable=False, default=0)
+    orders_rejected = db.Column(db.Integer, nullable=False, default=0)
+    orders_cancelled = db.Column(db.Integer, nullable=False, default=0)
+    orders_returned = db.Column(db.Integer, nullable=False, default=0)
+    gmv = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # delivered order value
+    wallet_gmv = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    cash_gmv = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    items_delivered = db.Column(db.Integer, nullable=False, default=0)  # order lines, for basket size
+    returns_value = db.Column(db.Numeric(12, 2), nullable=False, default=0)
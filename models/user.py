@@ -7,16 +7,31 @@ class OTP(db.Model):
     __tablename__ = "otp"
 
     id = db.Column(BIGINT, primary_key=True)
-    phone = db.Column(db.String(15), nullable=False)
+    phone = db.Column(db.String(15), nullable=False, unique=True, index=True)  # one pending code per phone
     otp = db.Column(db.String(6), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
     is_used = db.Column(db.Boolean, default=False)
-    token = db.Column(db.String(64), nullable=True)
 
     
     def __repr__(self):
         return f"<OTP phone={self.phone} otp={self.otp}>"
 
+# --- Revoked tokens ---
+
+class RevokedToken(db.Model):
+    """Revoked token ``jti`` or session family id, kept until the token expires."""
+    __tablename__ = "revoked_token"
+
+    id = db.Column(BIGINT, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True, index=True)
+    reason = db.Column(db.String(20), nullable=False)  # logout | rotated | reuse
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RevokedToken jti={self.jti} reason={self.reason}>"
+
 # --- User Profile Model ---
 
 class UserProfile(db.Model):
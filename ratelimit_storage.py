@@ -0,0 +1,226 @@
+"""
+Flask-Limiter storage shared by every worker on a host through an mmap'd file.
+
+Select it with ``RATELIMIT_STORAGE_URL=shm://habrio-ratelimit`` (a file of that
+name under ``/dev/shm``) or ``shm:///absolute/path``. Optional query
+parameters ``shards`` and ``slots`` size the table; the first process to
+create the file fixes the layout and later processes adopt it.
+
+The file is a fixed-size open-addressing hash table split into shards. Each
+shard is guarded by a ``fcntl`` byte-range lock (plus a thread lock for
+threaded workers), so unrelated keys never contend. Counters are addressed
+by a 64-bit BLAKE2 digest of the limiter key.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+from urllib.parse import urlparse, parse_qs
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+_MAGIC = b"HBRLSHM1"
+_HEADER = struct.Struct("<8sII")  # magic, shards, slots per shard
+_HEADER_SIZE = 64
+_SLOT = struct.Struct("<Qqd")  # key digest (0 = never used), count, expires_at
+_INIT_LOCK_OFFSET = 0xFFFFFFFF
+
+
+def _digest(key: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return value or 1
+
+
+def _default_dir() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["shm"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        parsed = urlparse(uri)
+        params = parse_qs(parsed.query)
+        self.path = parsed.path if parsed.path not in ("", "/") else os.path.join(
+            _default_dir(), parsed.netloc or "habrio-ratelimit"
+        )
+        shards = int(params.get("shards", [options.get("shards", 256)])[0])
+        slots = int(params.get("slots", [options.get("slots", 256)])[0])
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._shards, self._slots = self._init_layout(shards, slots)
+        size = _HEADER_SIZE + self._shards * self._slots * _SLOT.size
+        self._mm = mmap.mmap(self._fd, size)
+        self._thread_locks = [threading.Lock() for _ in range(self._shards)]
+
+    @property
+    def base_exceptions(self):
+        return (OSError, ValueError)
+
+    def _init_layout(self, shards, slots):
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, _INIT_LOCK_OFFSET)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if len(header) == _HEADER.size:
+                magic, existing_shards, existing_slots = _HEADER.unpack(header)
+                if magic == _MAGIC:
+                    return existing_shards, existing_slots
+            size = _HEADER_SIZE + shards * slots * _SLOT.size
+            os.ftruncate(self._fd, 0)
+            os.ftruncate(self._fd, size)
+            os.pwrite(self._fd, _HEADER.pack(_MAGIC, shards, slots), 0)
+            return shards, slots
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, _INIT_LOCK_OFFSET)
+
+    @contextmanager
+    def _locked(self, shard):
+        with self._thread_locks[shard]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, shard)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, shard)
+
+    def _shard_of(self, key: str) -> int:
+        return _digest(key) % self._shards
+
+    def _find(self, shard, digest, now, create):
+        """Return the slot offset for ``digest`` in ``shard``.
+
+        With ``create`` the key's slot is claimed if missing: the first
+        expired slot on the probe path is reused, then a never-used slot, and
+        if the shard is full the slot closest to expiry is evicted.
+        """
+        base = _HEADER_SIZE + shard * self._slots * _SLOT.size
+        start = (digest >> 16) % self._slots
+        reusable = None
+        oldest = None
+        for i in range(self._slots):
+            offset = base + ((start + i) % self._slots) * _SLOT.size
+            slot_digest, _, expires_at = _SLOT.unpack_from(self._mm, offset)
+            if slot_digest == digest:
+                return offset
+            if slot_digest == 0:
+                if not create:
+                    return None
+                return reusable if reusable is not None else offset
+            if reusable is None and expires_at <= now:
+                reusable = offset
+            if oldest is None or expires_at < oldest[0]:
+                oldest = (expires_at, offset)
+        if not create:
+            return None
+        return reusable if reusable is not None else oldest[1]
+
+    def _read(self, shard, key, now):
+        digest = _digest(key)
+        offset = self._find(shard, digest, now, create=False)
+        if offset is None:
+            return 0, None
+        _, count, expires_at = _SLOT.unpack_from(self._mm, offset)
+        if expires_at <= now:
+            return 0, None
+        return count, expires_at
+
+    def _incr(self, shard, key, expiry, amount, now, elastic_expiry=False):
+        digest = _digest(key)
+        offset = self._find(shard, digest, now, create=True)
+        slot_digest, count, expires_at = _SLOT.unpack_from(self._mm, offset)
+        if slot_digest != digest or expires_at <= now:
+            count, expires_at = 0, now + expiry
+        count += amount
+        if elastic_expiry:
+            expires_at = now + expiry
+        _SLOT.pack_into(self._mm, offset, digest, count, expires_at)
+        return count
+
+    def _clear(self, shard, key):
+        digest = _digest(key)
+        offset = self._find(shard, digest, time.time(), create=False)
+        if offset is not None:
+            _SLOT.pack_into(self._mm, offset, digest, 0, 0.0)
+
+    def incr(self, key: str, expiry: int, amount: int = 1, elastic_expiry: bool = False) -> int:
+        shard = self._shard_of(key)
+        with self._locked(shard):
+            return self._incr(shard, key, expiry, amount, time.time(), elastic_expiry)
+
+    def get(self, key: str) -> int:
+        shard = self._shard_of(key)
+        with self._locked(shard):
+            return self._read(shard, key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        shard = self._shard_of(key)
+        now = time.time()
+        with self._locked(shard):
+            expires_at = self._read(shard, key, now)[1]
+        return expires_at if expires_at is not None else now
+
+    def check(self) -> bool:
+        return not self._mm.closed
+
+    def reset(self) -> int:
+        cleared = 0
+        now = time.time()
+        for shard in range(self._shards):
+            with self._locked(shard):
+                base = _HEADER_SIZE + shard * self._slots * _SLOT.size
+                for i in range(self._slots):
+                    offset = base + i * _SLOT.size
+                    slot_digest, _, expires_at = _SLOT.unpack_from(self._mm, offset)
+                    if slot_digest and expires_at > now:
+                        cleared += 1
+                self._mm[base:base + self._slots * _SLOT.size] = bytes(self._slots * _SLOT.size)
+        return cleared
+
+    def clear(self, key: str) -> None:
+        shard = self._shard_of(key)
+        with self._locked(shard):
+            self._clear(shard, key)
+
+    # Sliding window counter: both window counters for a limiter key live in
+    # the key's shard, so a check-and-increment happens under one lock.
+
+    def _window_info(self, shard, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._read(shard, previous_key, now)[0]
+        current_count = self._read(shard, current_key, now)[0]
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        shard = self._shard_of(key)
+        with self._locked(shard):
+            now = time.time()
+            previous_count, previous_ttl, current_count, _ = self._window_info(shard, key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            if floor(weighted_count) + amount > limit:
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            self._incr(shard, current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int):
+        shard = self._shard_of(key)
+        with self._locked(shard):
+            return self._window_info(shard, key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        shard = self._shard_of(key)
+        with self._locked(shard):
+            for window_key in self.sliding_window_keys(key, expiry, time.time()):
+                self._clear(shard, window_key)
@@ -1,7 +1,9 @@
+import contextlib
 import os
 import sys
 import importlib
 import pytest
+from sqlalchemy import event
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from models import db
@@ -28,6 +30,9 @@ def app(app_instance):
     with app_instance.app_context():
         db.drop_all()
         db.create_all()
+        app_instance.principal_cache.clear()
+        app_instance.catalog_cache.clear()
+        app_instance.revocations.reset()
         yield app_instance
         db.session.remove()
         db.drop_all()
@@ -35,3 +40,208 @@ def app(app_instance):
 @pytest.fixture(scope='function')
 def client(app):
     return app.test_client()
+
+
+@pytest.fixture
+def sql_statements(app):
+    """Context manager collecting the SQL run inside it.
+
+    ``with sql_statements() as statements:`` fills ``statements`` with SQL
+    strings, or ``(statement, parameters)`` pairs with ``parameters=True``.
+    """
+
+    @contextlib.contextmanager
+    def _capture(parameters=False):
+        statements = []
+
+        def _record(conn, cursor, statement, params, context, executemany):
+            statements.append((statement, params) if parameters else statement)
+
+        event.listen(db.engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _record)
+
+    return _capture
+
+
+@pytest.fixture
+def login(client):
+    """``login(phone, role)`` -> Authorization headers from the login stub."""
+
+    def _login(phone, role="consumer"):
+        resp = client.post("/__auth/login_stub", json={"phone": phone, "role": role})
+        return {"Authorization": f"Bearer {resp.get_json()['data']['access']}"}
+
+    return _login
+
+
+@pytest.fixture
+def make_shop(app):
+    """``make_shop(phone, **fields)`` -> an open grocery shop, flushed."""
+    from models.shop import Shop
+
+    def _make_shop(phone, shop_name="Shop", **fields):
+        fields.setdefault("is_open", True)
+        shop = Shop(shop_name=shop_name, shop_type="grocery", society="soc", city="city", phone=phone, **fields)
+        db.session.add(shop)
+        db.session.flush()
+        return shop
+
+    return _make_shop
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for the subset of redis-py the app uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.subscribers = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if key in self.data:
+                del self.data[key]
+                self.ttls.pop(key, None)
+                removed += 1
+        return removed
+
+    def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        return [k for k in list(self.data) if k.startswith(prefix)]
+
+    def sadd(self, key, *members):
+        members_set = self.data.setdefault(key, set())
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        return added
+
+    def srem(self, key, *members):
+        members_set = self.data.get(key, set())
+        removed = len(members_set & set(members))
+        members_set.difference_update(members)
+        if not members_set:
+            self.data.pop(key, None)
+        return removed
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def zadd(self, key, mapping):
+        scores = self.data.setdefault(key, {})
+        added = len(set(mapping) - set(scores))
+        scores.update(mapping)
+        return added
+
+    def zrem(self, key, *members):
+        scores = self.data.get(key, {})
+        removed = sum(1 for member in members if scores.pop(member, None) is not None)
+        if not scores:
+            self.data.pop(key, None)
+        return removed
+
+    def zcount(self, key, low, high):
+        low, high = float(low), float(high)
+        return sum(1 for score in self.data.get(key, {}).values() if low <= score <= high)
+
+    def zremrangebyscore(self, key, low, high):
+        low, high = float(low), float(high)
+        scores = self.data.get(key, {})
+        return self.zrem(key, *[m for m, score in scores.items() if low <= score <= high]) if scores else 0
+
+    def expire(self, key, ttl):
+        if key not in self.data:
+            return False
+        self.ttls[key] = ttl
+        return True
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def publish(self, channel, message):
+        targets = [p for p in self.subscribers if channel in p.channels]
+        for pubsub in targets:
+            pubsub.messages.append({"type": "message", "channel": channel, "data": message})
+        return len(targets)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakePipeline:
+    """Commands run at once until ``multi()``, then queue for ``execute()``."""
+
+    def __init__(self, client):
+        self.client = client
+        self.queued = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        if self.queued is None:
+            return command
+        return lambda *args, **kwargs: self.queued.append((command, args, kwargs))
+
+    def watch(self, *keys):
+        return True
+
+    def unwatch(self):
+        return True
+
+    def multi(self):
+        self.queued = []
+
+    def execute(self):
+        results = [command(*args, **kwargs) for command, args, kwargs in self.queued or []]
+        self.queued = None
+        return results
+
+    def reset(self):
+        self.queued = None
+
+
+class FakePubSub:
+    def __init__(self, client):
+        self.client = client
+        self.channels = set()
+        self.messages = []
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+        self.client.subscribers.append(self)
+
+    def get_message(self, timeout=0.0):
+        return self.messages.pop(0) if self.messages else None
+
+    def close(self):
+        if self in self.client.subscribers:
+            self.client.subscribers.remove(self)
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
@@ -119,11 +119,17 @@ def test_logout_flow_invalidates_token(client, app):
     # logout
     logout_resp = logout(client, f"Bearer {token}")
     assert logout_resp.status_code == 200
-    # token still works after logout in JWT flow
+    # logout revokes the token's jti and session family
     with app.app_context():
         assert UserProfile.query.filter_by(phone=normalize_phone(phone)).first() is not None
     fail_resp = basic_onboarding(client, token)
-    assert fail_resp.status_code == 200
+    assert fail_resp.status_code == 401
+    assert fail_resp.get_json()['message'] == 'token revoked'
+    refresh_resp = client.post(
+        f"{API_PREFIX}/auth/refresh",
+        json={'refresh_token': verify_resp.get_json()['refresh_token']},
+    )
+    assert refresh_resp.status_code == 401
     second_logout = logout(client, f"Bearer {token}")
     assert second_logout.status_code == 200
 
@@ -0,0 +1,159 @@
+import pytest
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from models.wallet import ConsumerWallet
+from app.utils.cart_store import CART_OK, CART_OTHER_SHOP, InMemoryCartStore, RedisCartStore
+from app.version import API_PREFIX
+
+CONSUMER = "9890000001"
+VENDOR = "9890000002"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def memory_store(app):
+    saved = app.cart_store
+    app.cart_store = InMemoryCartStore(ttl=60)
+    yield app.cart_store
+    app.cart_store = saved
+
+
+def _setup(login, make_shop, stock=50):
+    shop, other = make_shop(VENDOR, shop_name="Store"), make_shop("9890000003", shop_name="Other")
+    items = [
+        Item(shop_id=shop.id, title="milk", price=10, unit="l", quantity_in_stock=stock),
+        Item(shop_id=shop.id, title="bread", price=25, unit="pcs", quantity_in_stock=stock),
+        Item(shop_id=other.id, title="rice", price=60, unit="kg", quantity_in_stock=stock),
+    ]
+    db.session.add_all(items)
+    db.session.add(ConsumerWallet(user_phone=CONSUMER, balance=1000))
+    db.session.commit()
+    return login(CONSUMER), [item.id for item in items]
+
+
+def _post(client, path, headers, **body):
+    return client.post(f"{API_PREFIX}/consumer/cart/{path}", json=body, headers=headers)
+
+
+def test_cart_edits_stay_out_of_the_database(client, login, make_shop, sql_statements, memory_store):
+    consumer, (milk, bread, rice) = _setup(login, make_shop)
+    assert _post(client, "add", consumer, item_id=milk, quantity=2).status_code == 200
+    # Only the item lookup runs; no cart_item row is written.
+    with sql_statements() as statements:
+        resp = _post(client, "add", consumer, item_id=bread)
+    assert resp.status_code == 200
+    assert len(statements) == 1 and "cart_item" not in statements[0]
+
+    with sql_statements() as statements:
+        resp = _post(client, "update", consumer, item_id=milk, quantity=4)
+    assert resp.status_code == 200 and statements == []
+    assert _post(client, "add", consumer, item_id=milk, quantity=7).get_json()["message"] == "Max limit is 10 units"
+    assert _post(client, "add", consumer, item_id=rice).get_json()["message"] == (
+        "Cart contains items from a different shop"
+    )
+    assert _post(client, "update", consumer, item_id=rice, quantity=1).status_code == 404
+    with sql_statements() as statements:
+        resp = _post(client, "remove", consumer, item_id=bread)
+    assert resp.status_code == 200 and statements == []
+    assert CartItem.query.count() == 0
+
+    with sql_statements() as statements:
+        body = client.get(f"{API_PREFIX}/consumer/cart/view", headers=consumer).get_json()
+    assert len(statements) == 1
+    assert [(line["item_id"], line["quantity"]) for line in body["cart"]] == [(milk, 4)]
+    assert body["total_price"] == 40.0
+
+    assert _post(client, "clear", consumer).status_code == 200
+    assert memory_store.lines(CONSUMER) == []
+    assert _post(client, "add", consumer, item_id=rice).status_code == 200
+
+
+def test_memory_carts_expire_after_the_last_change():
+    clock = Clock()
+    store = InMemoryCartStore(ttl=60, max_entries=2, clock=clock)
+    store.add("a", 1, 7, 1, 10)
+    clock.now += 50
+    store.add("a", 2, 7, 1, 10)
+    clock.now += 50
+    assert [line.item_id for line in store.lines("a")] == [1, 2]
+    assert store.holders(1) == ["a"]
+    clock.now += 11
+    assert store.lines("a") == []
+
+    store.add("b", 1, 7, 1, 10)
+    clock.now += 61
+    store.add("c", 1, 7, 1, 10)
+    store.add("d", 1, 7, 1, 10)  # full: expired carts are swept to make room
+    assert sorted(store._carts) == ["c", "d"]
+    store.add("c", 2, 7, 1, 10)
+    store.add("e", 1, 7, 1, 10)  # nothing expired: the least recently changed cart goes
+    assert sorted(store._carts) == ["c", "e"]
+
+
+def test_redis_store_tracks_which_carts_hold_an_item(fake_redis):
+    store = RedisCartStore(fake_redis, ttl=600)
+    assert store.add(CONSUMER, 1, 7, 2, 10) == CART_OK
+    assert store.add(CONSUMER, 2, 7, 1, 10) == CART_OK
+    assert store.add(CONSUMER, 3, 8, 1, 10) == CART_OTHER_SHOP
+    assert fake_redis.ttls[f"cart-store:{CONSUMER}"] == 600
+    assert store.holders(1) == [CONSUMER]
+    store.set_quantity(CONSUMER, 1, 5)
+    assert [(line.item_id, line.quantity) for line in store.lines(CONSUMER)] == [(1, 5), (2, 1)]
+
+    store.remove(CONSUMER, 1)
+    assert store.holders(1) == [] and store.holders(2) == [CONSUMER]
+    store.clear(CONSUMER)
+    assert f"cart-store:{CONSUMER}" not in fake_redis.data
+    assert store.holders(2) == []
+
+
+def test_checkout_reads_the_store_and_clears_it_only_after_commit(client, login, make_shop, memory_store):
+    consumer, (milk, bread, _) = _setup(login, make_shop, stock=3)
+    _post(client, "add", consumer, item_id=milk, quantity=5)
+    confirm = f"{API_PREFIX}/consumer/order/confirm"
+    resp = client.post(confirm, json={"payment_mode": "wallet"}, headers=consumer)
+    assert resp.status_code == 400
+    assert [line.quantity for line in memory_store.lines(CONSUMER)] == [5]
+
+    _post(client, "update", consumer, item_id=milk, quantity=2)
+    _post(client, "add", consumer, item_id=bread)
+    resp = client.post(confirm, json={"payment_mode": "wallet"}, headers=consumer)
+    assert resp.status_code == 200
+    assert memory_store.lines(CONSUMER) == []
+    assert db.session.get(Item, milk).quantity_in_stock == 1
+    assert "cart_store_pending_clear" not in db.session.info
+
+
+def test_carts_to_store_moves_rows_once(app, make_shop, memory_store):
+    shop = make_shop(VENDOR)
+    db.session.add_all([
+        CartItem(user_phone="a", item_id=1, shop_id=shop.id, quantity=2),
+        CartItem(user_phone="a", item_id=2, shop_id=shop.id, quantity=1),
+        CartItem(user_phone="a", item_id=3, shop_id=shop.id + 1, quantity=1),
+        CartItem(user_phone="b", item_id=1, shop_id=shop.id, quantity=4),
+        CartItem(user_phone="c", item_id=1, shop_id=shop.id, quantity=1),
+    ])
+    db.session.commit()
+    memory_store.add("c", 9, shop.id + 1, 1, 10)  # already shopping elsewhere; keeps that cart
+
+    result = app.test_cli_runner().invoke(args=["carts-to-store", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Moved 2 carts (2 lines skipped)" in result.output
+    assert CartItem.query.count() == 0
+    assert [(line.item_id, line.quantity) for line in memory_store.lines("a")] == [(1, 2), (2, 1)]
+    assert [(line.item_id, line.quantity) for line in memory_store.lines("b")] == [(1, 4)]
+    assert [line.item_id for line in memory_store.lines("c")] == [9]
+
+
+def test_carts_to_store_refuses_the_sql_store(app):
+    result = app.test_cli_runner().invoke(args=["carts-to-store"])
+    assert result.exit_code != 0
+    assert "CART_STORE_URL is sql://" in result.output
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from app.utils.cart_store import InMemoryCartStore
+from app.version import API_PREFIX
+
+CONSUMER = "9870000001"
+
+
+@pytest.fixture(params=["sql", "memory"])
+def store(request, app):
+    saved = app.cart_store
+    if request.param == "memory":
+        app.cart_store = InMemoryCartStore(ttl=60)
+    yield app.cart_store
+    app.cart_store = saved
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    shops = [make_shop("9870000002", shop_name="A"), make_shop("9870000003", shop_name="B")]
+    items = [
+        Item(shop_id=shops[0].id, title="milk", price=10, unit="l", quantity_in_stock=50),
+        Item(shop_id=shops[0].id, title="bread", price=25, unit="pcs", quantity_in_stock=50),
+        Item(shop_id=shops[1].id, title="rice", price=60, unit="kg", quantity_in_stock=50),
+        Item(shop_id=shops[1].id, title="dal", price=90, unit="kg", quantity_in_stock=50, is_available=False),
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return login(CONSUMER), [item.id for item in items]
+
+
+def _cart(store):
+    return {line.item_id: line.quantity for line in store.lines(CONSUMER)}
+
+
+def test_add_is_one_upsert(client, app, setup, sql_statements):
+    headers, (milk, bread, rice, _) = setup
+    add = f"{API_PREFIX}/consumer/cart/add"
+    with sql_statements() as statements:
+        resp = client.post(add, json={"item_id": milk, "quantity": 2}, headers=headers)
+    assert resp.status_code == 200
+    # One statement checks the shop, inserts or merges the line.
+    cart_statements = [sql for sql in statements if "cart_item" in sql]
+    assert len(cart_statements) == 1 and "ON CONFLICT" in cart_statements[0]
+    for _ in range(3):
+        client.post(add, json={"item_id": milk, "quantity": 2}, headers=headers)
+    assert _cart(app.cart_store) == {milk: 8}
+    assert CartItem.query.count() == 1
+
+    resp = client.post(add, json={"item_id": milk, "quantity": 3}, headers=headers)
+    assert resp.status_code == 400 and resp.get_json()["message"] == "Max limit is 10 units"
+    resp = client.post(add, json={"item_id": rice}, headers=headers)
+    assert resp.get_json()["message"] == "Cart contains items from a different shop"
+    assert client.post(add, json={"item_id": bread}, headers=headers).status_code == 200
+    assert _cart(app.cart_store) == {milk: 8, bread: 1}
+
+
+def test_cart_item_is_unique_per_consumer_and_item(setup):
+    _, (milk, *_) = setup
+    shop_id = db.session.get(Item, milk).shop_id
+    db.session.add_all(CartItem(user_phone=CONSUMER, shop_id=shop_id, item_id=milk, quantity=1) for _ in range(2))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_batch_sets_and_removes_lines(client, store, setup):
+    headers, (milk, bread, rice, dal) = setup
+    batch = f"{API_PREFIX}/consumer/cart/batch"
+    lines = [{"item_id": milk, "quantity": 3}, {"item_id": bread, "quantity": 1}, {"item_id": milk, "quantity": 4}]
+    assert client.post(batch, json={"lines": lines}, headers=headers).status_code == 200
+    assert _cart(store) == {milk: 4, bread: 1}
+
+    resp = client.post(batch, json={"lines": [{"item_id": rice, "quantity": 1}]}, headers=headers)
+    assert resp.status_code == 400
+    assert _cart(store) == {milk: 4, bread: 1}
+
+    # Emptying the cart and switching shop in one batch is allowed.
+    lines = [{"item_id": milk, "quantity": 0}, {"item_id": bread, "quantity": 0}, {"item_id": rice, "quantity": 2}]
+    assert client.post(batch, json={"lines": lines}, headers=headers).status_code == 200
+    assert _cart(store) == {rice: 2}
+    view = client.get(f"{API_PREFIX}/consumer/cart/view", headers=headers).get_json()
+    assert [line["item_id"] for line in view["cart"]] == [rice]
+
+
+@pytest.mark.parametrize("body, status", [
+    ({}, 400),
+    ({"lines": []}, 400),
+    ({"lines": [{"item_id": "1", "quantity": 1}]}, 400),
+    ({"lines": [{"item_id": 1, "quantity": 11}]}, 400),
+    ({"lines": [{"item_id": 1, "quantity": 1}] * 51}, 400),
+])
+def test_batch_rejects_malformed_lines(client, setup, body, status):
+    headers, _ = setup
+    assert client.post(f"{API_PREFIX}/consumer/cart/batch", json=body, headers=headers).status_code == status
+
+
+def test_batch_rejects_unavailable_and_mixed_items(client, setup):
+    headers, (milk, bread, rice, dal) = setup
+    batch = f"{API_PREFIX}/consumer/cart/batch"
+    resp = client.post(batch, json={"lines": [{"item_id": dal, "quantity": 1}]}, headers=headers)
+    assert resp.status_code == 404
+    resp = client.post(batch, json={"lines": [{"item_id": milk, "quantity": 1}, {"item_id": rice, "quantity": 1}]},
+                       headers=headers)
+    assert resp.status_code == 400
+    assert CartItem.query.count() == 0
@@ -0,0 +1,101 @@
+import pytest
+from models import db
+from models.item import Item
+from models.wallet import ConsumerWallet
+from app.utils.ttl_cache import LocalTTLCache, RedisTTLCache
+from app.version import API_PREFIX
+
+CONSUMER = "9880000001"
+VENDOR = "9880000002"
+
+
+@pytest.fixture
+def cart_cache(app):
+    saved = app.cart_cache
+    app.cart_cache = LocalTTLCache(ttl=60, max_entries=100)
+    yield app.cart_cache
+    app.cart_cache = saved
+
+
+@pytest.fixture
+def cart(client, login, make_shop):
+    shop = make_shop(VENDOR, shop_name="Cart")
+    items = [
+        Item(shop_id=shop.id, title="milk", price=10, mrp=12, unit="l", pack_size="1l", quantity_in_stock=50),
+        Item(shop_id=shop.id, title="bread", price=25, unit="pcs", quantity_in_stock=50),
+        Item(shop_id=shop.id, title="eggs", price=6, mrp=5, unit="pcs", quantity_in_stock=50),
+    ]
+    db.session.add_all(items)
+    db.session.add(ConsumerWallet(user_phone=CONSUMER, balance=1000))
+    db.session.commit()
+    consumer = login(CONSUMER)
+    for item, qty in zip(items, (2, 1, 3)):
+        client.post(f"{API_PREFIX}/consumer/cart/add", json={"item_id": item.id, "quantity": qty}, headers=consumer)
+    return consumer, [item.id for item in items]
+
+
+@pytest.fixture
+def view(client, sql_statements):
+    def _view(consumer):
+        with sql_statements() as statements:
+            body = client.get(f"{API_PREFIX}/consumer/cart/view", headers=consumer).get_json()
+        return body, len(statements)
+
+    return _view
+
+
+def test_view_is_one_query_whatever_the_cart_size(cart, view):
+    consumer, item_ids = cart
+    body, statements = view(consumer)
+    assert statements == 1
+    assert [line["item_id"] for line in body["cart"]] == item_ids
+    assert body["cart"][0] == {
+        "id": body["cart"][0]["id"], "item_id": item_ids[0], "item_name": "milk", "available": True,
+        "price": 10.0, "mrp": 12.0, "savings": 4.0, "quantity": 2, "unit": "l", "pack_size": "1l",
+        "subtotal": 20.0, "shop_id": body["cart"][0]["shop_id"], "shop_name": "Cart",
+    }
+    assert body["cart"][2]["savings"] == 0  # mrp below price is not a saving
+    assert body["total_price"] == 63.0 and body["total_savings"] == 4.0
+
+
+def test_cached_view_is_invalidated_by_cart_and_item_changes(client, login, cart_cache, cart, view):
+    consumer, item_ids = cart
+    vendor = login(VENDOR, "vendor")
+    assert view(consumer)[1] == 1
+    body, statements = view(consumer)
+    assert statements == 0 and body["total_price"] == 63.0
+
+    client.post(f"{API_PREFIX}/consumer/cart/update", json={"item_id": item_ids[1], "quantity": 2}, headers=consumer)
+    assert view(consumer)[0]["total_price"] == 88.0
+
+    client.post(f"{API_PREFIX}/vendor/item/update/{item_ids[0]}", json={"price": 11}, headers=vendor)
+    assert view(consumer)[0]["total_price"] == 90.0
+    client.post(f"{API_PREFIX}/vendor/item/{item_ids[0]}/toggle", headers=vendor)
+    assert view(consumer)[0]["cart"][0]["available"] is False
+    client.post(f"{API_PREFIX}/vendor/item/{item_ids[0]}/toggle", headers=vendor)
+
+    client.post(f"{API_PREFIX}/consumer/cart/remove", json={"item_id": item_ids[2]}, headers=consumer)
+    assert len(view(consumer)[0]["cart"]) == 2
+
+    resp = client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": "wallet"}, headers=consumer)
+    assert resp.status_code == 200
+    assert view(consumer)[0]["cart"] == []
+
+    client.post(f"{API_PREFIX}/consumer/cart/add", json={"item_id": item_ids[1], "quantity": 1}, headers=consumer)
+    assert len(view(consumer)[0]["cart"]) == 1
+    client.post(f"{API_PREFIX}/consumer/cart/clear", headers=consumer)
+    assert view(consumer)[0]["cart"] == []
+
+
+def test_cart_cache_can_live_in_redis(client, app, cart, view, fake_redis):
+    saved = app.cart_cache
+    app.cart_cache = RedisTTLCache(fake_redis, ttl=30, prefix="cart:")
+    try:
+        consumer, item_ids = cart
+        view(consumer)
+        assert fake_redis.ttls[f"cart:{CONSUMER}"] == 30
+        assert view(consumer)[1] == 0
+        client.post(f"{API_PREFIX}/consumer/cart/remove", json={"item_id": item_ids[0]}, headers=consumer)
+        assert f"cart:{CONSUMER}" not in fake_redis.data
+    finally:
+        app.cart_cache = saved
@@ -0,0 +1,95 @@
+import io
+import pytest
+from models import db
+from models.item import Item
+from models.shop import Shop
+from app.utils.catalog_cache import CatalogCache
+from app.version import API_PREFIX
+
+CONSUMER = "9860000001"
+VENDOR = "9860000002"
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    shop = make_shop(VENDOR, shop_name="Cat")
+    items = [
+        Item(shop_id=shop.id, title="milk", price=10, unit="l", is_available=True),
+        Item(shop_id=shop.id, title="bread", price=25, unit="pcs", is_available=True),
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return shop.id, [item.id for item in items], login(CONSUMER), login(VENDOR, "vendor")
+
+
+@pytest.fixture
+def get_items(client, sql_statements):
+    def _get(shop_id, headers, etag=None):
+        if etag:
+            headers = {**headers, "If-None-Match": etag}
+        with sql_statements() as statements:
+            resp = client.get(f"{API_PREFIX}/consumer/shop/{shop_id}/items", headers=headers)
+        return resp, [sql for sql in statements if "FROM item" in sql]
+
+    return _get
+
+
+def test_repeat_visits_skip_the_item_query(setup, get_items):
+    shop_id, _, consumer, _ = setup
+    resp, item_queries = get_items(shop_id, consumer)
+    assert resp.status_code == 200 and len(item_queries) == 1
+    etag = resp.headers["ETag"]
+    assert not etag.startswith("W/")
+    assert [item["title"] for item in resp.get_json()["items"]] == ["milk", "bread"]
+
+    cached, item_queries = get_items(shop_id, consumer)
+    assert cached.status_code == 200 and item_queries == []
+    assert cached.data == resp.data and cached.headers["ETag"] == etag
+
+    not_modified, item_queries = get_items(shop_id, consumer, etag=etag)
+    assert not_modified.status_code == 304 and not_modified.data == b"" and item_queries == []
+    assert not_modified.headers["ETag"] == etag
+
+
+def test_catalog_writes_bump_the_version(client, setup, get_items):
+    shop_id, (milk, bread), consumer, vendor = setup
+    etags = [get_items(shop_id, consumer)[0].headers["ETag"]]
+
+    def _changed():
+        resp, item_queries = get_items(shop_id, consumer, etag=etags[-1])
+        assert resp.status_code == 200 and len(item_queries) == 1
+        etags.append(resp.headers["ETag"])
+        return resp.get_json()
+
+    client.post(f"{API_PREFIX}/vendor/item/update/{milk}", json={"price": 12}, headers=vendor)
+    assert _changed()["items"][0]["price"] == 12
+    client.post(f"{API_PREFIX}/vendor/item/{bread}/toggle", headers=vendor)
+    assert [item["title"] for item in _changed()["items"]] == ["milk"]
+    client.post(f"{API_PREFIX}/vendor/item/add", json={"title": "eggs", "price": 6}, headers=vendor)
+    assert [item["title"] for item in _changed()["items"]] == ["milk", "eggs"]
+    client.post(f"{API_PREFIX}/vendor/shop/edit", json={"shop_name": "Cat & Co"}, headers=vendor)
+    assert _changed()["shop"]["shop_name"] == "Cat & Co"
+    upload = io.BytesIO(b"title,price\nflour,40\n")
+    resp = client.post(f"{API_PREFIX}/vendor/item/bulk-upload", data={"file": (upload, "items.csv")},
+                       headers=vendor, content_type="multipart/form-data")
+    assert resp.status_code == 202
+    assert [item["title"] for item in _changed()["items"]] == ["milk", "eggs", "flour"]
+    assert len(set(etags)) == len(etags)
+    assert db.session.get(Shop, shop_id).catalog_version == 6
+
+
+def test_closed_shop_is_not_served_from_cache(setup, get_items):
+    shop_id, _, consumer, _ = setup
+    etag = get_items(shop_id, consumer)[0].headers["ETag"]
+    db.session.get(Shop, shop_id).is_open = False
+    db.session.commit()
+    assert get_items(shop_id, consumer, etag=etag)[0].status_code == 403
+
+
+def test_catalog_cache_evicts_least_recently_used():
+    cache = CatalogCache(max_entries=2)
+    cache.set(1, 1, b"a")
+    cache.set(2, 1, b"b")
+    assert cache.get(1, 1) == b"a"
+    cache.set(3, 1, b"c")
+    assert cache.get(2, 1) is None and cache.get(1, 1) == b"a" and len(cache) == 2
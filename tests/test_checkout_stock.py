@@ -0,0 +1,81 @@
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from models.order import OrderItem
+from models.user import UserProfile
+from app.version import API_PREFIX
+
+PHONE = "9400000001"
+
+
+def _setup(login, make_shop, stocks):
+    hdr = login(PHONE)
+    db.session.add(UserProfile(phone="9400000999", role="vendor"))
+    shop = make_shop("9400000999")
+    items = [
+        Item(shop_id=shop.id, title=f"item-{i}", price=10.5, unit="pcs", quantity_in_stock=stock)
+        for i, stock in enumerate(stocks)
+    ]
+    db.session.add_all(items)
+    db.session.flush()
+    # The column default turns None into 0; NULL means untracked stock.
+    untracked = [item.id for item, stock in zip(items, stocks) if stock is None]
+    if untracked:
+        Item.query.filter(Item.id.in_(untracked)).update({"quantity_in_stock": None}, synchronize_session=False)
+    db.session.commit()
+    return hdr, shop.id, [item.id for item in items]
+
+
+def _fill_cart(shop_id, item_ids, qty=2):
+    db.session.add_all(
+        CartItem(user_phone=PHONE, shop_id=shop_id, item_id=item_id, quantity=qty) for item_id in item_ids
+    )
+    db.session.commit()
+
+
+def _confirm(client, hdr):
+    return client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": "cash"}, headers=hdr)
+
+
+def _stock(item_ids):
+    rows = db.session.query(Item.id, Item.quantity_in_stock).filter(Item.id.in_(item_ids)).all()
+    return dict(rows)
+
+
+def test_checkout_reserves_stock_for_every_line(client, login, make_shop):
+    hdr, shop_id, item_ids = _setup(login, make_shop, [5, 3, None])
+    _fill_cart(shop_id, item_ids)
+
+    resp = _confirm(client, hdr)
+    assert resp.status_code == 200
+    order_id = resp.get_json()["order_id"]
+    assert _stock(item_ids) == {item_ids[0]: 3, item_ids[1]: 1, item_ids[2]: None}
+    lines = OrderItem.query.filter_by(order_id=order_id).order_by(OrderItem.item_id).all()
+    assert [line.item_id for line in lines] == item_ids
+    assert all(float(line.subtotal) == 21.0 for line in lines)
+    assert CartItem.query.filter_by(user_phone=PHONE).count() == 0
+
+
+def test_short_line_rejects_whole_checkout(client, login, make_shop):
+    hdr, shop_id, item_ids = _setup(login, make_shop, [5, 1, 5])
+    _fill_cart(shop_id, item_ids)
+
+    resp = _confirm(client, hdr)
+    assert resp.status_code == 400
+    assert resp.get_json()["message"] == "Not enough stock for item item-1"
+    db.session.expire_all()
+    assert _stock(item_ids) == {item_ids[0]: 5, item_ids[1]: 1, item_ids[2]: 5}
+    assert CartItem.query.filter_by(user_phone=PHONE).count() == 3
+
+
+def test_checkout_round_trips_do_not_grow_with_cart(client, login, make_shop, sql_statements):
+    hdr, shop_id, item_ids = _setup(login, make_shop, [100] * 12)
+    client.get(f"{API_PREFIX}/consumer/wallet", headers=hdr)  # warm auth caches
+
+    def _count(ids):
+        _fill_cart(shop_id, ids)
+        with sql_statements() as statements:
+            assert _confirm(client, hdr).status_code == 200
+        return len(statements)
+
+    assert _count(item_ids[:2]) == _count(item_ids[2:12])
@@ -0,0 +1,151 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from models import db
+from models.cart import CartItem
+from models.idempotency import IdempotencyKey
+from models.item import Item
+from models.order import Order
+from models.wallet import ConsumerWallet, WalletTransaction
+from app.utils.idempotency import (
+    CLAIMED,
+    DONE,
+    MISMATCH,
+    PENDING,
+    InMemoryIdempotencyStore,
+    RedisIdempotencyStore,
+    SQLIdempotencyStore,
+)
+from app.utils import idempotency
+from app.version import API_PREFIX
+
+
+def test_wallet_load_replays_stored_response(client, login, sql_statements):
+    hdr = login("9300000001")
+    hdr["Idempotency-Key"] = uuid.uuid4().hex
+    first = client.post(f"{API_PREFIX}/consumer/wallet/load", json={"amount": 40}, headers=hdr)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    with sql_statements() as statements:
+        replay = client.post(f"{API_PREFIX}/consumer/wallet/load", json={"amount": 40}, headers=hdr)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.get_json() == first.get_json()
+    assert not [s for s in statements if "wallet" in s]
+    assert float(ConsumerWallet.query.filter_by(user_phone="9300000001").one().balance) == 40.0
+    assert WalletTransaction.query.filter_by(user_phone="9300000001").count() == 1
+
+
+def test_key_reused_for_different_body_is_rejected(client, login):
+    hdr = login("9300000002")
+    hdr["Idempotency-Key"] = uuid.uuid4().hex
+    assert client.post(f"{API_PREFIX}/consumer/wallet/load", json={"amount": 10}, headers=hdr).status_code == 200
+    resp = client.post(f"{API_PREFIX}/consumer/wallet/load", json={"amount": 99}, headers=hdr)
+    assert resp.status_code == 422
+    assert float(ConsumerWallet.query.filter_by(user_phone="9300000002").one().balance) == 10.0
+
+
+def test_order_confirm_replay_skips_stock_and_wallet(client, login, make_shop, sql_statements):
+    phone = "9300000003"
+    hdr = login(phone)
+    shop = make_shop("9300000999")
+    item = Item(shop_id=shop.id, title="Milk", price=20, quantity_in_stock=10)
+    db.session.add(item)
+    db.session.flush()
+    db.session.add(CartItem(user_phone=phone, shop_id=shop.id, item_id=item.id, quantity=3))
+    db.session.commit()
+    item_id = item.id
+
+    hdr["Idempotency-Key"] = uuid.uuid4().hex
+    first = client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": "cash"}, headers=hdr)
+    assert first.status_code == 200
+    with sql_statements() as statements:
+        replay = client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": "cash"}, headers=hdr)
+    assert replay.get_json()["order_id"] == first.get_json()["order_id"]
+    assert not [s for s in statements if "item" in s or "wallet" in s]
+    assert Order.query.filter_by(user_phone=phone).count() == 1
+    db.session.expire_all()
+    assert db.session.get(Item, item_id).quantity_in_stock == 7
+
+
+def test_concurrent_duplicate_waits_for_first():
+    store = InMemoryIdempotencyStore(ttl=60)
+    assert store.claim("k", "fp") == (CLAIMED, None)
+    assert store.claim("k", "other") == (MISMATCH, None)
+    assert store.claim("k", "fp") == (PENDING, None)
+
+    seen = []
+
+    def _duplicate():
+        store.wait("k", 5)
+        seen.append(store.claim("k", "fp"))
+
+    waiter = threading.Thread(target=_duplicate)
+    waiter.start()
+    record = {"fingerprint": "fp", "status": 200, "body": "{}", "mimetype": "application/json"}
+    store.complete("k", record)
+    waiter.join(5)
+    assert seen == [(DONE, record)]
+
+
+def test_released_key_can_be_claimed_again():
+    store = InMemoryIdempotencyStore(ttl=60)
+    store.claim("k", "fp")
+    store.release("k")
+    assert store.claim("k", "fp") == (CLAIMED, None)
+
+
+def test_redis_store_claims_with_nx(fake_redis):
+    store = RedisIdempotencyStore(fake_redis, ttl=120)
+    assert store.claim("k", "fp") == (CLAIMED, None)
+    assert store.claim("k", "fp") == (PENDING, None)
+    assert store.claim("k", "other") == (MISMATCH, None)
+    record = {"fingerprint": "fp", "status": 201, "body": "{}", "mimetype": "application/json"}
+    store.complete("k", record)
+    assert store.claim("k", "fp") == (DONE, record)
+    assert fake_redis.ttls["idem:k"] == 120
+    store.release("k")
+    assert store.claim("k", "fp") == (CLAIMED, None)
+
+
+def test_sql_store_is_shared_and_expires_claims(app):
+    store = SQLIdempotencyStore(ttl=120)
+    assert store.claim("k", "fp") == (CLAIMED, None)
+    # A second store stands in for another worker.
+    other = SQLIdempotencyStore(ttl=120)
+    assert other.claim("k", "fp") == (PENDING, None)
+    assert other.claim("k", "other") == (MISMATCH, None)
+    record = {"fingerprint": "fp", "status": 200, "body": "{}", "mimetype": "application/json"}
+    store.complete("k", record)
+    assert other.claim("k", "fp") == (DONE, record)
+    store.release("k")
+    assert other.claim("k", "fp") == (CLAIMED, None)
+
+    db.session.execute(update(IdempotencyKey).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    assert store.claim("k", "fp2") == (CLAIMED, None)
+    assert IdempotencyKey.query.count() == 1
+
+
+def test_memory_store_is_refused_in_production(app):
+    app.config["IDEMPOTENCY_STORE_URL"] = "memory://"
+    app.testing, saved = False, app.idempotency_store
+    try:
+        with pytest.raises(RuntimeError):
+            idempotency.init_app(app)
+    finally:
+        app.testing = True
+        app.config["IDEMPOTENCY_STORE_URL"] = "sql://"
+        app.idempotency_store = saved
+
+
+def test_memory_store_evicts_the_oldest_key_when_full():
+    store = InMemoryIdempotencyStore(ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        assert store.claim(key, "fp") == (CLAIMED, None)
+    assert len(store._entries) == 2
+    assert store.claim("a", "fp") == (CLAIMED, None)  # evicted, so free again
+    assert store.claim("c", "fp") == (PENDING, None)
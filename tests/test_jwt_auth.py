@@ -76,3 +76,40 @@ def test_old_secret_allows_decode(monkeypatch):
         c = app.test_client()
         r = c.get("/api/v1/test_support/__ok", headers={"Authorization": f"Bearer {tok}"})
         assert r.status_code == 200
+
+
+def test_tokens_carry_kid_of_signing_secret(monkeypatch):
+    from app.utils.jwt import key_id
+    app = _load(monkeypatch)
+    with app.app_context():
+        tok = create_access_token("k1", "consumer")
+        assert jwt.get_unverified_header(tok)["kid"] == key_id(app.config["JWT_SECRET"])
+
+
+def test_kid_selects_rotated_secret(monkeypatch):
+    app = _load(monkeypatch)
+    with app.app_context():
+        app.config["JWT_SECRET"] = "first"
+        tok = create_access_token("k2", "consumer")
+        app.config["JWT_SECRET"] = "second"
+        app.config["JWT_PREVIOUS_SECRETS"] = ["zero", "first"]
+        assert decode_token(tok)["sub"] == "k2"
+        app.config["JWT_PREVIOUS_SECRETS"] = ["zero"]
+        with pytest.raises(Exception, match="invalid token"):
+            decode_token(tok)
+
+
+def test_verified_cache_honours_exp(monkeypatch):
+    import app.utils.jwt as jwt_mod
+    app = _load(monkeypatch)
+    with app.app_context():
+        tok = create_access_token("k3", "consumer")
+        exp = jwt.decode(tok, options={"verify_signature": False})["exp"]
+        assert decode_token(tok)["sub"] == "k3"
+        assert len(app.extensions["jwt_keyring"]._verified) == 1
+        with pytest.raises(Exception, match="expected refresh token"):
+            decode_token(tok, expected_type="refresh")
+        monkeypatch.setattr(jwt_mod, "_now", lambda: exp + 1)
+        with pytest.raises(Exception, match="token expired"):
+            decode_token(tok)
+        assert len(app.extensions["jwt_keyring"]._verified) == 0
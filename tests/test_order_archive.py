@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from models import db
+from models.order import Order, OrderEvent, OrderItem, OrderRating
+from models.order_archive import ArchivedOrder, order_event_archive, order_item_archive, order_rating_archive
+from app.services.order_archive import archive_closed_orders
+from app.version import API_PREFIX
+
+CONSUMER = "9840000001"
+VENDOR = "9840000002"
+OLD = datetime(2025, 1, 1)
+
+
+def _orders(shop_id, statuses, updated_at=OLD, start=0):
+    orders = []
+    for n, status in enumerate(statuses, start=start):
+        order = Order(user_phone=CONSUMER, shop_id=shop_id, status=status, payment_mode="cash",
+                      total_amount=10, final_amount=10, item_count=1, items_preview=f"o{n} x1",
+                      created_at=OLD + timedelta(hours=n), updated_at=updated_at)
+        order.items = [OrderItem(item_id=1, name=f"o{n}", unit="pcs", unit_price=10, quantity=1, subtotal=10)]
+        orders.append(order)
+    db.session.add_all(orders)
+    db.session.flush()
+    db.session.add_all(OrderEvent(order_id=o.id, kind=1, actor=CONSUMER, status="pending") for o in orders)
+    db.session.commit()
+    return [o.id for o in orders]
+
+
+@pytest.fixture
+def shop_id(make_shop):
+    shop = make_shop(VENDOR)
+    db.session.commit()
+    return shop.id
+
+
+def _count(table, order_ids):
+    return db.session.query(table).filter(table.c.order_id.in_(order_ids)).count()
+
+
+def test_only_closed_idle_orders_move_with_their_rows(shop_id):
+    closed = _orders(shop_id, ["delivered", "cancelled", "return_completed"])
+    still_open = _orders(shop_id, ["pending", "accepted", "return_accepted"], start=3)
+    recent = _orders(shop_id, ["delivered"], updated_at=datetime.utcnow(), start=6)
+    db.session.add(OrderRating(order_id=closed[0], user_phone=CONSUMER, rating=5))
+    db.session.commit()
+
+    assert archive_closed_orders(older_than_days=30, batch_size=2) == 3
+
+    remaining = {o.id for o in Order.query.all()}
+    assert remaining == set(still_open + recent)
+    archived = ArchivedOrder.query.order_by(ArchivedOrder.id).all()
+    assert [o.id for o in archived] == closed
+    assert [o.status for o in archived] == ["delivered", "cancelled", "return_completed"]
+    assert archived[0].items[0].to_dict()["name"] == "o0"
+    assert _count(order_item_archive, closed) == _count(order_event_archive, closed) == 3
+    assert _count(order_rating_archive, closed) == 1
+    assert OrderItem.query.filter(OrderItem.order_id.in_(closed)).count() == 0
+    assert OrderEvent.query.filter(OrderEvent.order_id.in_(closed)).count() == 0
+    assert archive_closed_orders(older_than_days=30) == 0
+
+
+def test_round_trips_per_batch_do_not_grow_with_batch_size(shop_id, sql_statements):
+    _orders(shop_id, ["delivered"] * 40)
+
+    def _statements(batch_size):
+        with sql_statements() as statements:
+            assert archive_closed_orders(older_than_days=30, batch_size=batch_size, max_batches=1) == batch_size
+        return len(statements)
+
+    assert _statements(2) == _statements(30)
+    assert Order.query.count() == 8
+
+
+def test_history_pages_continue_into_archive(client, login, shop_id):
+    _orders(shop_id, ["delivered"] * 5)
+    _orders(shop_id, ["pending"] * 2, start=5)
+    _orders(shop_id, ["delivered"] * 4, start=7)
+    archive_closed_orders(older_than_days=30)  # leaves the two pending orders hot
+    assert Order.query.count() == 2
+
+    hdr = login(CONSUMER)
+    previews, cursor = [], None
+    while True:
+        params = {"limit": 3, "expand": "items", **({"before": cursor} if cursor else {})}
+        body = client.get(f"{API_PREFIX}/consumer/order/history", headers=hdr, query_string=params).get_json()
+        previews.extend(o["items_preview"] for o in body["orders"])
+        assert all(len(o["items"]) == 1 for o in body["orders"])
+        cursor = body["next_before"]
+        if cursor is None:
+            break
+    assert previews == [f"o{n} x1" for n in reversed(range(11))]
+
+    open_only = client.get(f"{API_PREFIX}/consumer/order/history", headers=hdr,
+                           query_string={"status": "pending"}).get_json()
+    assert len(open_only["orders"]) == 2
+
+
+def test_vendor_list_includes_archived_but_queue_skips_archive(client, login, shop_id, sql_statements):
+    _orders(shop_id, ["delivered"] * 3 + ["pending"])
+    archive_closed_orders(older_than_days=30)
+    hdr = login(VENDOR, "vendor")
+
+    body = client.get(f"{API_PREFIX}/vendor/orders", headers=hdr).get_json()
+    assert [o["status"] for o in body["orders"]] == ["pending", "delivered", "delivered", "delivered"]
+
+    with sql_statements() as statements:
+        queue = client.get(f"{API_PREFIX}/vendor/orders/queue", headers=hdr).get_json()
+    assert len(queue["orders"]) == 1
+    assert not any("order_archive" in s for s in statements)
+
+
+def test_archive_cli(app, shop_id):
+    _orders(shop_id, ["delivered"] * 2)
+    result = app.test_cli_runner().invoke(args=["archive-orders", "--older-than-days", "30"])
+    assert result.exit_code == 0
+    assert "Archived 2 orders." in result.output
+
+
+def test_legacy_orders_without_updated_at_age_by_created_at(shop_id):
+    legacy = _orders(shop_id, ["delivered"])
+    fresh = _orders(shop_id, ["delivered"], start=1)
+    db.session.execute(update(Order).where(Order.id.in_(legacy + fresh)).values(updated_at=None))
+    db.session.execute(update(Order).where(Order.id.in_(fresh)).values(created_at=datetime.utcnow()))
+    db.session.commit()
+
+    assert archive_closed_orders(older_than_days=30, batch_size=10) == 1
+    assert [o.id for o in ArchivedOrder.query.all()] == legacy
@@ -0,0 +1,102 @@
+import pytest
+from models import db
+from models.order import (
+    Order,
+    OrderActionLog,
+    OrderEvent,
+    OrderEventKind,
+    OrderMessage,
+    OrderStatusLog,
+)
+from app.services.order_events import event_row, record_event, record_events
+from app.version import API_PREFIX
+
+CONSUMER = "9700000001"
+
+
+@pytest.fixture
+def order_id(make_shop):
+    shop = make_shop("9700000999")
+    order = Order(user_phone=CONSUMER, shop_id=shop.id, status="pending", payment_mode="cash", total_amount=30)
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+
+def _inserts(statements):
+    # Audit writes only; the shop_daily_stats rollup is counted separately.
+    return [sql for sql in statements if sql.startswith("INSERT") and "shop_daily_stats" not in sql]
+
+
+def test_cancel_appends_one_event_and_projections_match(client, login, order_id, sql_statements):
+    hdr = login(CONSUMER)
+
+    with sql_statements() as statements:
+        resp = client.post(f"{API_PREFIX}/consumer/orders/{order_id}/cancel", headers=hdr)
+    inserts = _inserts(statements)
+    assert resp.status_code == 200
+    assert len(inserts) == 1 and inserts[0].startswith("INSERT INTO order_event")
+
+    assert OrderEvent.query.filter_by(order_id=order_id).count() == 1
+    timeline = [log.to_dict() for log in OrderStatusLog.query.filter_by(order_id=order_id)]
+    assert [(t["status"], t["updated_by"]) for t in timeline] == [("cancelled", CONSUMER)]
+    action = OrderActionLog.query.filter_by(order_id=order_id).one()
+    assert (action.action_type, action.details) == ("order_cancelled", "Cancelled by consumer")
+
+    messages = client.get(f"{API_PREFIX}/consumer/orders/{order_id}/messages", headers=hdr).get_json()["messages"]
+    assert [(m["sender_phone"], m["message"]) for m in messages] == [(CONSUMER, "Order cancelled by you.")]
+    assert set(messages[0]) == {"id", "order_id", "sender_phone", "message", "timestamp"}
+
+
+def test_chat_and_actions_interleave_in_journal_order(client, login, order_id):
+    hdr = login(CONSUMER)
+    client.post(f"{API_PREFIX}/consumer/orders/{order_id}/message", json={"message": "Ring twice"}, headers=hdr)
+    client.post(f"{API_PREFIX}/consumer/orders/{order_id}/cancel", headers=hdr)
+
+    messages = client.get(f"{API_PREFIX}/consumer/orders/{order_id}/messages", headers=hdr).get_json()["messages"]
+    assert [m["message"] for m in messages] == ["Ring twice", "Order cancelled by you."]
+    actions = OrderActionLog.query.filter_by(order_id=order_id).order_by(OrderActionLog.id).all()
+    assert [(a.action_type, a.details) for a in actions] == [
+        ("message_sent", "Ring twice"),
+        ("order_cancelled", "Cancelled by consumer"),
+    ]
+    assert OrderStatusLog.query.filter_by(order_id=order_id).count() == 1
+
+
+def test_status_update_details_are_derived(order_id):
+    record_events([event_row(order_id, OrderEventKind.STATUS_UPDATED, "v", status="accepted")])
+    row = db.session.query(OrderEvent.body, OrderEvent.status).filter_by(order_id=order_id).one()
+    assert row == (None, "accepted")
+    assert OrderActionLog.query.filter_by(order_id=order_id).one().details == "Order status updated to accepted"
+    assert OrderMessage.query.filter_by(order_id=order_id).count() == 0
+
+
+def test_record_events_is_one_statement(order_id, sql_statements):
+    rows = [event_row(order_id, OrderEventKind.MESSAGE_SENT, "c", body=f"m{i}") for i in range(20)]
+    with sql_statements() as statements:
+        record_events(rows)
+    assert len(_inserts(statements)) == 1
+    assert [m.message for m in OrderMessage.query.filter_by(order_id=order_id).order_by(OrderMessage.id)] == [
+        f"m{i}" for i in range(20)
+    ]
+
+
+def test_routed_writes_skip_the_order_lookup(order_id, sql_statements):
+    shop_id = db.session.get(Order, order_id).shop_id
+    db.session.expunge_all()
+    with sql_statements() as statements:
+        record_event(order_id, OrderEventKind.CANCELLED_BY_CONSUMER, CONSUMER, status="cancelled")
+        record_event(order_id, OrderEventKind.CANCELLED_BY_CONSUMER, CONSUMER, status="cancelled",
+                     route=(shop_id, CONSUMER))
+    # Unrouted rows are a plain INSERT; routed ones read their ids back.
+    assert len(statements) == 2 and all(sql.startswith("INSERT INTO order_event") for sql in statements)
+    assert "RETURNING" not in statements[0] and "RETURNING" in statements[1]
+    assert [payload["status"] for _, payload in db.session.info["order_stream_pending"]] == ["cancelled"]
+    db.session.rollback()
+
+
+def test_legacy_status_rows_feed_the_timeline_only(order_id):
+    record_events([event_row(order_id, OrderEventKind.LEGACY_STATUS, "v", status="accepted")])
+    assert [log.status for log in OrderStatusLog.query.filter_by(order_id=order_id)] == ["accepted"]
+    assert OrderActionLog.query.filter_by(order_id=order_id).count() == 0
+    assert OrderMessage.query.filter_by(order_id=order_id).count() == 0
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from models import db
+from models.order import Order, OrderItem
+from app.version import API_PREFIX
+
+PHONE = "9600000001"
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _seed_orders(count, status="delivered", start=0):
+    for i in range(start, start + count):
+        order = Order(
+            user_phone=PHONE,
+            shop_id=1,
+            status=status,
+            payment_mode="cash",
+            total_amount=10,
+            final_amount=10,
+            created_at=BASE + timedelta(hours=i),
+        )
+        order.items = [
+            OrderItem(item_id=n, name=f"item-{n}", unit="pcs", unit_price=5, quantity=1, subtotal=5)
+            for n in range(2)
+        ]
+        db.session.add(order)
+    db.session.commit()
+
+
+def _history(client, hdr, **params):
+    return client.get(f"{API_PREFIX}/consumer/order/history", headers=hdr, query_string=params)
+
+
+def test_history_pages_with_before_cursor(client, login):
+    hdr = login(PHONE)
+    _seed_orders(25)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 10, "expand": "items"}
+        if cursor:
+            params["before"] = cursor
+        body = _history(client, hdr, **params).get_json()
+        seen.extend(o["order_id"] for o in body["orders"])
+        pages += 1
+        cursor = body["next_before"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 25
+    assert seen == sorted(seen, reverse=True)
+    assert all(len(o["items"]) == 2 for o in body["orders"])
+
+
+def test_history_query_count_is_flat(client, login, sql_statements):
+    hdr = login(PHONE)
+    _seed_orders(3)
+    _history(client, hdr)  # warm the principal cache and revocation filter
+
+    with sql_statements() as small:
+        assert _history(client, hdr, limit=50).status_code == 200
+    _seed_orders(40, start=3)
+    with sql_statements() as large:
+        body = _history(client, hdr, limit=50).get_json()
+    assert len(body["orders"]) == 43
+    assert len(small) == len(large) <= 3
+
+
+def test_history_filters_by_status_and_date(client, login):
+    hdr = login(PHONE)
+    _seed_orders(4, status="delivered")
+    _seed_orders(3, status="cancelled", start=4)
+
+    body = _history(client, hdr, status="cancelled").get_json()
+    assert len(body["orders"]) == 3
+    assert {o["status"] for o in body["orders"]} == {"cancelled"}
+
+    body = _history(
+        client,
+        hdr,
+        **{"from": (BASE + timedelta(hours=1)).isoformat(), "to": (BASE + timedelta(hours=3)).isoformat()},
+    ).get_json()
+    assert len(body["orders"]) == 2
+
+
+def test_history_rejects_bad_parameters(client, login):
+    hdr = login(PHONE)
+    assert _history(client, hdr, before="not-a-cursor").status_code == 400
+    assert _history(client, hdr, limit="ten").status_code == 400
+    assert _history(client, hdr, **{"from": "yesterday"}).status_code == 400
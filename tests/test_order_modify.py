@@ -0,0 +1,107 @@
+import pytest
+from models import db
+from models.order import Order, OrderItem
+from app.version import API_PREFIX
+
+VENDOR = "9800000001"
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    """``setup(lines)`` -> (vendor headers, id of an accepted order with that many lines)."""
+    hdr = login(VENDOR, "vendor")
+    shop = make_shop(VENDOR)
+    return lambda lines: (hdr, _order(shop.id, lines))
+
+
+def _order(shop_id, lines):
+    order = Order(user_phone="c", shop_id=shop_id, status="accepted", payment_mode="cash",
+                  total_amount=10 * lines, final_amount=10 * lines)
+    order.items = [
+        OrderItem(item_id=n, name=f"i{n}", unit="pcs", unit_price=10, quantity=1, subtotal=10)
+        for n in range(1, lines + 1)
+    ]
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+
+def _modify(client, hdr, order_id, **body):
+    return client.post(f"{API_PREFIX}/vendor/orders/{order_id}/modify", json=body, headers=hdr)
+
+
+def _lines(order_id):
+    rows = db.session.query(OrderItem.item_id, OrderItem.quantity).filter_by(order_id=order_id).all()
+    return dict(rows)
+
+
+def test_round_trips_do_not_grow_with_modifications(client, setup, sql_statements):
+    hdr, warm_id = setup(1)
+    shop_id = db.session.get(Order, warm_id).shop_id
+    _modify(client, hdr, warm_id, modifications=[])  # warm auth caches
+
+    def _count(lines):
+        order_id = _order(shop_id, lines)
+        mods = [{"item_id": n, "quantity": 0 if n % 2 else 3} for n in range(1, lines + 1)]
+        with sql_statements() as statements:
+            assert _modify(client, hdr, order_id, modifications=mods).status_code == 200
+        return len(statements)
+
+    assert _count(2) == _count(20)
+
+
+def test_modify_updates_removes_and_totals(client, setup):
+    hdr, order_id = setup(3)
+    resp = _modify(client, hdr, order_id, modifications=[
+        {"item_id": 1, "quantity": 4},
+        {"item_id": 2, "quantity": 0},
+        {"item_id": 99, "quantity": 5},
+    ])
+    body = resp.get_json()
+    assert resp.status_code == 200
+    assert body["new_total"] == 50.0
+    assert body["version"] == 2
+    assert _lines(order_id) == {1: 4, 3: 1}
+    db.session.expire_all()
+    order = db.session.get(Order, order_id)
+    assert (order.status, float(order.final_amount)) == ("awaiting_consumer_confirmation", 50.0)
+    assert float(db.session.query(OrderItem.subtotal).filter_by(order_id=order_id, item_id=1).scalar()) == 40.0
+
+
+def test_stale_expected_version_is_rejected(client, setup):
+    hdr, order_id = setup(2)
+    first = _modify(client, hdr, order_id, expected_version=1, modifications=[{"item_id": 1, "quantity": 2}])
+    assert first.status_code == 200
+
+    stale = _modify(client, hdr, order_id, expected_version=1, modifications=[{"item_id": 1, "quantity": 7}])
+    assert stale.status_code == 409
+    assert _lines(order_id) == {1: 2, 2: 1}
+
+    fresh = _modify(client, hdr, order_id, expected_version=first.get_json()["version"],
+                    modifications=[{"item_id": 1, "quantity": 7}])
+    assert fresh.status_code == 200
+    assert _lines(order_id) == {1: 7, 2: 1}
+
+
+def test_invalid_quantity_is_rejected(client, setup):
+    hdr, order_id = setup(1)
+    assert _modify(client, hdr, order_id, modifications=[{"item_id": 1, "quantity": -1}]).status_code == 400
+    assert _modify(client, hdr, order_id, expected_version="1", modifications=[]).status_code == 400
+    assert _lines(order_id) == {1: 1}
+
+
+def test_duplicate_lines_for_one_item_are_kept_and_folded(client, setup):
+    hdr, order_id = setup(2)
+    # Two lines for item 1, as orders placed before cart lines were unique can have.
+    db.session.add(OrderItem(order_id=order_id, item_id=1, name="i1", unit="pcs", unit_price=10, quantity=2,
+                             subtotal=20))
+    db.session.commit()
+
+    resp = _modify(client, hdr, order_id, modifications=[{"item_id": 2, "quantity": 3}])
+    assert resp.get_json()["new_total"] == 60.0
+    assert db.session.get(Order, order_id).item_count == 3
+
+    resp = _modify(client, hdr, order_id, modifications=[{"item_id": 1, "quantity": 4}])
+    assert resp.get_json()["new_total"] == 70.0
+    rows = db.session.query(OrderItem.item_id, OrderItem.quantity).filter_by(order_id=order_id).order_by(OrderItem.id)
+    assert rows.all() == [(1, 4), (2, 3)]
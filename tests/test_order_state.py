@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import text
+from models import db
+from models.order import Order, OrderStatus
+from models.wallet import ConsumerWallet
+from app.services.consumer.orders import cancel_order_by_consumer
+from app.services.order_state import (
+    TRANSITIONS,
+    TransitionConflict,
+    TransitionError,
+    allowed,
+    transition,
+)
+
+CONSUMER = "9600000001"
+
+
+class _User:
+    phone = CONSUMER
+
+
+@pytest.fixture
+def make_order(make_shop):
+    def _order(status="pending", payment_mode="cash", total=30):
+        shop = make_shop("9600000999")
+        order = Order(user_phone=CONSUMER, shop_id=shop.id, status=status, payment_mode=payment_mode,
+                      total_amount=total)
+        db.session.add(order)
+        db.session.commit()
+        return order
+
+    return _order
+
+
+def test_table_targets_are_known_statuses():
+    for rule in TRANSITIONS.values():
+        assert rule.target in OrderStatus
+        assert rule.sources and rule.mask
+    assert allowed("accept", "pending")
+    assert not allowed("accept", "delivered")
+    assert allowed("cancel", OrderStatus.CONFIRMED)
+
+
+def test_status_is_stored_as_code(make_order):
+    order = make_order("return_accepted")
+    raw = db.session.execute(text('SELECT status, version FROM "order" WHERE id = :id'), {"id": order.id}).one()
+    assert raw.status == OrderStatus.RETURN_ACCEPTED
+    assert raw.version == 1
+    db.session.expire_all()
+    assert db.session.get(Order, order.id).status == "return_accepted"
+
+
+def test_illegal_transition_is_rejected_without_sql(make_order, sql_statements):
+    order = make_order("delivered")
+    order.status  # load before counting
+
+    with sql_statements() as statements:
+        with pytest.raises(TransitionError, match="Only pending orders can be accepted"):
+            transition(order, "accept")
+    assert statements == []
+
+
+def test_transition_is_one_conditional_update(make_order, sql_statements):
+    order = make_order()
+    order.status
+    with sql_statements() as statements:
+        transition(order, "accept")
+    assert len(statements) == 1
+    assert statements[0].startswith('UPDATE "order"') and "RETURNING" in statements[0]
+    assert (order.status, order.version) == ("accepted", 2)
+    db.session.commit()
+    db.session.expire_all()
+    reloaded = db.session.get(Order, order.id)
+    assert (reloaded.status, reloaded.version) == ("accepted", 2)
+
+
+def test_stale_status_or_version_conflicts(make_order):
+    order = make_order()
+    db.session.execute(text('UPDATE "order" SET status = :s WHERE id = :id'), {"s": int(OrderStatus.REJECTED), "id": order.id})
+    with pytest.raises(TransitionConflict):
+        transition(order, "accept")  # still "pending" in memory
+    db.session.rollback()
+
+    fresh = make_order()
+    with pytest.raises(TransitionConflict):
+        transition(fresh, "accept", expected_version=fresh.version + 1)
+
+
+def test_losing_cancel_does_not_refund_twice(make_order):
+    order = make_order(payment_mode="wallet")
+    db.session.add(ConsumerWallet(user_phone=CONSUMER, balance=0))
+    db.session.commit()
+    stale = db.session.get(Order, order.id)
+    stale.status  # what a concurrent request read before the winner committed
+
+    db.session.execute(
+        text('UPDATE "order" SET status = :s, version = version + 1 WHERE id = :id'),
+        {"s": int(OrderStatus.CANCELLED), "id": order.id},
+    )
+    with pytest.raises(TransitionConflict):
+        cancel_order_by_consumer(_User(), stale)
+    db.session.rollback()
+    assert float(ConsumerWallet.query.filter_by(user_phone=CONSUMER).one().balance) == 0.0
+
+
+@pytest.mark.parametrize("path, role", [
+    ("/api/v1/vendor/orders?status=bogus", "vendor"),
+    ("/api/v1/vendor/orders/queue?status=pending,bogus", "vendor"),
+    ("/api/v1/consumer/order/history?status=bogus", "consumer"),
+])
+def test_unknown_status_filter_is_rejected(client, login, make_shop, path, role):
+    make_shop("9600000999")
+    hdr = login("9600000999" if role == "vendor" else CONSUMER, role)
+    resp = client.get(path, headers=hdr)
+    assert resp.status_code == 400
+    assert "Invalid status" in resp.get_data(as_text=True)
@@ -0,0 +1,320 @@
+import json
+import threading
+import time
+import pytest
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from models.order import Order, OrderEvent, OrderEventKind
+from app.services.order_events import record_event
+from app.utils import order_stream
+from app.utils.order_stream import (
+    InMemoryOrderStreamHub,
+    RedisOrderStreamHub,
+    StreamLimitReached,
+    _events as stream_events,
+    create_order_stream_hub,
+    stream_slot_limit,
+)
+from app.version import API_PREFIX
+
+CONSUMER = "9860000001"
+VENDOR = "9860000002"
+OTHER_VENDOR = "9860000003"
+
+
+@pytest.fixture
+def hub(app):
+    saved_hub = app.order_stream
+    saved = {key: app.config[key] for key in ("ORDER_STREAM_HEARTBEAT_SEC", "ORDER_STREAM_MAX_DURATION_SEC")}
+    app.config.update(ORDER_STREAM_HEARTBEAT_SEC=0.05, ORDER_STREAM_MAX_DURATION_SEC=0.2)
+    app.order_stream = InMemoryOrderStreamHub(max_connections=2)
+    yield app.order_stream
+    app.order_stream = saved_hub
+    app.config.update(saved)
+
+
+@pytest.fixture
+def shop_item(make_shop):
+    """``shop_item(phone)`` -> (shop id, item id) of a shop selling milk."""
+
+    def _shop_item(phone):
+        shop = make_shop(phone)
+        item = Item(shop_id=shop.id, title="milk", price=10, unit="pcs", quantity_in_stock=50)
+        db.session.add(item)
+        db.session.commit()
+        return shop.id, item.id
+
+    return _shop_item
+
+
+def _place(client, consumer, shop_id, item_id):
+    db.session.add(CartItem(user_phone=CONSUMER, shop_id=shop_id, item_id=item_id, quantity=1))
+    db.session.commit()
+    resp = client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": "cash"}, headers=consumer)
+    return resp.get_json()["order_id"]
+
+
+def _events(resp):
+    body = resp.get_data(as_text=True)
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+def test_vendor_and_consumer_see_changes_after_commit(client, hub, login, shop_item):
+    shop_id, item_id = shop_item(VENDOR)
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    order_id = _place(client, consumer, shop_id, item_id)
+
+    vendor_stream = client.get(f"{API_PREFIX}/vendor/orders/stream", headers=vendor, buffered=False)
+    consumer_stream = client.get(f"{API_PREFIX}/consumer/orders/stream", headers=consumer, buffered=False)
+    assert vendor_stream.mimetype == "text/event-stream"
+    assert vendor_stream.headers["Cache-Control"] == "no-cache"
+    assert hub.open_connections == 2
+
+    client.post(f"{API_PREFIX}/vendor/orders/{order_id}/status", json={"status": "accepted"}, headers=vendor)
+    client.post(f"{API_PREFIX}/consumer/orders/{order_id}/message", json={"message": "ring twice"}, headers=consumer)
+
+    for stream in (vendor_stream, consumer_stream):
+        body = stream.get_data(as_text=True)
+        assert body.startswith("retry: ")
+        assert ": heartbeat" in body
+        events = _events(stream)
+        assert [(e["order_id"], e["status"]) for e in events] == [(order_id, "accepted"), (order_id, None)]
+        assert events[1]["message"] == "ring twice"
+        stream.close()
+    assert hub.open_connections == 0
+
+
+def test_rolled_back_events_are_not_published(app, hub, shop_item):
+    shop_id, item_id = shop_item(VENDOR)
+    order = Order(user_phone=CONSUMER, shop_id=shop_id, status="pending", payment_mode="cash",
+                  total_amount=10, final_amount=10)
+    db.session.add(order)
+    db.session.commit()
+    subscription = hub.subscribe([f"shop:{shop_id}"])
+    try:
+        route = (shop_id, CONSUMER)
+        record_event(order.id, OrderEventKind.STATUS_UPDATED, VENDOR, status="accepted", route=route)
+        db.session.rollback()
+        assert subscription.get(0) is None
+
+        record_event(order.id, OrderEventKind.STATUS_UPDATED, VENDOR, status="accepted", route=route)
+        db.session.commit()
+        assert subscription.get(0)["status"] == "accepted"
+    finally:
+        subscription.close()
+
+
+def test_last_event_id_replays_only_own_missed_events(client, hub, login, shop_item):
+    shop_id, item_id = shop_item(VENDOR)
+    other_shop_id, other_item_id = shop_item(OTHER_VENDOR)
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    first = _place(client, consumer, shop_id, item_id)
+    _place(client, consumer, other_shop_id, other_item_id)
+    second = _place(client, consumer, shop_id, item_id)
+    client.post(f"{API_PREFIX}/vendor/orders/{first}/status", json={"status": "accepted"}, headers=vendor)
+    seen = db.session.query(OrderEvent.id).filter_by(order_id=first).order_by(OrderEvent.id).first()[0]
+
+    resp = client.get(f"{API_PREFIX}/vendor/orders/stream", headers={**vendor, "Last-Event-ID": str(seen)})
+    events = _events(resp)
+    assert [(e["order_id"], e["status"]) for e in events] == [(second, "pending"), (first, "accepted")]
+    assert f"id: {events[-1]['id']}" in resp.get_data(as_text=True)
+    resp.close()
+
+    # The consumer sees both shops' orders.
+    resp = client.get(f"{API_PREFIX}/consumer/orders/stream", headers=consumer, query_string={"last_event_id": seen})
+    assert len(_events(resp)) == 3
+    resp.close()
+
+    bad = client.get(f"{API_PREFIX}/vendor/orders/stream", headers={**vendor, "Last-Event-ID": "x"})
+    assert bad.status_code == 400
+    assert hub.open_connections == 0
+
+
+def test_live_events_committed_out_of_id_order_are_all_delivered(hub):
+    subscription = hub.subscribe(["shop:1"])
+    try:
+        # 12 was replayed and is also published live; 11 committed after 12.
+        for event_id in (12, 11, 13):
+            hub.publish(["shop:1"], {"id": event_id})
+        body = "".join(stream_events(subscription, [{"id": 10}, {"id": 12}], False, 0.01, 0.1))
+    finally:
+        subscription.close()
+    ids = [int(line[len("id: "):]) for line in body.splitlines() if line.startswith("id: ")]
+    assert ids == [10, 12, 11, 13]
+
+
+def test_connection_cap_returns_503_until_a_stream_closes(client, hub, login, shop_item):
+    shop_item(VENDOR)
+    vendor = login(VENDOR, "vendor")
+    held = [client.get(f"{API_PREFIX}/vendor/orders/stream", headers=vendor, buffered=False) for _ in range(2)]
+
+    refused = client.get(f"{API_PREFIX}/vendor/orders/stream", headers=vendor)
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"]
+
+    held[0].close()
+    assert hub.open_connections == 1
+    reopened = client.get(f"{API_PREFIX}/vendor/orders/stream", headers=vendor, buffered=False)
+    assert reopened.status_code == 200
+    for resp in (reopened, held[1]):
+        resp.close()
+    assert hub.open_connections == 0
+
+
+def test_redis_hub_fans_out_through_pubsub(fake_redis):
+    hub = RedisOrderStreamHub(fake_redis, max_connections=1)
+    subscription = hub.subscribe(["shop:1"])
+    hub.publish(["shop:1", "consumer:9860000001"], {"id": 7, "status": "accepted"})
+    hub.publish(["shop:2"], {"id": 8})
+    assert subscription.get(0) == {"id": 7, "status": "accepted"}
+    assert subscription.get(0) is None
+    subscription.close()
+    subscription.close()
+    assert fake_redis.subscribers == []
+    assert hub.open_connections == 0
+
+
+def test_redis_hub_caps_streams_across_workers(fake_redis):
+    workers = [RedisOrderStreamHub(fake_redis, max_connections=2, lease=30) for _ in range(2)]
+    held = [workers[0].subscribe(["shop:1"]), workers[1].subscribe(["shop:2"])]
+    with pytest.raises(StreamLimitReached):
+        workers[0].subscribe(["shop:3"])
+    assert workers[1].open_connections == 2
+    held[0].close()
+    held.append(workers[0].subscribe(["shop:3"]))
+
+    # A worker that died without closing leaves a slot that lapses with its lease.
+    held.pop().close()
+    fake_redis.zadd("order-stream:slots", {"dead": time.time() - 1})
+    assert workers[0].open_connections == 1
+    held.append(workers[1].subscribe(["shop:4"]))
+    assert "dead" not in fake_redis.data["order-stream:slots"]
+    for subscription in held[1:]:
+        subscription.close()
+    assert "order-stream:slots" not in fake_redis.data
+
+
+def test_stream_slots_follow_the_worker_setup():
+    assert stream_slot_limit({"ORDER_STREAM_MAX_CONNECTIONS": 8}) == 8
+    assert stream_slot_limit({"ORDER_STREAM_MAX_CONNECTIONS": 8, "WEB_CONCURRENCY": 4}) == 2
+    assert stream_slot_limit({"ORDER_STREAM_MAX_CONNECTIONS": 8, "WEB_CONCURRENCY": 4,
+                              "ORDER_STREAM_ASYNC_WORKERS": True}) == 8
+
+    hub = create_order_stream_hub({"ORDER_STREAM_URL": "memory://", "WEB_CONCURRENCY": 4})
+    assert hub.unavailable
+    with pytest.raises(StreamLimitReached):
+        hub.subscribe(["shop:1"])
+    assert not create_order_stream_hub({"ORDER_STREAM_URL": "memory://"}).unavailable
+
+
+def test_in_process_hub_with_several_workers_refuses_streams(client, app, login, shop_item):
+    saved = app.order_stream
+    app.order_stream = create_order_stream_hub({"ORDER_STREAM_URL": "memory://", "WEB_CONCURRENCY": 4})
+    try:
+        shop_item(VENDOR)
+        resp = client.get(f"{API_PREFIX}/vendor/orders/stream", headers=login(VENDOR, "vendor"))
+    finally:
+        app.order_stream = saved
+    assert resp.status_code == 503
+    assert "Redis" in resp.get_json()["message"]
+
+
+def _thread(client, headers, order_id, role="consumer", **params):
+    resp = client.get(f"{API_PREFIX}/{role}/orders/{order_id}/messages", headers=headers, query_string=params)
+    return resp.get_json()
+
+
+def test_messages_page_with_since_id_and_limit(client, hub, login, shop_item):
+    shop_id, item_id = shop_item(VENDOR)
+    shop_item(OTHER_VENDOR)
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    order_id = _place(client, consumer, shop_id, item_id)
+    for text in ("one", "two", "three"):
+        client.post(f"{API_PREFIX}/consumer/orders/{order_id}/message", json={"message": text}, headers=consumer)
+
+    first = _thread(client, consumer, order_id, limit=2)
+    assert [m["message"] for m in first["messages"]] == ["one", "two"]
+    rest = _thread(client, vendor, order_id, role="vendor", since_id=first["next_since_id"])
+    assert [m["message"] for m in rest["messages"]] == ["three"]
+    done = _thread(client, consumer, order_id, since_id=rest["next_since_id"], wait=0.05)
+    assert done["messages"] == [] and done["next_since_id"] == rest["next_since_id"]
+    assert hub.open_connections == 0
+
+    other = login(OTHER_VENDOR, "vendor")
+    assert client.get(f"{API_PREFIX}/vendor/orders/{order_id}/messages", headers=other).status_code == 403
+    assert client.get(f"{API_PREFIX}/consumer/orders/{order_id}/messages", headers=consumer,
+                      query_string={"since_id": "x"}).status_code == 400
+
+
+def test_wait_returns_when_a_message_is_committed(client, app, hub, login, shop_item):
+    shop_id, item_id = shop_item(VENDOR)
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    order_id = _place(client, consumer, shop_id, item_id)
+    since_id = _thread(client, consumer, order_id)["next_since_id"]
+
+    def _reply():
+        with app.app_context():
+            record_event(order_id, OrderEventKind.MESSAGE_SENT, VENDOR, body="on the way", route=(shop_id, CONSUMER))
+            db.session.commit()
+
+    timer = threading.Timer(0.2, _reply)
+    started = time.monotonic()
+    timer.start()
+    try:
+        body = _thread(client, consumer, order_id, since_id=since_id, wait=10)
+    finally:
+        timer.join()
+    assert time.monotonic() - started < 5
+    assert [m["message"] for m in body["messages"]] == ["on the way"]
+    assert hub.open_connections == 0
+
+
+def test_wait_answers_at_once_without_a_free_stream_slot(client, app, hub, login, shop_item):
+    shop_id, item_id = shop_item(VENDOR)
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    order_id = _place(client, consumer, shop_id, item_id)
+    since_id = _thread(client, consumer, order_id)["next_since_id"]
+    held = [client.get(f"{API_PREFIX}/vendor/orders/stream", headers=vendor, buffered=False) for _ in range(2)]
+    started = time.monotonic()
+    try:
+        assert _thread(client, consumer, order_id, since_id=since_id, wait=10)["messages"] == []
+    finally:
+        for resp in held:
+            resp.close()
+
+    app.order_stream = create_order_stream_hub({"ORDER_STREAM_URL": "memory://", "WEB_CONCURRENCY": 4})
+    assert _thread(client, consumer, order_id, since_id=since_id, wait=10)["messages"] == []
+    assert time.monotonic() - started < 5
+
+
+def test_vendor_thread_is_two_statements_and_an_index_seek(client, hub, login, shop_item, sql_statements):
+    shop_id, item_id = shop_item(VENDOR)
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    order_id = _place(client, consumer, shop_id, item_id)
+    client.post(f"{API_PREFIX}/consumer/orders/{order_id}/message", json={"message": "hi"}, headers=consumer)
+    _thread(client, vendor, order_id, role="vendor")  # warm auth caches
+
+    with sql_statements(parameters=True) as statements:
+        body = _thread(client, vendor, order_id, role="vendor", since_id=0)
+    assert [m["message"] for m in body["messages"]] == ["hi"]
+    assert len(statements) == 2  # authorization + thread
+    statement, parameters = statements[-1]
+    plan = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    # Without ANALYZE stats SQLite may pick either (order_id, id) index; both seek without sorting.
+    assert [row[-1] for row in plan] in (
+        ["SEARCH order_event USING INDEX ix_order_event_message (order_id=? AND id>?)"],
+        ["SEARCH order_event USING INDEX ix_order_event_order (order_id=? AND id>?)"],
+    )
+
+
+def test_in_process_hub_with_several_workers_is_refused_in_production(app):
+    app.config.update(ORDER_STREAM_URL="memory://", WEB_CONCURRENCY=4)
+    app.testing, saved = False, app.order_stream
+    try:
+        with pytest.raises(RuntimeError):
+            order_stream.init_app(app)
+    finally:
+        app.testing = True
+        app.config["WEB_CONCURRENCY"] = 1
+        app.order_stream = saved
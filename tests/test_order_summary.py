@@ -0,0 +1,77 @@
+import pytest
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from models.order import Order, items_summary
+from app.version import API_PREFIX
+
+CONSUMER = "9830000001"
+VENDOR = "9830000002"
+
+
+def _place_order(client, login, make_shop, lines=5):
+    consumer, vendor = login(CONSUMER), login(VENDOR, "vendor")
+    shop = make_shop(VENDOR)
+    items = [Item(shop_id=shop.id, title=f"item-{i}", price=10, unit="pcs", quantity_in_stock=50) for i in range(lines)]
+    db.session.add_all(items)
+    db.session.flush()
+    db.session.add_all(
+        CartItem(user_phone=CONSUMER, shop_id=shop.id, item_id=item.id, quantity=i + 1)
+        for i, item in enumerate(items)
+    )
+    db.session.commit()
+    resp = client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": "cash"}, headers=consumer)
+    return consumer, vendor, resp.get_json()["order_id"], [item.id for item in items]
+
+
+@pytest.fixture
+def order_item_reads(sql_statements):
+    def _reads(fn):
+        with sql_statements() as statements:
+            body = fn().get_json()
+        return body, [s for s in statements if "FROM order_item" in s]
+
+    return _reads
+
+
+def test_items_summary_previews_first_lines():
+    assert items_summary([]) == {"item_count": 0, "items_preview": None}
+    summary = items_summary([("Milk", 2), ("Bread", 1), ("Eggs", 12), ("Tea", 1)])
+    assert summary == {"item_count": 4, "items_preview": "Milk x2, Bread x1, Eggs x12"}
+    assert len(items_summary([("x" * 300, 1)])["items_preview"]) == 255
+
+
+def test_checkout_writes_summary_and_lists_skip_order_item(client, login, make_shop, order_item_reads):
+    consumer, vendor, order_id, _ = _place_order(client, login, make_shop)
+    order = db.session.get(Order, order_id)
+    assert (order.item_count, order.items_preview) == (5, "item-0 x1, item-1 x2, item-2 x3")
+
+    history = lambda **q: client.get(f"{API_PREFIX}/consumer/order/history", headers=consumer, query_string=q)
+    body, reads = order_item_reads(history)
+    assert reads == []
+    row = body["orders"][0]
+    assert "items" not in row
+    assert (row["item_count"], row["items_preview"]) == (5, "item-0 x1, item-1 x2, item-2 x3")
+
+    body, reads = order_item_reads(lambda: history(expand="items"))
+    assert len(reads) == 1
+    assert len(body["orders"][0]["items"]) == 5
+
+    queue = lambda **q: client.get(f"{API_PREFIX}/vendor/orders/queue", headers=vendor, query_string=q)
+    body, reads = order_item_reads(queue)
+    assert reads == []
+    assert body["orders"][0]["item_count"] == 5
+    body, reads = order_item_reads(lambda: queue(expand="items"))
+    assert len(body["orders"][0]["items"]) == 5
+
+
+def test_vendor_modify_refreshes_summary(client, login, make_shop):
+    _, vendor, order_id, item_ids = _place_order(client, login, make_shop, lines=4)
+    client.post(f"{API_PREFIX}/vendor/orders/{order_id}/status", json={"status": "accepted"}, headers=vendor)
+    resp = client.post(f"{API_PREFIX}/vendor/orders/{order_id}/modify", headers=vendor, json={
+        "modifications": [{"item_id": item_ids[0], "quantity": 0}, {"item_id": item_ids[2], "quantity": 9}],
+    })
+    assert resp.status_code == 200
+    db.session.expire_all()
+    order = db.session.get(Order, order_id)
+    assert (order.item_count, order.items_preview) == (3, "item-1 x2, item-2 x9, item-3 x4")
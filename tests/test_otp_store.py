@@ -0,0 +1,103 @@
+from models import db
+from models.user import OTP
+from app.utils import normalize_phone
+from app.utils.otp_store import (
+    InMemoryOTPStore,
+    create_otp_store,
+    RedisOTPStore,
+    OTP_VALID,
+    OTP_INVALID,
+    OTP_EXPIRED,
+)
+from app.version import API_PREFIX
+
+
+def send_otp(client, phone):
+    return client.post(f"{API_PREFIX}/send-otp", json={'phone': phone})
+
+
+def verify_otp(client, phone, otp):
+    return client.post(f"{API_PREFIX}/verify-otp", json={'phone': phone, 'otp': otp})
+
+
+def _otp_for(phone):
+    return OTP.query.filter_by(phone=normalize_phone(phone)).first()
+
+
+def test_resend_replaces_pending_code(client, app):
+    phone = '2223334444'
+    send_otp(client, phone)
+    first = _otp_for(phone).otp
+    send_otp(client, phone)
+    assert OTP.query.filter_by(phone=normalize_phone(phone)).count() == 1
+    second = _otp_for(phone).otp
+    if first != second:
+        assert verify_otp(client, phone, first).status_code == 401
+    assert verify_otp(client, phone, second).status_code == 200
+    assert verify_otp(client, phone, second).status_code == 401
+
+
+def test_verify_is_single_otp_lookup(client, sql_statements):
+    phone = '2223335555'
+    send_otp(client, phone)
+    code = _otp_for(phone).otp
+    with sql_statements() as statements:
+        assert verify_otp(client, phone, code).status_code == 200
+    assert len([s for s in statements if s.lstrip().startswith("SELECT") and "FROM otp" in s]) == 1
+
+
+def test_expiry_window_comes_from_config(client, app):
+    phone = '2223336666'
+    original = app.otp_store
+    app.config["OTP_EXPIRY_MINUTES"] = 0
+    app.otp_store = create_otp_store(app.config)
+    try:
+        send_otp(client, phone)
+        code = _otp_for(phone).otp
+        resp = verify_otp(client, phone, code)
+    finally:
+        app.config["OTP_EXPIRY_MINUTES"] = 10
+        app.otp_store = original
+    assert resp.status_code == 401
+    assert resp.get_json()['message'] == 'OTP expired'
+
+
+def test_expired_rows_are_purged_on_issue(client, app):
+    from datetime import datetime, timedelta
+    db.session.add(OTP(phone='+910000000000', otp='123456', expires_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.session.commit()
+    send_otp(client, '2223337777')
+    assert OTP.query.filter_by(phone='+910000000000').first() is None
+
+
+def test_in_memory_store_ttl():
+    now = [100.0]
+    store = InMemoryOTPStore(ttl=60, clock=lambda: now[0])
+    store.issue("p", "111111")
+    assert store.consume("p", "222222") == OTP_INVALID
+    assert store.consume("p", "111111") == OTP_VALID
+    assert store.consume("p", "111111") == OTP_INVALID
+    store.issue("p", "333333")
+    now[0] += 61
+    assert store.consume("p", "333333") == OTP_EXPIRED
+
+
+def test_redis_store_single_use(fake_redis):
+    store = RedisOTPStore(fake_redis, ttl=600)
+    store.issue("p", "123456")
+    assert fake_redis.ttls["otp:p"] == 600
+    assert store.consume("p", "654321") == OTP_INVALID
+    assert store.consume("p", "123456") == OTP_VALID
+    assert store.consume("p", "123456") == OTP_INVALID
+
+
+def test_sql_issue_is_one_upsert_per_phone(sql_statements):
+    store = create_otp_store({"OTP_STORE_URL": "sql://"})
+    with sql_statements() as statements:
+        store.issue("+911112223333", "111111")
+    store.issue("+911112223333", "222222")
+    db.session.commit()
+    assert [s.split()[0] for s in statements] == ["DELETE", "INSERT"]
+    assert "ON CONFLICT" in statements[1]
+    assert [otp.otp for otp in OTP.query.filter_by(phone="+911112223333")] == ["222222"]
+    assert store.consume("+911112223333", "222222") == OTP_VALID
@@ -33,3 +33,32 @@ def test_scope_denied(monkeypatch):
     hdr = {"Authorization": f"Bearer {_token(app,'vbad','vendor')}"}
     r = client.post("/api/v1/test_support/vendor/dummy_deliver", headers=hdr)
     assert r.status_code == 200
+
+
+def test_compiled_table_intersects_layers(monkeypatch):
+    app = _load(monkeypatch)
+    table = app.authz_table
+    policy = table.get("vendor.modify_order_item")
+    assert policy.roles == frozenset({"vendor"})
+    assert len(policy.requirements) == 2
+    assert table.allows(policy, "vendor")
+    assert not table.allows(policy, "consumer")
+    assert not table.allows(policy, "admin")
+    assert table.get("health") is None
+
+
+def test_scope_outside_role_compiles_to_nobody():
+    from app.auth.table import Requirement
+    assert Requirement({"consumer:modify_order"}).roles == frozenset()
+    assert Requirement({"admin:anything", "vendor"}).roles == frozenset({"admin", "vendor"})
+
+
+def test_authz_table_cli(monkeypatch):
+    import json
+    app = _load(monkeypatch)
+    result = app.test_cli_runner().invoke(args=["authz-table", "--json"])
+    assert result.exit_code == 0
+    rows = json.loads(result.output[result.output.index("[\n  {"):])
+    by_endpoint = {r["endpoint"]: r for r in rows}
+    assert by_endpoint["admin.list_users"]["roles"] == ["admin"]
+    assert by_endpoint["vendor.update_order_status"]["requirements"] == ["vendor", "vendor:deliver_order"]
@@ -0,0 +1,54 @@
+from models.user import UserProfile
+from app.version import API_PREFIX
+
+
+def _auth_queries(statements):
+    return [s for s in statements if "FROM user_profile" in s]
+
+
+def test_warm_cache_skips_user_lookup(client, login, sql_statements):
+    hdr = login("9800000001")
+
+    with sql_statements() as cold:
+        r = client.get(f"{API_PREFIX}/consumer/wallet/history", headers=hdr)
+    assert r.status_code == 200
+    assert len(_auth_queries(cold)) == 1
+
+    with sql_statements() as warm:
+        r = client.get(f"{API_PREFIX}/consumer/wallet/history", headers=hdr)
+    assert r.status_code == 200
+    assert _auth_queries(warm) == []
+    # The first request also builds the revocation filter.
+    cold = [s for s in cold if "FROM revoked_token" not in s]
+    assert len(warm) == len(cold) - 1
+
+
+def test_basic_onboarding_invalidates_cached_role(client, app, login):
+    phone = "9800000002"
+    hdr = login(phone)
+    client.post(
+        f"{API_PREFIX}/onboarding/basic",
+        json={"name": "V", "city": "Town", "society": "Soc", "role": "vendor"},
+        headers=hdr,
+    )
+    assert app.principal_cache.get(phone) is None
+    # Token still claims consumer, but the refreshed principal is a vendor.
+    assert client.get(f"{API_PREFIX}/consumer/wallet", headers=hdr).status_code == 403
+    assert app.principal_cache.get(phone)["role"] == "vendor"
+
+
+def test_consumer_onboarding_sees_fresh_flags(client, app, login):
+    phone = "9800000003"
+    hdr = login(phone)
+    client.get(f"{API_PREFIX}/consumer/wallet", headers=hdr)
+    client.post(
+        f"{API_PREFIX}/onboarding/basic",
+        json={"name": "C", "city": "Town", "society": "Soc", "role": "consumer"},
+        headers=hdr,
+    )
+    r = client.post(f"{API_PREFIX}/consumer/onboarding", json={"flat_number": "1A"}, headers=hdr)
+    assert r.status_code == 200
+    r = client.post(f"{API_PREFIX}/consumer/onboarding", json={"flat_number": "1A"}, headers=hdr)
+    assert r.status_code == 400
+    with app.app_context():
+        assert UserProfile.query.get(phone).role_onboarding_done is True
@@ -14,3 +14,14 @@ def test_order_shop_status_index_used(app):
         plan_rows = db.session.execute(text("EXPLAIN QUERY PLAN SELECT * FROM 'order' WHERE shop_id=1 AND status='pending'"))
         plan = " ".join(r[3] for r in plan_rows)
         assert 'USING INDEX ix_order_shop_status' in plan
+
+
+def test_order_history_index_used(app):
+    with app.app_context():
+        insp = inspect(db.engine)
+        assert any(ix['name'] == 'ix_order_user_created' for ix in insp.get_indexes('order'))
+        plan_rows = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM 'order' WHERE user_phone='u' ORDER BY created_at DESC, id DESC"
+        ))
+        plan = " ".join(r[3] for r in plan_rows)
+        assert 'USING INDEX ix_order_user_created' in plan
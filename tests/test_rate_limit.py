@@ -26,3 +26,84 @@ def test_order_confirm_rate_limit(monkeypatch):
     for i in range(21):
         r = client.post(f"{API_PREFIX}/consumer/order/confirm", headers=hdr, json={"payment_mode": "cash"})
     assert r.status_code == 429
+
+
+def _hammer(uri, strategy, limit_str, attempts, start, results):
+    from limits import parse
+    from limits.storage import storage_from_string
+    from limits.strategies import STRATEGIES
+    import ratelimit_storage  # noqa: F401
+
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse(limit_str)
+    start.wait()
+    results.put(sum(1 for _ in range(attempts) if limiter.hit(item, "ip", "1.2.3.4")))
+
+
+def _run_workers(uri, strategy, limit_str, workers=4, attempts=40):
+    import multiprocessing as mp
+    ctx = mp.get_context("fork")
+    start = ctx.Event()
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_hammer, args=(uri, strategy, limit_str, attempts, start, results))
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    start.set()
+    granted = sum(results.get(timeout=30) for _ in procs)
+    for p in procs:
+        p.join(timeout=30)
+    return granted
+
+
+def test_shm_storage_enforces_global_limit_across_processes(tmp_path):
+    uri = f"shm://{tmp_path / 'rl-fixed'}"
+    assert _run_workers(uri, "fixed-window", "25 per hour") == 25
+
+
+def test_shm_storage_sliding_window_across_processes(tmp_path):
+    uri = f"shm://{tmp_path / 'rl-sliding'}"
+    assert _run_workers(uri, "sliding-window-counter", "30 per hour") == 30
+
+
+def test_shm_storage_counters_and_clear(tmp_path):
+    from ratelimit_storage import SharedMemoryStorage
+    a = SharedMemoryStorage(f"shm://{tmp_path / 'rl-basic'}?shards=2&slots=4")
+    b = SharedMemoryStorage(f"shm://{tmp_path / 'rl-basic'}?shards=8&slots=8")
+    assert (b._shards, b._slots) == (2, 4)
+    assert a.incr("k", 60) == 1
+    assert b.incr("k", 60, amount=2) == 3
+    assert a.get("k") == 3
+    assert a.get_expiry("k") > 0
+    a.clear("k")
+    assert b.get("k") == 0
+    for i in range(20):
+        a.incr(f"key-{i}", 60)
+    assert a.reset() == 8
+
+
+def test_limiter_defaults_to_sliding_window_on_shm(monkeypatch, tmp_path):
+    from flask import Flask
+    from limits.strategies import SlidingWindowCounterRateLimiter
+    import extensions
+    from ratelimit_storage import SharedMemoryStorage
+
+    monkeypatch.setattr(extensions, "limiter", extensions.limiter)  # restored after the reload below
+    monkeypatch.setenv("RATELIMIT_STORAGE_URL", f"shm://{tmp_path / 'rl-app'}")
+    monkeypatch.delenv("RATELIMIT_STRATEGY", raising=False)
+    limiter = importlib.reload(extensions).limiter
+
+    app = Flask(__name__)
+    limiter.init_app(app)
+
+    @app.route("/ping")
+    @limiter.limit("3 per hour")
+    def ping():
+        return "pong"
+
+    client = app.test_client()
+    assert [client.get("/ping").status_code for _ in range(4)] == [200, 200, 200, 429]
+    assert isinstance(limiter.limiter, SlidingWindowCounterRateLimiter)
+    assert isinstance(limiter.storage, SharedMemoryStorage)
@@ -0,0 +1,91 @@
+import pytest
+from models import db
+from models.order import Order, OrderItem, OrderReturn
+from models.wallet import ConsumerWallet, VendorWallet, VendorWalletTransaction, WalletTransaction
+from app.version import API_PREFIX
+
+VENDOR = "9810000001"
+CONSUMER = "9810000002"
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    """``setup(vendor_balance)`` -> (vendor headers, shop id)."""
+
+    def _setup(vendor_balance=1000):
+        shop = make_shop(VENDOR)
+        db.session.add(VendorWallet(user_phone=VENDOR, balance=vendor_balance))
+        db.session.add(ConsumerWallet(user_phone=CONSUMER, balance=0))
+        db.session.commit()
+        return login(VENDOR, "vendor"), shop.id
+
+    return _setup
+
+
+def _returned_order(shop_id, lines):
+    order = Order(user_phone=CONSUMER, shop_id=shop_id, status="return_accepted", payment_mode="wallet",
+                  payment_status="paid", total_amount=100, final_amount=100)
+    order.items = [
+        OrderItem(item_id=n, name=f"i{n}", unit="pcs", unit_price=12.5, quantity=3, subtotal=37.5)
+        for n in range(1, lines + 1)
+    ]
+    db.session.add(order)
+    db.session.flush()
+    db.session.add_all(
+        OrderReturn(order_id=order.id, item_id=n, quantity=2, reason="r", initiated_by="consumer", status="accepted")
+        for n in range(1, lines + 1)
+    )
+    db.session.commit()
+    return order.id
+
+
+def _complete(client, hdr, order_id):
+    return client.post(f"{API_PREFIX}/vendor/orders/{order_id}/return/complete", headers=hdr)
+
+
+def test_refund_is_one_transfer_and_round_trips_are_flat(client, setup, sql_statements):
+    hdr, shop_id = setup()
+    _complete(client, hdr, _returned_order(shop_id, 1))  # warm auth caches
+
+    small, large = _returned_order(shop_id, 1), _returned_order(shop_id, 8)
+    with sql_statements() as few:
+        resp = _complete(client, hdr, small)
+    assert resp.status_code == 200
+    with sql_statements() as many:
+        resp = _complete(client, hdr, large)
+    assert resp.status_code == 200
+    assert len(few) == len(many)
+
+    wallet_locks = [s for s in many if "FROM vendor_wallet" in s or "FROM consumer_wallet" in s]
+    assert "vendor_wallet" in wallet_locks[0] and "consumer_wallet" in wallet_locks[1]
+
+    assert OrderReturn.query.filter_by(order_id=large, status="completed").count() == 8
+    refund = 8 * 2 * 12.5
+    assert WalletTransaction.query.filter_by(reference=f"Return refund for order #{large}", type="refund").one().amount == refund
+    assert VendorWalletTransaction.query.filter_by(reference=f"Return refund for order #{large}", type="debit").one().amount == refund
+    assert float(ConsumerWallet.query.filter_by(user_phone=CONSUMER).one().balance) == 2 * 25.0 + refund
+    assert float(VendorWallet.query.filter_by(user_phone=VENDOR).one().balance) == 1000 - 2 * 25.0 - refund
+
+
+def test_short_vendor_balance_writes_nothing(client, setup):
+    hdr, shop_id = setup(vendor_balance=10)
+    order_id = _returned_order(shop_id, 2)
+
+    resp = _complete(client, hdr, order_id)
+    assert resp.status_code == 400
+    assert resp.get_json()["message"] == "Insufficient balance"
+    db.session.expire_all()
+    assert db.session.get(Order, order_id).status == "return_accepted"
+    assert OrderReturn.query.filter_by(order_id=order_id, status="accepted").count() == 2
+    assert float(ConsumerWallet.query.filter_by(user_phone=CONSUMER).one().balance) == 0.0
+    assert WalletTransaction.query.filter_by(user_phone=CONSUMER).count() == 0
+
+
+def test_complete_without_accepted_returns_is_rejected(client, setup):
+    hdr, shop_id = setup()
+    order_id = _returned_order(shop_id, 1)
+    OrderReturn.query.filter_by(order_id=order_id).delete()
+    db.session.commit()
+    resp = _complete(client, hdr, order_id)
+    assert resp.status_code == 400
+    assert resp.get_json()["message"] == "No accepted returns found"
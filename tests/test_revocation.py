@@ -0,0 +1,74 @@
+import uuid
+from datetime import datetime, timedelta
+from models import db
+from app.utils.revocation import BloomFilter, RevocationList
+from app.version import API_PREFIX
+
+
+def _login(client, phone):
+    return client.post("/__auth/login_stub", json={"phone": phone, "role": "consumer"}).get_json()["data"]
+
+
+def _refresh(client, token):
+    return client.post(f"{API_PREFIX}/auth/refresh", json={"refresh_token": token})
+
+
+def _wallet(client, access):
+    return client.get(f"{API_PREFIX}/consumer/wallet", headers={"Authorization": f"Bearer {access}"})
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [uuid.uuid4().hex for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    count = bloom.count
+    bloom.add(keys[0])
+    assert bloom.count == count
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(5000))
+    assert false_positives < 5000 * 0.03
+
+
+def test_refresh_rotates_and_detects_reuse(client, app):
+    toks = _login(client, "9700000001")
+    first = _refresh(client, toks["refresh"])
+    assert first.status_code == 200
+    rotated = first.get_json()
+    assert _wallet(client, rotated["access_token"]).status_code == 200
+
+    reused = _refresh(client, toks["refresh"])
+    assert reused.status_code == 401
+    assert reused.get_json()["message"] == "refresh token reuse detected"
+
+    # Reuse ends the whole session, including tokens minted by the rotation.
+    assert _refresh(client, rotated["refresh_token"]).status_code == 401
+    resp = _wallet(client, rotated["access_token"])
+    assert resp.status_code == 401
+    assert resp.get_json()["message"] == "token revoked"
+
+
+def test_unrevoked_token_skips_table_once_filter_is_warm(client, sql_statements):
+    toks = _login(client, "9700000002")
+    assert _wallet(client, toks["access"]).status_code == 200
+
+    with sql_statements() as statements:
+        assert _wallet(client, toks["access"]).status_code == 200
+    assert not [s for s in statements if "revoked_token" in s]
+
+
+def test_other_worker_picks_up_revocation_incrementally(app):
+    clock = [0.0]
+    worker_a = RevocationList(1000, 0.001, sync_interval=5, clock=lambda: clock[0])
+    worker_b = RevocationList(1000, 0.001, sync_interval=5, clock=lambda: clock[0])
+    payload = {"jti": uuid.uuid4().hex, "exp": 0}
+    assert worker_b.is_revoked(payload) is False
+
+    worker_a.revoke(payload["jti"], datetime.utcnow() + timedelta(minutes=5), "logout")
+    db.session.commit()
+    assert worker_a.is_revoked(payload) is True
+    # Worker B trusts its filter until the next sync is due.
+    assert worker_b.is_revoked(payload) is False
+    clock[0] += 5
+    assert worker_b.is_revoked(payload) is True
+    assert worker_b._filter.count == 1
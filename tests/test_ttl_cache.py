@@ -0,0 +1,27 @@
+from app.utils.ttl_cache import LocalTTLCache, RedisTTLCache
+
+
+def test_local_cache_ttl_and_bound():
+    now = [0.0]
+    cache = LocalTTLCache(ttl=10, max_entries=2, clock=lambda: now[0])
+    cache.set("a", {"phone": "a"})
+    cache.set("b", {"phone": "b"})
+    cache.get("a")
+    cache.set("c", {"phone": "c"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"phone": "a"}
+    now[0] = 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_redis_cache_roundtrip(fake_redis):
+    client = fake_redis
+    cache = RedisTTLCache(client, ttl=30, prefix="principal:")
+    cache.set("p1", {"phone": "p1", "role": "vendor"})
+    assert cache.get("p1") == {"phone": "p1", "role": "vendor"}
+    cache.delete("p1")
+    assert cache.get("p1") is None
+    cache.set("p2", {"phone": "p2"})
+    cache.clear()
+    assert client.data == {}
@@ -0,0 +1,95 @@
+import pytest
+from models import db
+from models.order import Order, OrderStatusLog
+from models.wallet import VendorWallet, VendorWalletTransaction
+from app.services.vendor.orders import MAX_BATCH_ORDERS
+from app.version import API_PREFIX
+
+VENDOR = "9820000001"
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    shop, other = make_shop(VENDOR), make_shop("9820000999")
+    db.session.commit()
+    return login(VENDOR, "vendor"), shop.id, other.id
+
+
+def _orders(shop_id, n, status="pending", payment_mode="cash", amount=10):
+    orders = [
+        Order(user_phone="c", shop_id=shop_id, status=status, payment_mode=payment_mode,
+              payment_status="paid" if payment_mode == "wallet" else "unpaid",
+              total_amount=amount, final_amount=amount)
+        for _ in range(n)
+    ]
+    db.session.add_all(orders)
+    db.session.commit()
+    return [o.id for o in orders]
+
+
+def _batch(client, hdr, order_ids, status):
+    return client.post(
+        f"{API_PREFIX}/vendor/orders/batch-status", json={"order_ids": order_ids, "status": status}, headers=hdr
+    )
+
+
+def test_batch_reports_per_order_results(client, setup):
+    hdr, shop_id, other_id = setup
+    pending = _orders(shop_id, 2)
+    delivered = _orders(shop_id, 1, status="delivered")
+    foreign = _orders(other_id, 1)
+
+    body = _batch(client, hdr, pending + delivered + foreign + [987654], "accepted").get_json()
+    assert body["updated"] == 2
+    assert body["results"] == [
+        {"order_id": pending[0], "status": "accepted"},
+        {"order_id": pending[1], "status": "accepted"},
+        {"order_id": delivered[0], "error": "Only pending orders can be accepted"},
+        {"order_id": foreign[0], "error": "Order not found"},
+        {"order_id": 987654, "error": "Order not found"},
+    ]
+    db.session.expire_all()
+    assert [db.session.get(Order, i).status for i in pending + foreign] == ["accepted", "accepted", "pending"]
+    assert [db.session.get(Order, i).version for i in pending] == [2, 2]
+    assert OrderStatusLog.query.filter(OrderStatusLog.order_id.in_(pending)).count() == 2
+
+
+def test_wallet_deliveries_are_paid_out_once(client, setup):
+    hdr, shop_id, _ = setup
+    wallet_orders = _orders(shop_id, 3, status="accepted", payment_mode="wallet", amount=25)
+    cash_orders = _orders(shop_id, 2, status="accepted")
+
+    body = _batch(client, hdr, wallet_orders + cash_orders, "delivered").get_json()
+    assert body["updated"] == 5
+    credits = VendorWalletTransaction.query.filter_by(user_phone=VENDOR, type="credit").all()
+    assert len(credits) == 1
+    assert float(credits[0].amount) == 75.0
+    assert all(f"#{i}" in credits[0].reference for i in wallet_orders)
+    assert float(VendorWallet.query.filter_by(user_phone=VENDOR).one().balance) == 75.0
+
+    again = _batch(client, hdr, wallet_orders, "delivered").get_json()
+    assert again["updated"] == 0
+    assert VendorWalletTransaction.query.filter_by(user_phone=VENDOR).count() == 1
+
+
+def test_round_trips_do_not_grow_with_batch_size(client, setup, sql_statements):
+    hdr, shop_id, _ = setup
+    # warm auth caches and create the vendor wallet
+    _batch(client, hdr, _orders(shop_id, 1, status="accepted", payment_mode="wallet"), "delivered")
+
+    def _count(n):
+        order_ids = _orders(shop_id, n, status="accepted", payment_mode="wallet")
+        with sql_statements() as statements:
+            assert _batch(client, hdr, order_ids, "delivered").get_json()["updated"] == n
+        return len(statements)
+
+    assert _count(3) == _count(30)
+
+
+def test_batch_validates_input(client, setup):
+    hdr, shop_id, _ = setup
+    order_ids = _orders(shop_id, 1)
+    assert _batch(client, hdr, order_ids, "cancelled").status_code == 400
+    assert _batch(client, hdr, [], "accepted").status_code == 400
+    assert _batch(client, hdr, ["1"], "accepted").status_code == 400
+    assert _batch(client, hdr, list(range(1, MAX_BATCH_ORDERS + 2)), "accepted").status_code == 400
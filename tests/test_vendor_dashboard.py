@@ -0,0 +1,109 @@
+from datetime import datetime
+import pytest
+from models import db
+from models.cart import CartItem
+from models.item import Item
+from models.shop import ShopDailyStats
+from models.wallet import ConsumerWallet
+from app.services.order_archive import archive_closed_orders
+from app.services.shop_stats import COUNTERS, rebuild_shop_stats
+from app.version import API_PREFIX
+
+CONSUMER = "9850000001"
+VENDOR = "9850000002"
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    shop = make_shop(VENDOR)
+    items = [Item(shop_id=shop.id, title=f"i{n}", price=10, unit="pcs", quantity_in_stock=100) for n in range(2)]
+    db.session.add_all(items)
+    db.session.add(ConsumerWallet(user_phone=CONSUMER, balance=1000))
+    db.session.commit()
+    return login(CONSUMER), login(VENDOR, "vendor"), shop.id, [i.id for i in items]
+
+
+def _place(client, consumer, shop_id, item_ids, payment_mode):
+    db.session.add_all(
+        CartItem(user_phone=CONSUMER, shop_id=shop_id, item_id=item_id, quantity=qty)
+        for item_id, qty in zip(item_ids, (1, 2))
+    )
+    db.session.commit()
+    resp = client.post(f"{API_PREFIX}/consumer/order/confirm", json={"payment_mode": payment_mode}, headers=consumer)
+    return resp.get_json()["order_id"]
+
+
+def _status(client, vendor, order_id, status):
+    resp = client.post(f"{API_PREFIX}/vendor/orders/{order_id}/status", json={"status": status}, headers=vendor)
+    assert resp.status_code == 200
+
+
+def _batch(client, vendor, order_ids, status):
+    resp = client.post(f"{API_PREFIX}/vendor/orders/batch-status",
+                       json={"order_ids": order_ids, "status": status}, headers=vendor)
+    assert resp.get_json()["updated"] == len(order_ids)
+
+
+def _stored(shop_id):
+    rows = ShopDailyStats.query.filter_by(shop_id=shop_id).all()
+    return {(row.shop_id, row.day): {name: float(getattr(row, name)) for name in COUNTERS} for row in rows}
+
+
+def test_order_flow_rolls_up_and_rebuild_matches(client, setup):
+    consumer, vendor, shop_id, item_ids = setup
+    wallet_order, cash_a, cash_b, cancelled, rejected = (
+        _place(client, consumer, shop_id, item_ids, mode) for mode in ("wallet", "cash", "cash", "cash", "wallet")
+    )
+    _status(client, vendor, wallet_order, "accepted")
+    _status(client, vendor, wallet_order, "delivered")
+    _batch(client, vendor, [cash_a, cash_b], "accepted")
+    _batch(client, vendor, [cash_a, cash_b], "delivered")
+    client.post(f"{API_PREFIX}/consumer/orders/{cancelled}/cancel", headers=consumer)
+    _status(client, vendor, rejected, "rejected")
+    client.post(f"{API_PREFIX}/vendor/orders/{cash_b}/return/initiate", headers=vendor,
+                json={"reason": "damaged", "items": [{"item_id": item_ids[0], "quantity": 1}]})
+    assert client.post(f"{API_PREFIX}/vendor/orders/{cash_b}/return/complete", headers=vendor).status_code == 200
+
+    body = client.get(f"{API_PREFIX}/vendor/dashboard", headers=vendor, query_string={"days": 7}).get_json()
+    assert len(body["days"]) == 7
+    assert body["days"][-1]["day"] == datetime.utcnow().date().isoformat()
+    assert body["days"][-1] == {"day": body["to"], **body["totals"]}
+    assert body["totals"] == {
+        "orders_placed": 5,
+        "orders_delivered": 3,
+        "orders_rejected": 1,
+        "orders_cancelled": 1,
+        "orders_returned": 1,
+        "gmv": 90.0,
+        "wallet_gmv": 30.0,
+        "cash_gmv": 60.0,
+        "items_delivered": 6,
+        "returns_value": 10.0,
+        "average_basket_value": 30.0,
+        "average_basket_items": 2.0,
+    }
+
+    incremental = _stored(shop_id)
+    ShopDailyStats.query.delete()
+    db.session.commit()
+    assert rebuild_shop_stats(chunk_days=1) == 1
+    assert _stored(shop_id) == incremental
+
+    # Rebuilds read archived orders as well.
+    assert archive_closed_orders(older_than_days=-1) == 4
+    rebuild_shop_stats()
+    assert _stored(shop_id) == incremental
+
+
+def test_dashboard_reads_are_flat_in_history(client, setup, sql_statements):
+    _, vendor, shop_id, _ = setup
+    client.get(f"{API_PREFIX}/vendor/dashboard", headers=vendor)  # warm auth caches
+
+    with sql_statements() as statements:
+        body = client.get(f"{API_PREFIX}/vendor/dashboard", headers=vendor, query_string={"days": 90}).get_json()
+    assert len(statements) == 2  # shop + rollup rows
+    assert "shop_daily_stats" in statements[-1]
+    assert len(body["days"]) == 90 and body["totals"]["orders_placed"] == 0
+
+    assert client.get(f"{API_PREFIX}/vendor/dashboard", headers=vendor, query_string={"days": 0}).status_code == 400
+    assert client.get(f"{API_PREFIX}/vendor/dashboard", headers=vendor, query_string={"days": "x"}).status_code == 400
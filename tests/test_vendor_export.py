@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from models import db
+from models.order import Order, OrderItem
+from app.services.order_archive import archive_closed_orders
+from app.version import API_PREFIX
+
+CONSUMER = "9870000001"
+VENDOR = "9870000002"
+OTHER_VENDOR = "9870000003"
+BASE = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def shop_id_for(make_shop):
+    def _shop(phone):
+        shop = make_shop(phone)
+        db.session.commit()
+        return shop.id
+
+    return _shop
+
+
+def _orders(shop_id, count, status="delivered", lines=2):
+    orders = []
+    for n in range(count):
+        order = Order(user_phone=CONSUMER, shop_id=shop_id, status=status, payment_mode="cash",
+                      total_amount=10 * lines, final_amount=10 * lines, item_count=lines,
+                      created_at=BASE + timedelta(days=n), updated_at=BASE)
+        order.items = [OrderItem(item_id=i, name=f"i{i}", unit="pcs", unit_price=10, quantity=1, subtotal=10)
+                       for i in range(lines)]
+        orders.append(order)
+    db.session.add_all(orders)
+    db.session.commit()
+    return [o.id for o in orders]
+
+
+def test_ndjson_streams_current_and_archived_orders_with_items(client, login, shop_id_for):
+    shop_id = shop_id_for(VENDOR)
+    _orders(shop_id_for(OTHER_VENDOR), 2)
+    archived = _orders(shop_id, 3)
+    hot = _orders(shop_id, 2, status="pending", lines=3)
+    assert archive_closed_orders(older_than_days=30) == 5  # includes the other shop's two
+
+    resp = client.get(f"{API_PREFIX}/vendor/orders/export", headers=login(VENDOR, "vendor"),
+                      query_string={"format": "ndjson"}, buffered=False)
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    orders = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    resp.close()
+    assert [o["order_id"] for o in orders] == archived + hot
+    assert [o["status"] for o in orders] == ["delivered"] * 3 + ["pending"] * 2
+    assert [len(o["items"]) for o in orders] == [2, 2, 2, 3, 3]
+    assert orders[-1]["items"][2] == {"item_id": 2, "name": "i2", "unit": "pcs", "quantity": 1,
+                                      "unit_price": 10.0, "subtotal": 10.0}
+
+
+def test_csv_has_one_row_per_line_within_the_range(client, login, shop_id_for):
+    shop_id = shop_id_for(VENDOR)
+    ids = _orders(shop_id, 4)
+
+    resp = client.get(f"{API_PREFIX}/vendor/orders/export", headers=login(VENDOR, "vendor"),
+                      query_string={"from": "2025-01-02", "to": "2025-01-04"})
+    assert resp.mimetype == "text/csv"
+    assert "attachment" in resp.headers["Content-Disposition"]
+    rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+    assert [int(r["order_id"]) for r in rows] == [ids[1], ids[1], ids[2], ids[2]]
+    assert rows[0]["item_name"] == "i0" and rows[1]["item_name"] == "i1"
+    assert rows[0]["customer"] == CONSUMER and rows[0]["status"] == "delivered"
+
+
+def test_export_rejects_bad_parameters(client, login, shop_id_for):
+    shop_id_for(VENDOR)
+    hdr = login(VENDOR, "vendor")
+    url = f"{API_PREFIX}/vendor/orders/export"
+    assert client.get(url, headers=hdr, query_string={"format": "xlsx"}).status_code == 400
+    assert client.get(url, headers=hdr, query_string={"from": "yesterday"}).status_code == 400
+    assert client.get(url, headers=login("9870000009", "vendor")).status_code == 404
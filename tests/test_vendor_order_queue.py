@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+import pytest
+from models import db
+from models.order import Order, OrderItem
+from app.version import API_PREFIX
+
+VENDOR = "9500000001"
+BASE = datetime(2026, 1, 1, 8, 0, 0)
+
+
+@pytest.fixture
+def setup(login, make_shop):
+    shop = make_shop(VENDOR)
+    db.session.commit()
+    return login(VENDOR, "vendor"), shop.id
+
+
+def _seed(shop_id, statuses):
+    for i, status in enumerate(statuses):
+        order = Order(
+            user_phone="c",
+            shop_id=shop_id,
+            status=status,
+            payment_mode="cash",
+            total_amount=10,
+            final_amount=10,
+            created_at=BASE + timedelta(minutes=i),
+        )
+        order.items = [OrderItem(item_id=1, name="A", unit="pcs", unit_price=10, quantity=1, subtotal=10)]
+        db.session.add(order)
+    db.session.commit()
+
+
+def _queue(client, hdr, **params):
+    return client.get(f"{API_PREFIX}/vendor/orders/queue", headers=hdr, query_string=params)
+
+
+def test_queue_defaults_to_open_orders_with_counts(client, setup):
+    hdr, shop_id = setup
+    _seed(shop_id, ["delivered"] * 30 + ["pending"] * 3 + ["accepted"] * 2 + ["cancelled"] * 5)
+
+    body = _queue(client, hdr).get_json()
+    assert {o["status"] for o in body["orders"]} == {"pending", "accepted"}
+    assert len(body["orders"]) == 5
+    assert body["next_before"] is None
+    assert body["counts"]["pending"] == 3
+    assert body["counts"]["accepted"] == 2
+    assert body["counts"]["confirmed"] == 0
+    assert "delivered" not in body["counts"]
+
+
+def test_queue_pages_by_status(client, setup):
+    hdr, shop_id = setup
+    _seed(shop_id, ["pending"] * 7 + ["accepted"] * 4)
+
+    first = _queue(client, hdr, status="pending", limit=5).get_json()
+    assert len(first["orders"]) == 5
+    assert first["counts"] == {"pending": 7}
+    second = _queue(client, hdr, status="pending", limit=5, before=first["next_before"]).get_json()
+    assert len(second["orders"]) == 2
+    assert second["next_before"] is None
+    ids = [o["order_id"] for o in first["orders"] + second["orders"]]
+    assert len(set(ids)) == 7
+
+
+def test_order_list_is_complete_unless_paged(client, setup):
+    hdr, shop_id = setup
+    _seed(shop_id, ["delivered"] * 25)
+    body = client.get(f"{API_PREFIX}/vendor/orders", headers=hdr).get_json()
+    assert len(body["orders"]) == 25
+    assert body["orders"][0]["items"] == [{"name": "A", "quantity": 1, "unit_price": 10.0, "subtotal": 10.0}]
+    assert "next_before" not in body and "counts" not in body
+
+    page = client.get(f"{API_PREFIX}/vendor/orders", headers=hdr, query_string={"limit": 20}).get_json()
+    assert len(page["orders"]) == 20
+    assert page["next_before"]
+    assert "items" not in page["orders"][0]
+
+
+def test_queue_uses_shop_status_index(client, setup, sql_statements):
+    hdr, shop_id = setup
+    _seed(shop_id, ["delivered"] * 5 + ["pending"] * 2)
+    _queue(client, hdr)  # warm auth caches
+
+    with sql_statements(parameters=True) as captured:
+        assert _queue(client, hdr, status="pending").status_code == 200
+
+    order_queries = [(s, p) for s, p in captured if 'FROM "order"' in s]
+    assert len(order_queries) == 2  # page + counts; items come from order_item
+    assert len(captured) <= 4
+    for statement, parameters in order_queries:
+        plan = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        assert "ix_order_shop_status" in " ".join(row[3] for row in plan)